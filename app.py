@@ -1,10 +1,45 @@
 import streamlit as st
-import cv2
+import html
 import time
 import os
-import pygame
-import numpy as np
-from media_controls import map_gesture_to_action, detect_hands_in_video
+import uuid
+from player import MediaPlayer, SEEK_STEP, VOLUME_STEP
+from gesture_map import get_gesture_map
+from song_index import SongIndex
+from startup import start_warm_up
+import sampling_profiler
+
+# Start of this script run (every interaction reruns the script)
+run_start = time.perf_counter()
+
+# OpenCV, NumPy, MediaPipe and pygame are only imported once the webcam is
+# started (and warmed up in the background after the page has rendered), so
+# they don't delay the first paint
+
+# Run capture and inference in separate processes (shared-memory frame ring)
+MULTIPROCESS = os.environ.get("GESTURE_PLAYER_MULTIPROCESS", "0") == "1"
+
+# Frame source: camera index or /dev/video* path, video file, image directory or "synthetic"
+VIDEO_SOURCE = os.environ.get("GESTURE_PLAYER_SOURCE", "0")
+# Requested camera mode, e.g. "640x480@30:MJPG", and driver buffer size (1 = freshest frames)
+CAMERA_MODE = os.environ.get("GESTURE_PLAYER_CAMERA_MODE", "")
+CAMERA_BUFFER = os.environ.get("GESTURE_PLAYER_CAMERA_BUFFER")
+# Track a single hand: faster, but no two-hand chords
+MAX_NUM_HANDS = 1 if os.environ.get("GESTURE_PLAYER_ONE_HAND", "0") == "1" else 2
+# Continuous volume after holding the thumb+index "L" pose: "pinch", "height" or "off"
+VOLUME_GESTURE = os.environ.get("GESTURE_PLAYER_VOLUME_GESTURE", "pinch")
+# Gesture event log directory for usage analytics (see event_log.py); empty to disable
+EVENT_LOG_DIR = os.environ.get("GESTURE_PLAYER_EVENT_LOG", "logs/events")
+# Where each session's gesture-to-audio latency log is saved, every minute and when the
+# webcam stops; {session} is replaced by a per-session name, so sessions don't overwrite
+# each other's log (a path without it is shared by all sessions); empty to disable
+LATENCY_LOG_PATH = os.environ.get("GESTURE_PLAYER_LATENCY_LOG", "logs/latency-app-{session}.npz")
+# On-demand profiling windows of the running loop (see sampling_profiler.py)
+PROFILE_DIR = os.environ.get("GESTURE_PLAYER_PROFILE_DIR", "profiles")
+PROFILE_SECONDS = float(os.environ.get("GESTURE_PLAYER_PROFILE_SECONDS", "30"))
+
+# Songs per page of the library list
+LIBRARY_PAGE_SIZE = 50
 
 # Set page configuration
 st.set_page_config(
@@ -640,95 +675,247 @@ if 'current_song_index' not in st.session_state:
     st.session_state.current_song = "No song playing"
     st.session_state.current_gesture = "None"
     st.session_state.has_songs = False
-    st.session_state.initialized = False
     st.session_state.webcam_active = False
     st.session_state.volume = 70
     st.session_state.progress = 0
-    st.session_state.last_update = time.time()
+    st.session_state.position = 0.0
+    st.session_state.duration = None
+
+# Startup timings of this session: first render and webcam click to first gesture frame
+if 'startup_times' not in st.session_state:
+    st.session_state.startup_times = {}
 
-# Initialize pygame for audio
-def initialize_pygame():
-    if not st.session_state.initialized:
-        pygame.init()
-        pygame.mixer.init()
-        st.session_state.initialized = True
+# Audio player shared by the buttons and the gesture loop
+if 'player' not in st.session_state:
+    st.session_state.player = MediaPlayer(song_folder="songs", volume=st.session_state.volume)
+
+# Mirror the player state into the session state used for rendering
+def sync_player_state():
+    player = st.session_state.player
+    st.session_state.current_song_index = player.index
+    st.session_state.current_status = player.status
+    st.session_state.current_song = player.current_song
+    st.session_state.volume = player.volume
+    st.session_state.position = player.position()
+    st.session_state.duration = player.duration
+    duration = st.session_state.duration
+    st.session_state.progress = min(100, st.session_state.position / duration * 100) if duration else 0
 
 # Load songs from directory
 def load_songs():
-    song_folder = "songs"
-    if not os.path.exists(song_folder):
-        os.makedirs(song_folder)
-    songs = [os.path.join(song_folder, f) for f in os.listdir(song_folder) if f.endswith(('.mp3', '.wav'))]
+    songs = st.session_state.player.load_songs()
     st.session_state.songs = songs
     st.session_state.has_songs = len(songs) > 0
     return songs
 
 # Music control functions
 def play_song(index):
-    initialize_pygame()
-    
     if not st.session_state.has_songs:
         return
     
-    st.session_state.current_song_index = index % len(st.session_state.songs)
-    pygame.mixer.music.load(st.session_state.songs[st.session_state.current_song_index])
-    pygame.mixer.music.play()
-    st.session_state.current_status = "playing"
-    st.session_state.current_song = os.path.basename(st.session_state.songs[st.session_state.current_song_index])
-    st.session_state.progress = 0
-    st.session_state.last_update = time.time()
+    st.session_state.player.play(index)
+    sync_player_state()
 
 def pause_song():
-    initialize_pygame()
-    pygame.mixer.music.pause()
-    st.session_state.current_status = "paused"
+    st.session_state.player.pause()
+    sync_player_state()
 
 def unpause_song():
-    initialize_pygame()
-    pygame.mixer.music.unpause()
-    st.session_state.current_status = "playing"
-    st.session_state.last_update = time.time()
+    st.session_state.player.unpause()
+    sync_player_state()
+
+def resume_or_play_song():
+    if st.session_state.current_status == "paused":
+        unpause_song()
+    else:
+        play_song(st.session_state.current_song_index)
 
 def stop_song():
-    initialize_pygame()
-    pygame.mixer.music.stop()
-    st.session_state.current_status = "stopped"
-    st.session_state.progress = 0
+    st.session_state.player.stop()
+    sync_player_state()
 
 def next_song():
     if not st.session_state.has_songs:
         return
         
-    st.session_state.current_song_index = (st.session_state.current_song_index + 1) % len(st.session_state.songs)
-    play_song(st.session_state.current_song_index)
+    play_song(st.session_state.current_song_index + 1)
 
 def previous_song():
     if not st.session_state.has_songs:
         return
         
-    st.session_state.current_song_index = (st.session_state.current_song_index - 1) % len(st.session_state.songs)
-    play_song(st.session_state.current_song_index)
+    play_song(st.session_state.current_song_index - 1)
 
 # Set volume function
 def set_volume(volume):
-    initialize_pygame()
-    pygame.mixer.music.set_volume(volume / 100)
-    st.session_state.volume = volume
+    st.session_state.player.set_volume(volume)
+    sync_player_state()
 
-# Update progress bar
-def update_progress():
+# Seek functions
+def seek_song(seconds):
+    st.session_state.player.seek(seconds)
+    sync_player_state()
+
+def seek_by(delta):
+    st.session_state.player.seek_by(delta)
+    sync_player_state()
+
+# Seek slider callback (runs before the rerun that renders the new position)
+def seek_to_slider():
+    seek_song(st.session_state.seek_position)
+
+# Gesture actions -> control functions
+ACTIONS = {
+    "play": resume_or_play_song,
+    "pause": pause_song,
+    "stop": stop_song,
+    "next": next_song,
+    "previous": previous_song,
+    "volume_up": lambda: set_volume(st.session_state.volume + VOLUME_STEP),
+    "volume_down": lambda: set_volume(st.session_state.volume - VOLUME_STEP),
+    "seek_forward": lambda: seek_by(SEEK_STEP),
+    "seek_backward": lambda: seek_by(-SEEK_STEP),
+}
+
+# Song search index, rebuilt only when the song list changes
+def get_song_index(songs):
+    index = st.session_state.get('song_index')
+    if index is None or index.songs != songs:
+        index = SongIndex(songs)
+        st.session_state.song_index = index
+    return index
+
+# A new search or filter starts at the first page
+def reset_library_page():
+    st.session_state.library_page = 1
+
+# Style block highlighting the current song in the library list
+def library_highlight_css():
+    if st.session_state.current_status == "stopped":
+        return "<style></style>"
+    row = f".song-row-{st.session_state.current_song_index}"
+    css = f"""{row} {{ background-color: rgba(29, 185, 84, 0.1); border-left: 3px solid #1DB954; }}
+    {row} .song-title {{ color: #1DB954; font-weight: 600; }}"""
     if st.session_state.current_status == "playing":
-        # Simulate progress (real implementation would get actual song position)
-        elapsed = time.time() - st.session_state.last_update
-        # Assume average song length of 3 minutes
-        song_length = 180
-        progress_increment = (elapsed / song_length) * 100
-        st.session_state.progress = min(st.session_state.progress + progress_increment, 100)
-        st.session_state.last_update = time.time()
+        css += f"""
+    {row}::after {{ content: "♫"; margin-left: auto; color: #1DB954; animation: pulse 2s infinite; }}"""
+    return f"<style>{css}</style>"
+
+# Update progress bar from the playback clock; the player moves on to the
+# next song when it receives the end-of-track event
+def update_progress():
+    st.session_state.player.update()
+    sync_player_state()
+
+def release_stale_frames():
+    """
+    Free the video frames Streamlit still holds in memory.
+    Every st.image() call stores its frame as a media file, and replaced ones
+    are only deleted when the script run ends, which the webcam loop doesn't
+    do for as long as it runs.
+    """
+    from streamlit import runtime
+    if runtime.exists():
+        runtime.get_instance().media_file_mgr.remove_orphaned_files()
+
+# Format seconds as m:ss
+def format_time(seconds):
+    seconds = int(seconds or 0)
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+# HTML each placeholder shows in this script run. The blocks that change while
+# the page is up (Now Playing card, playback status, current gesture, library
+# highlight) are drawn into placeholders and redrawn in place by the webcam
+# loop, only when their HTML changes; the static sections around them are not
+# sent again
+rendered = {}
+
+def render(name, placeholder, body):
+    """Show the HTML `body` (or nothing, for "") in the placeholder unless it already shows it."""
+    if rendered.get(name) == body:
+        return
+    rendered[name] = body
+    if body:
+        placeholder.markdown(body, unsafe_allow_html=True)
+    else:
+        placeholder.empty()
+
+def now_playing_html():
+    """Now Playing card with the progress of the current song, or "" when stopped."""
+    if not st.session_state.has_songs or st.session_state.current_status == "stopped":
+        return ""
+    now_playing_class = "playing" if st.session_state.current_status == "playing" else ""
+    song_name = os.path.basename(st.session_state.songs[st.session_state.current_song_index])
+    song_artist = "Unknown Artist" # This would come from metadata in a real app
+    # Whole percents and seconds, so the card changes about once a second while playing
+    return f"""
+        <div class="now-playing-card {now_playing_class}">
+            <div class="album-cover">🎵</div>
+            <div class="song-details">
+                <div class="song-name">{song_name}</div>
+                <div class="song-artist">{song_artist}</div>
+                <div class="progress-container">
+                    <div class="progress-bar">
+                        <div class="progress-filled" style="width: {st.session_state.progress:.0f}%;"></div>
+                    </div>
+                    <div class="time-info">
+                        <span>{format_time(st.session_state.position)}</span>
+                        <span>{format_time(st.session_state.duration) if st.session_state.duration else "-:--"}</span>
+                    </div>
+                </div>
+                
+                <div class="playing-status-bar" style="display: {'flex' if st.session_state.current_status == 'playing' else 'none'};">
+                    <div class="status-bar"></div>
+                    <div class="status-bar"></div>
+                    <div class="status-bar"></div>
+                    <div class="status-bar"></div>
+                    <div class="status-bar"></div>
+                </div>
+            </div>
+        </div>
+        """
+
+def playback_status_html():
+    """Playback status box (state, song, volume), or "" when stopped."""
+    if not st.session_state.has_songs or st.session_state.current_status == "stopped":
+        return ""
+    status_class = "playing" if st.session_state.current_status == "playing" else "paused"
+    status_text = "Now Playing" if st.session_state.current_status == "playing" else "Paused"
+    return f"""
+        <div class="status-box" style="margin-bottom: 24px;">
+        <div style="display: flex; align-items: center;">
+            <div class="status-indicator {status_class}"></div>
+            <div style="font-weight: 600; font-size: 18px;">{status_text}</div>
+        </div>
         
-        # Auto-play next song when current one finishes
-        if st.session_state.progress >= 100:
-            next_song()
+        <div class="song-info">
+            <div class="album-art">🎵</div>
+            <div class="song-info-details">
+                <div class="song-title-display">{os.path.basename(st.session_state.songs[st.session_state.current_song_index])}</div>
+                <div>Unknown Artist</div>
+            </div>
+        </div>
+        
+        <div class="volume-control">
+            <div class="volume-icon">🔊</div>
+            <div class="volume-bar">
+                <div class="volume-level" style="width: {st.session_state.volume}%;"></div>
+                <div class="volume-knob"></div>
+            </div>
+        </div>
+        </div>
+        """
+
+def gesture_html():
+    """Current gesture box, shown while the webcam is on."""
+    if not st.session_state.webcam_active:
+        return ""
+    return f"""
+        <div class="status-box">
+        <div style="font-weight: 600; margin-bottom: 12px;">Current Gesture</div>
+        <div class="gesture-value" style="text-align: center; padding: 12px 0;">{st.session_state.current_gesture}</div>
+        </div>
+        """
 
 # Application header with enhanced Spotify-style branding
 st.markdown("""
@@ -753,6 +940,7 @@ with col1:
     st.markdown('<div class="video-container">', unsafe_allow_html=True)
     video_placeholder = st.empty()
     st.markdown('</div>', unsafe_allow_html=True)
+    capture_mode_placeholder = st.empty()
     
     # If webcam is not active, show an enhanced placeholder with animations
     if not st.session_state.webcam_active:
@@ -784,65 +972,57 @@ with col1:
             
         st.markdown('</div>', unsafe_allow_html=True)
     
-    # Now Playing card - only show when a song is playing or paused
+    # Now Playing card - only shown when a song is playing or paused
+    now_playing_placeholder = st.empty()
     if st.session_state.has_songs and st.session_state.current_status != "stopped":
         # Update progress for visual feedback
         update_progress()
-        
-        now_playing_class = "playing" if st.session_state.current_status == "playing" else ""
-        song_name = os.path.basename(st.session_state.songs[st.session_state.current_song_index])
-        song_artist = "Unknown Artist" # This would come from metadata in a real app
-        
-        st.markdown(f"""
-        <div class="now-playing-card {now_playing_class}">
-            <div class="album-cover">🎵</div>
-            <div class="song-details">
-                <div class="song-name">{song_name}</div>
-                <div class="song-artist">{song_artist}</div>
-                <div class="progress-container">
-                    <div class="progress-bar">
-                        <div class="progress-filled" style="width: {st.session_state.progress}%;"></div>
-                    </div>
-                    <div class="time-info">
-                        <span>{int(st.session_state.progress * 180 / 100) // 60}:{int(st.session_state.progress * 180 / 100) % 60:02d}</span>
-                        <span>3:00</span>
-                    </div>
-                </div>
-                
-                <div class="playing-status-bar" style="display: {'flex' if st.session_state.current_status == 'playing' else 'none'};">
-                    <div class="status-bar"></div>
-                    <div class="status-bar"></div>
-                    <div class="status-bar"></div>
-                    <div class="status-bar"></div>
-                    <div class="status-bar"></div>
-                </div>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+    render("now_playing", now_playing_placeholder, now_playing_html())
+    if st.session_state.has_songs and st.session_state.current_status != "stopped":
+        # Seek within the current song
+        if st.session_state.duration:
+            st.session_state.seek_position = int(st.session_state.position)
+            st.slider("Position", min_value=0, max_value=max(1, int(st.session_state.duration)),
+                      key="seek_position", on_change=seek_to_slider, format="%d s",
+                      label_visibility="collapsed")
     
     # Song library section with enhanced styling
     st.markdown('<h2 style="margin-top: 32px;">Your Library</h2>', unsafe_allow_html=True)
     
-    # Show available songs with enhanced visuals
+    # Show available songs: search and filter run on an in-memory index, and only
+    # the visible page is rendered, as a single block
     songs = load_songs()
+    library_highlight_placeholder = None
     if len(songs) > 0:
-        song_list = st.container()
-        with song_list:
-            st.markdown('<div class="status-box">', unsafe_allow_html=True)
-            for i, song in enumerate(songs):
-                song_name = os.path.basename(song)
-                current_class = "current-song" if i == st.session_state.current_song_index and st.session_state.current_status != "stopped" else ""
-                now_playing = "now-playing" if i == st.session_state.current_song_index and st.session_state.current_status != "stopped" else ""
-                playing_icon = """<div class="now-playing-icon">♫</div>""" if i == st.session_state.current_song_index and st.session_state.current_status == "playing" else ""
-                
-                st.markdown(f"""
-                <div class="song-list-item {now_playing}" onclick="alert('Song clicked!')">
-                    <div class="song-number">{i+1}</div>
-                    <div class="song-title {current_class}">{song_name}</div>
-                    {playing_icon}
-                </div>
-                """, unsafe_allow_html=True)
-            st.markdown('</div>', unsafe_allow_html=True)
+        index = get_song_index(songs)
+        search_col, format_col = st.columns([3, 1])
+        with search_col:
+            query = st.text_input("Search", key="library_query", placeholder="Search songs",
+                                  label_visibility="collapsed", on_change=reset_library_page)
+        with format_col:
+            song_format = st.selectbox("Format", ["All"] + index.formats, key="library_format",
+                                       label_visibility="collapsed", on_change=reset_library_page)
+        matches = index.search(query, None if song_format == "All" else song_format)
+        visible, page, pages = index.page(matches, st.session_state.get("library_page", 1), LIBRARY_PAGE_SIZE)
+        
+        rows = "".join(f"""
+            <div class="song-list-item song-row-{i}">
+                <div class="song-number">{i+1}</div>
+                <div class="song-title">{html.escape(index.names[i])}</div>
+            </div>""" for i in visible)
+        if not rows:
+            rows = '<div class="song-list-item"><div class="song-title">No matching songs</div></div>'
+        st.markdown(f'<div class="status-box">{rows}</div>', unsafe_allow_html=True)
+        # The current song is highlighted by a small separate style block, so
+        # playback changes don't alter the list markup (the webcam loop redraws it)
+        library_highlight_placeholder = st.empty()
+        render("library_highlight", library_highlight_placeholder, library_highlight_css())
+        
+        if pages > 1:
+            # Keep the page in range when a search shrinks the results
+            st.session_state.library_page = page
+            st.number_input(f"Page (of {pages}, {len(matches)} songs)", min_value=1, max_value=pages,
+                            key="library_page")
     else:
         st.markdown("""
         <div class="status-box empty-state">
@@ -855,46 +1035,12 @@ with col1:
 # Control panel column with enhanced styling
 with col2:
     # Current status display with enhanced visuals
-    if st.session_state.has_songs and st.session_state.current_status != "stopped":
-        st.markdown('<div class="status-box" style="margin-bottom: 24px;">', unsafe_allow_html=True)
-        
-        # Status indicator with proper styling based on state
-        status_class = "playing" if st.session_state.current_status == "playing" else "paused"
-        status_text = "Now Playing" if st.session_state.current_status == "playing" else "Paused"
-        
-        st.markdown(f"""
-        <div style="display: flex; align-items: center;">
-            <div class="status-indicator {status_class}"></div>
-            <div style="font-weight: 600; font-size: 18px;">{status_text}</div>
-        </div>
-        
-        <div class="song-info">
-            <div class="album-art">🎵</div>
-            <div class="song-info-details">
-                <div class="song-title-display">{os.path.basename(st.session_state.songs[st.session_state.current_song_index])}</div>
-                <div>Unknown Artist</div>
-            </div>
-        </div>
-        
-        <div class="volume-control">
-            <div class="volume-icon">🔊</div>
-            <div class="volume-bar">
-                <div class="volume-level" style="width: {st.session_state.volume}%;"></div>
-                <div class="volume-knob"></div>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        st.markdown('</div>', unsafe_allow_html=True)
+    status_placeholder = st.empty()
+    render("status", status_placeholder, playback_status_html())
     
     # Current gesture display
-    if st.session_state.webcam_active:
-        st.markdown('<div class="status-box">', unsafe_allow_html=True)
-        st.markdown(f"""
-        <div style="font-weight: 600; margin-bottom: 12px;">Current Gesture</div>
-        <div class="gesture-value" style="text-align: center; padding: 12px 0;">{st.session_state.current_gesture}</div>
-        """, unsafe_allow_html=True)
-        st.markdown('</div>', unsafe_allow_html=True)
+    gesture_placeholder = st.empty()
+    render("gesture", gesture_placeholder, gesture_html())
     
     # Manual controls with enhanced Spotify styling
     st.markdown('<h2>Controls</h2>', unsafe_allow_html=True)
@@ -913,10 +1059,7 @@ with col2:
     with controls_col3:
         st.markdown('<div class="play-button">', unsafe_allow_html=True)
         if st.button("▶️", key="play", help="Play/Resume"):
-            if pygame.mixer.get_init() and pygame.mixer.music.get_busy() and st.session_state.current_status == "paused":
-                unpause_song()
-            else:
-                play_song(st.session_state.current_song_index)
+            resume_or_play_song()
         st.markdown('</div>', unsafe_allow_html=True)
     
     with controls_col4:
@@ -928,32 +1071,27 @@ with col2:
             next_song()
     
     st.markdown('</div>', unsafe_allow_html=True)
+    # The buttons act after the blocks above them were drawn: redraw what they changed
+    render("now_playing", now_playing_placeholder, now_playing_html())
+    render("status", status_placeholder, playback_status_html())
+    if library_highlight_placeholder is not None:
+        render("library_highlight", library_highlight_placeholder, library_highlight_css())
     
     # Gesture Guide with enhanced styling and animations
     st.markdown('<h2>Gesture Guide</h2>', unsafe_allow_html=True)
     with st.container():
-        st.markdown("""
-        <div class="gesture-guide">
-            <div class="gesture-guide-item">
-                <div class="gesture-emoji">👐</div>
-                <div class="gesture-description">Open Palm <span class="gesture-action">Play/Resume</span></div>
-            </div>
-            <div class="gesture-guide-item">
-                <div class="gesture-emoji">✊</div>
-                <div class="gesture-description">Closed Fist <span class="gesture-action">Pause</span></div>
-            </div>
-            <div class="gesture-guide-item">
-                <div class="gesture-emoji">🖐️</div>
-                <div class="gesture-description">Palm Down <span class="gesture-action">Stop</span></div>
-            </div>
+        # Generated from gestures.json
+        guide = get_gesture_map().guide()
+        if VOLUME_GESTURE != "off":
+            from pinch_volume import guide_entry
+            guide.append(guide_entry(VOLUME_GESTURE))
+        guide_items = "".join(f"""
             <div class="gesture-guide-item">
-                <div class="gesture-emoji">✌️</div>
-                <div class="gesture-description">Peace Sign <span class="gesture-action">Next Song</span></div>
-            </div>
-            <div class="gesture-guide-item">
-                <div class="gesture-emoji">👆</div>
-                <div class="gesture-description">Index Finger <span class="gesture-action">Previous Song</span></div>
-            </div>
+                <div class="gesture-emoji">{gesture['emoji']}</div>
+                <div class="gesture-description">{gesture['name']} <span class="gesture-action">{gesture['label']}</span></div>
+            </div>""" for gesture in guide)
+        st.markdown(f"""
+        <div class="gesture-guide">{guide_items}
         </div>
         """, unsafe_allow_html=True)
     
@@ -969,6 +1107,31 @@ with col2:
         </ul>
     </div>
     """, unsafe_allow_html=True)
+    
+    # Gesture-to-audio latency breakdown per action
+    if 'latency_log' in st.session_state and len(st.session_state.latency_log) > 0:
+        with st.expander("Gesture Latency"):
+            st.code(st.session_state.latency_log.format_summary())
+    
+    # Startup timings
+    if st.session_state.startup_times:
+        with st.expander("Startup"):
+            st.code("\n".join(f"{name:<14} {seconds * 1000:8.0f} ms"
+                              for name, seconds in st.session_state.startup_times.items()))
+    
+    # Sample the running loop for a while to see where the time goes
+    with st.expander("Profiler"):
+        active_profile = sampling_profiler.active_profile()
+        if active_profile is not None:
+            remaining = max(0.0, active_profile.started + PROFILE_SECONDS - time.time())
+            st.caption(f"Profiling... about {remaining:.0f}s left ({active_profile.samples} samples so far)")
+        elif st.button(f"Profile for {PROFILE_SECONDS:g} s", key="start_profile"):
+            sampling_profiler.start_profile(duration=PROFILE_SECONDS, directory=PROFILE_DIR)
+            st.rerun()
+        finished_profile = sampling_profiler.last_profile()
+        if finished_profile is not None and finished_profile.paths:
+            st.caption(f"Last profile: {finished_profile.paths[0]}")
+            st.code(finished_profile.format_summary(top=15))
 
 # Enhanced Spotify-style footer with animation
 st.markdown("""
@@ -978,75 +1141,157 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+# The page is on screen: record the first render and load the heavy modules in the background
+if 'first_render' not in st.session_state.startup_times:
+    st.session_state.startup_times['first_render'] = time.perf_counter() - run_start
+start_warm_up(MAX_NUM_HANDS)
+
 # Webcam processing - only runs when webcam is active
 if st.session_state.webcam_active:
+    import cv2
+    from media_controls import map_gesture_to_action, detect_hands_in_video, draw_gesture_label, GestureDebouncer
+    from landmark_filter import HandSmoother
+    from frame_ring import detect_hands_multiprocess
+    from latency_trace import LatencyLog
+    from capture import open_source, parse_mode
+    from frame_buffers import FramePool
+    from pinch_volume import PinchVolumeControl
+    from event_log import SessionRecorder, get_event_log
+    
+    SOURCE_OPTIONS = parse_mode(CAMERA_MODE)
+    if CAMERA_BUFFER:
+        SOURCE_OPTIONS["buffer_size"] = int(CAMERA_BUFFER)
+    
+    # Gesture-to-audio latency of the actions fired in this session
+    if 'latency_log' not in st.session_state:
+        # Named like event_log's segments: start time, then a random suffix
+        session_name = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        latency_path = LATENCY_LOG_PATH.replace("{session}", session_name) if LATENCY_LOG_PATH else None
+        st.session_state.latency_log = LatencyLog(path=latency_path)
+    
     # Initialize variables for gesture handling
-    last_action = None
-    cooldown = 2  # seconds
-    last_time = time.time()
+    debouncer = GestureDebouncer(cooldown=2)  # seconds
+    smoother = HandSmoother()
+    recorder = SessionRecorder(get_event_log(EVENT_LOG_DIR), "app") if EVENT_LOG_DIR else None
+    
+    def set_gesture_volume(volume):
+        set_volume(volume)
+        if recorder is not None:
+            recorder.action("volume", value=volume)
+    
+    volume_control = None
+    if VOLUME_GESTURE != "off":
+        volume_control = PinchVolumeControl(set_gesture_volume, volume=st.session_state.volume, mode=VOLUME_GESTURE)
+    # Trace of the first frame showing the current gesture, so the time spent
+    # waiting for the cooldown shows up in the latency breakdown
+    previous_action = None
+    onset_trace = None
+    display_pool = FramePool()
     
     # Set initial volume
-    initialize_pygame()
-    pygame.mixer.music.set_volume(st.session_state.volume / 100)
+    set_volume(st.session_state.volume)
+    
+    # Seconds between two release_stale_frames() calls
+    FRAME_RELEASE_INTERVAL = 5.0
+    last_frame_release = time.monotonic()
+    frames = None
+    source = None
     
     # Start video capture
     try:
-        for frame, landmarks in detect_hands_in_video(video_path=None, is_webcam=True):
+        if MULTIPROCESS:
+            frames = detect_hands_multiprocess(source=VIDEO_SOURCE, source_options=SOURCE_OPTIONS, trace=True,
+                                               max_num_hands=MAX_NUM_HANDS)
+        else:
+            source = open_source(VIDEO_SOURCE, **SOURCE_OPTIONS)
+            mode = source.mode
+            if mode.get("width"):
+                # Report what the camera actually delivers, not what we asked for
+                capture_mode_placeholder.caption(
+                    f"{mode['source'].title()}: {mode['width']}x{mode['height']} @ {mode.get('fps') or 0:g} fps"
+                    + (f" {mode['fourcc']}" if mode.get("fourcc") else "")
+                )
+            frames = detect_hands_in_video(source=source, trace=True, rgb=True, max_num_hands=MAX_NUM_HANDS)
+        for frame, landmarks, trace in frames:
             # Check if the webcam should still be active
             if not st.session_state.webcam_active:
                 break
+            
+            if 'first_gesture_frame' not in st.session_state.startup_times:
+                # From the click on Start to the first frame through hand detection
+                st.session_state.startup_times['first_gesture_frame'] = time.perf_counter() - run_start
                 
-            action = map_gesture_to_action(landmarks)
+            # Smooth landmark jitter before classifying the gesture
+            landmarks = smoother(landmarks)
+            if volume_control is not None and volume_control.update(landmarks):
+                # Volume mode: the hand is a volume knob, not a discrete gesture
+                action = None
+            else:
+                action = map_gesture_to_action(landmarks)
+            trace.mark("classify")
+            if recorder is not None:
+                recorder.frame(landmarks, "volume" if volume_control is not None and volume_control.engaged else action)
+            if action != previous_action:
+                previous_action = action
+                onset_trace = trace
             
             # Update current gesture for display
             if action is not None:
                 st.session_state.current_gesture = action
             
             # Only act if cooldown passed
-            if action != last_action and action is not None and (time.time() - last_time > cooldown):
-                last_time = time.time()
-                last_action = action
+            control = ACTIONS.get(action) if debouncer.update(action) is not None else None
+            if control is not None:
+                onset_trace.mark("debounce")
                 
                 # Control the music based on the detected gesture
-                if action == "play":
-                    if pygame.mixer.get_init() and pygame.mixer.music.get_busy() and st.session_state.current_status == "paused":
-                        unpause_song()
-                    else:
-                        play_song(st.session_state.current_song_index)
-                elif action == "pause":
-                    pause_song()
-                elif action == "stop":
-                    stop_song()
-                elif action == "next":
-                    next_song()
-                elif action == "previous":
-                    previous_song()
+                control()
+                
+                onset_trace.mark("playback")
+                st.session_state.latency_log.record(action, onset_trace)
+                if recorder is not None:
+                    recorder.action(action, action)
             
             # Update progress for visual feedback when playing
             if st.session_state.current_status == "playing":
                 update_progress()
+            render("now_playing", now_playing_placeholder, now_playing_html())
+            render("status", status_placeholder, playback_status_html())
+            render("gesture", gesture_placeholder, gesture_html())
+            if library_highlight_placeholder is not None:
+                render("library_highlight", library_highlight_placeholder, library_highlight_css())
             
-            # Convert to RGB for display
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            # The single-process pipeline already yields RGB frames; frames from the
+            # shared-memory ring are BGR and get converted into a reused buffer
+            if MULTIPROCESS:
+                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=display_pool.next(frame.shape))
+            else:
+                frame_rgb = frame
             
             # Add gesture indicator overlay to the frame
-            if action is not None:
-                overlay = frame_rgb.copy()
-                text_position = (20, frame_rgb.shape[0] - 30)
-                cv2.putText(overlay, f"Gesture: {action}", text_position, 
-                           cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                
-                # Add a semi-transparent background for better text visibility
-                x, y = text_position
-                text_size, _ = cv2.getTextSize(f"Gesture: {action}", cv2.FONT_HERSHEY_SIMPLEX, 1, 2)
-                cv2.rectangle(frame_rgb, (x-10, y+10), (x+text_size[0]+10, y-text_size[1]-10), (0, 0, 0), -1)
-                cv2.addWeighted(overlay, 0.8, frame_rgb, 0.2, 0, frame_rgb)
-                cv2.putText(frame_rgb, f"Gesture: {action}", text_position, 
-                           cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+            if volume_control is not None and volume_control.engaged:
+                draw_gesture_label(frame_rgb, f"Volume: {st.session_state.volume}")
+            elif action is not None:
+                draw_gesture_label(frame_rgb, f"Gesture: {action}")
             
             video_placeholder.image(frame_rgb, channels="RGB", use_column_width=True)
+            if time.monotonic() - last_frame_release >= FRAME_RELEASE_INTERVAL:
+                release_stale_frames()
+                last_frame_release = time.monotonic()
             
     except Exception as e:
         st.error(f"Error with video capture: {e}")
         video_placeholder.error("Camera access error. Please check your webcam connection and permissions.")
-        st.session_state.webcam_active = False
\ No newline at end of file
+        st.session_state.webcam_active = False
+    finally:
+        # Free the camera and the pipeline right away, also when Stop or a rerun
+        # interrupts the loop (Streamlit raises its own exception into the script)
+        if frames is not None:
+            frames.close()
+        if source is not None:
+            source.release()
+        if recorder is not None:
+            recorder.flush()
+        # One file per session: don't leave empty ones behind for sessions without actions
+        if LATENCY_LOG_PATH and len(st.session_state.latency_log) > 0:
+            st.session_state.latency_log.save()
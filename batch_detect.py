@@ -0,0 +1,158 @@
+"""
+Batch hand detection over image datasets.
+
+Usage:
+    python batch_detect.py photos/ --workers 8 --output results.jsonl --annotate-dir annotated/
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import cv2
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tif', '.tiff')
+
+# Static-mode model owned by each worker process
+_worker_model = None
+
+
+def list_images(directory):
+    """Return the image files of a directory in sorted order."""
+    return [os.path.join(directory, f) for f in sorted(os.listdir(directory))
+            if f.lower().endswith(IMAGE_EXTENSIONS)]
+
+
+def _init_worker():
+    """Build one static-mode Hands model per worker process."""
+    global _worker_model
+    import mediapipe as mp_lib
+    from runtime_config import get_config, run_in_stage
+
+    # Keep workers from fighting over cores with OpenCV's own thread pool,
+    # unless GESTURE_PLAYER_CV_THREADS says otherwise
+    if get_config().cv_threads is None:
+        cv2.setNumThreads(1)
+    _worker_model = run_in_stage("inference", lambda: mp_lib.solutions.hands.Hands(
+        static_image_mode=True,
+        max_num_hands=2,
+        min_detection_confidence=0.5,
+    ))
+
+
+def _detect_worker(image, annotate):
+    """Run detection in a worker; only return the annotated image when asked for."""
+    from mediapipe_utils import detect_hands_in_image
+
+    annotated_image, landmarks = detect_hands_in_image(image, annotate=annotate, model=_worker_model)
+    return (annotated_image if annotate else None), landmarks
+
+
+def _decode(item):
+    """Turn a path into a BGR image; arrays pass through unchanged."""
+    if isinstance(item, str):
+        return cv2.imread(item, cv2.IMREAD_COLOR)
+    return item
+
+
+def detect_hands_in_images(images, workers=None, decode_threads=4, annotate=False, prefetch=None):
+    """
+    Detect hands in many images in parallel.
+    Images are decoded in a thread pool and detected in a pool of processes that
+    each own a static-mode MediaPipe model. Results stream back in input order and
+    at most `prefetch` images are in flight at any time.
+    Args:
+        images: Directory path, or iterable of image paths and/or BGR arrays.
+        workers (int): Number of detection processes (defaults to the CPU count).
+        decode_threads (int): Number of decoding threads.
+        annotate (bool): Also return an annotated copy of every image.
+        prefetch (int): Maximum number of images in flight (defaults to 4 per worker).
+    Yields:
+        tuple: (source, annotated_image, landmarks) where source is the input item
+        (path or array), annotated_image is None unless annotate is set (and always
+        for images that could not be decoded), and landmarks is the list of landmarks per hand.
+    """
+    if isinstance(images, str) and os.path.isdir(images):
+        images = list_images(images)
+
+    workers = workers or os.cpu_count() or 1
+    prefetch = prefetch or workers * 4
+
+    decoding = deque()   # (source, decode future)
+    detecting = deque()  # (source, detect future or None if decoding failed)
+
+    with ThreadPoolExecutor(max_workers=decode_threads) as decoder, \
+            ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                                initializer=_init_worker) as detector:
+
+        def start_detection():
+            source, decoded = decoding.popleft()
+            image = decoded.result()
+            if image is None or image.size == 0:
+                detecting.append((source, None))
+            else:
+                detecting.append((source, detector.submit(_detect_worker, image, annotate)))
+
+        def finish_detection():
+            source, future = detecting.popleft()
+            if future is None:
+                return source, None, []
+            annotated_image, landmarks = future.result()
+            return source, annotated_image, landmarks
+
+        for item in images:
+            decoding.append((item, decoder.submit(_decode, item)))
+            if len(decoding) > decode_threads:
+                start_detection()
+            if len(detecting) > prefetch:
+                yield finish_detection()
+
+        while decoding:
+            start_detection()
+        while detecting:
+            yield finish_detection()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Detect hands in a directory of images.")
+    parser.add_argument("images", help="Directory of images, or a text file with one image path per line")
+    parser.add_argument("--workers", type=int, default=None, help="Detection processes (default: CPU count)")
+    parser.add_argument("--decode-threads", type=int, default=4, help="Image decoding threads")
+    parser.add_argument("--output", default="-", help="JSON lines output file (default: stdout)")
+    parser.add_argument("--annotate-dir", default=None, help="Write annotated images to this directory")
+    args = parser.parse_args(argv)
+
+    if os.path.isdir(args.images):
+        images = list_images(args.images)
+    else:
+        with open(args.images) as f:
+            images = [line.strip() for line in f if line.strip()]
+
+    if args.annotate_dir:
+        os.makedirs(args.annotate_dir, exist_ok=True)
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    start = time.perf_counter()
+    count = 0
+    try:
+        results = detect_hands_in_images(images, workers=args.workers, decode_threads=args.decode_threads,
+                                         annotate=bool(args.annotate_dir))
+        for path, annotated_image, landmarks in results:
+            count += 1
+            out.write(json.dumps({"image": path, "hands": len(landmarks), "landmarks": landmarks}) + "\n")
+            if annotated_image is not None:
+                cv2.imwrite(os.path.join(args.annotate_dir, os.path.basename(path)), annotated_image)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Processed {count} images in {elapsed:.1f}s ({count / max(elapsed, 1e-9):.1f} images/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Hammer a PlayerCommandQueue from many threads and check its guarantees.
+
+The queue drives a stub player that records every call and flags any call that
+starts while another one is still running. Each client thread submits a mix
+of plain actions, idempotent retries (the same key several times, from
+several threads) and volume/seek values. Checked afterwards:
+    - no two player calls overlapped,
+    - every idempotency key ran exactly once,
+    - the final volume is the last one submitted (latest wins),
+    - the queue never held more than max_depth commands.
+Reports per-submit latency percentiles, throughput and how many value
+commands were coalesced away.
+
+Usage:
+    python -m benchmarks.command_queue_stress --threads 32 --commands 500
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+
+import numpy as np
+
+from player import ACTIONS
+from player_commands import CommandQueueFull, PlayerCommandQueue
+
+
+class StubPlayer:
+    """MediaPlayer stand-in that records calls and detects concurrent entry."""
+
+    def __init__(self, work=0.0002):
+        self.work = work
+        self.volume = 70
+        self.position_value = 0.0
+        self.calls = []
+        self.overlaps = 0
+        self._busy = False
+
+    def _call(self, name, value=None):
+        if self._busy:
+            self.overlaps += 1
+        self._busy = True
+        try:
+            self.calls.append((name, value))
+            # Widen the window in which a concurrent call would be caught
+            time.sleep(self.work)
+        finally:
+            self._busy = False
+
+    def handle_action(self, action):
+        self._call(action)
+        return True
+
+    def set_volume(self, volume):
+        self._call("volume", volume)
+        self.volume = volume
+
+    def seek(self, seconds):
+        self._call("seek", seconds)
+        self.position_value = seconds
+
+    def update(self):
+        return False
+
+    def state(self):
+        return {"status": "playing", "volume": self.volume, "position": self.position_value}
+
+
+def client(commands, thread_id, n, shared_keys, latencies, counters, lock):
+    rng = random.Random(thread_id)
+    plain = [action for action in ACTIONS if action != "previous"]
+    for i in range(n):
+        roll = rng.random()
+        start = time.perf_counter()
+        try:
+            if roll < 0.4:
+                commands.submit(rng.choice(plain))
+            elif roll < 0.6:
+                # A retried request: every thread may submit the same keys. Only keyed
+                # commands use "previous", so its call count is the number of keys run
+                key = rng.choice(shared_keys)
+                commands.submit("previous", key=key)
+                with lock:
+                    counters["keys_used"].add(key)
+            elif roll < 0.8:
+                with lock:
+                    counters["volume_seq"] += 1
+                    value = counters["volume_seq"]
+                    # Submitting under the lock fixes the order of the values, so the
+                    # last one submitted is known; wait=False keeps the lock short
+                    commands.submit("volume", value, wait=False)
+                    counters["last_volume"] = value
+            else:
+                commands.submit("seek", rng.uniform(0, 300))
+        except CommandQueueFull:
+            with lock:
+                counters["rejected"] += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stress the player command queue from many threads.")
+    parser.add_argument("--threads", type=int, default=32, help="Client threads")
+    parser.add_argument("--commands", type=int, default=500, help="Commands per thread")
+    parser.add_argument("--max-depth", type=int, default=16, help="Queue bound")
+    parser.add_argument("--keys", type=int, default=50, help="Distinct idempotency keys shared by all threads")
+    parser.add_argument("--work", type=float, default=0.0002, help="Seconds each stub player call takes")
+    args = parser.parse_args(argv)
+
+    player = StubPlayer(work=args.work)
+    commands = PlayerCommandQueue(player, max_depth=args.max_depth)
+    shared_keys = [f"key-{i}" for i in range(args.keys)]
+    counters = {"volume_seq": 0, "last_volume": None, "rejected": 0, "keys_used": set()}
+    lock = threading.Lock()
+    latencies = []
+    max_seen = [0]
+    done = threading.Event()
+
+    def watch_depth():
+        while not done.is_set():
+            max_seen[0] = max(max_seen[0], len(commands))
+            time.sleep(0.0005)
+
+    watcher = threading.Thread(target=watch_depth, daemon=True)
+    watcher.start()
+    threads = [threading.Thread(target=client, args=(commands, t, args.commands, shared_keys,
+                                                     latencies, counters, lock))
+               for t in range(args.threads)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # Flush: a waited command runs after everything queued before it
+    final_state = commands.submit("stop", timeout=30.0)
+    elapsed = time.perf_counter() - start
+    done.set()
+    watcher.join()
+    commands.close()
+
+    submitted = args.threads * args.commands
+    volume_calls = sum(1 for name, _ in player.calls if name == "volume")
+    keyed_runs = sum(1 for name, _ in player.calls if name == "previous")
+    lat = np.array(latencies) * 1000
+    print(f"{submitted} submits from {args.threads} threads in {elapsed:.2f}s "
+          f"({submitted / elapsed:.0f} submits/s, {len(player.calls)} player calls)")
+    print(f"latency ms: p50 {np.percentile(lat, 50):.2f}  p95 {np.percentile(lat, 95):.2f}  "
+          f"p99 {np.percentile(lat, 99):.2f}  max {lat.max():.2f}")
+    print(f"volume: {counters['volume_seq']} submitted, {volume_calls} ran (coalesced away: "
+          f"{counters['volume_seq'] - volume_calls})")
+    print(f"rejected (queue full): {counters['rejected']}, max queue depth seen: {max_seen[0]}")
+
+    failures = []
+    if player.overlaps:
+        failures.append(f"{player.overlaps} overlapping player calls")
+    if keyed_runs != len(counters["keys_used"]):
+        failures.append(f"{keyed_runs} keyed commands ran for {len(counters['keys_used'])} distinct keys")
+    if final_state["volume"] != counters["last_volume"]:
+        failures.append(f"final volume {final_state['volume']} != last submitted {counters['last_volume']}")
+    if max_seen[0] > args.max_depth:
+        failures.append(f"queue depth {max_seen[0]} exceeded max_depth {args.max_depth}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print(f"OK: no overlaps, each of {keyed_runs} keys ran once, latest volume won, depth bounded")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
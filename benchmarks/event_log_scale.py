@@ -0,0 +1,101 @@
+"""
+Event log at analytics scale: write months of synthetic usage, then query it.
+
+Generates --events events spread over --days days of sessions (frame
+summaries, gesture onsets and actions, with some actions undone right away as
+misfires), logs them through EventLog and reports:
+    log()      cost per call in the calling thread, i.e. what the live loop pays
+    write      time until everything is on disk, and bytes per event
+    read       read_events() over the whole log
+    summarize  summarize() of all events (misfires, hourly table, ...)
+
+Usage:
+    python -m benchmarks.event_log_scale --events 3000000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from event_log import EventLog, read_events, summarize
+
+GESTURES = ("play", "pause", "stop", "next", "previous", "seek_forward", "seek_backward", "volume")
+UNDO = {"play": "pause", "next": "previous", "seek_forward": "seek_backward"}
+
+
+def synthetic_events(n, days, seed=0):
+    """Yield (kind, session, gesture, action, hands, frames, hand_frames, value, ts) tuples in time order."""
+    rng = random.Random(seed)
+    start = time.time() - days * 86400
+    step = days * 86400 / n
+    ts = start
+    session = None
+    for i in range(n):
+        ts += step
+        if i % 2000 == 0:
+            session = f"s{i // 2000:07d}"
+        roll = rng.random()
+        if roll < 0.7:
+            yield "frames", session, None, None, None, 30, rng.randint(0, 30), None, ts
+        elif roll < 0.9:
+            yield "gesture", session, rng.choice(GESTURES), None, rng.randint(1, 2), 0, 0, None, ts
+        else:
+            action = rng.choice(GESTURES)
+            yield "action", session, action, action, None, 0, 0, None, ts
+            if action in UNDO and rng.random() < 0.1:
+                undo = UNDO[action]
+                yield "action", session, undo, undo, None, 0, 0, None, ts + 1.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write and query a large synthetic event log.")
+    parser.add_argument("--events", type=int, default=3_000_000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--dir", help="Log directory (default: a temporary one)")
+    args = parser.parse_args(argv)
+
+    temp_dir = None
+    directory = args.dir
+    if directory is None:
+        temp_dir = tempfile.TemporaryDirectory()
+        directory = temp_dir.name
+
+    log = EventLog(directory, batch_size=100_000)
+    logged = 0
+    spent = 0.0
+    start = time.perf_counter()
+    for kind, session, gesture, action, hands, frames, hand_frames, value, ts in synthetic_events(args.events,
+                                                                                                  args.days):
+        call = time.perf_counter()
+        log.log(kind, session, "benchmark", gesture=gesture, action=action, hands=hands,
+                frames=frames, hand_frames=hand_frames, value=value, ts=ts)
+        spent += time.perf_counter() - call
+        logged += 1
+    log.close()
+    written = time.perf_counter() - start
+    size = sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(directory) for f in files)
+    segments = len([d for d in os.listdir(directory) if d.startswith("segment-")])
+    print(f"log():     {spent / logged * 1e6:.2f} us per call in the caller ({logged} events)")
+    print(f"write:     {written:.1f}s until on disk, {size / logged:.1f} bytes/event, "
+          f"{size / 2 ** 20:.0f} MiB in {segments} segments")
+
+    start = time.perf_counter()
+    events = read_events(directory)
+    read = time.perf_counter() - start
+    start = time.perf_counter()
+    summary = summarize(events)
+    summarized = time.perf_counter() - start
+    print(f"read:      {read:.2f}s for {len(events)} events")
+    print(f"summarize: {summarized:.2f}s ({summary['sessions']} sessions, "
+          f"{int(summary['actions']['count'].sum())} actions, "
+          f"{int(summary['actions']['misfires'].sum())} misfires)")
+    if len(events) != logged:
+        print(f"FAIL: read {len(events)} events, logged {logged}")
+
+    if temp_dir is not None:
+        temp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
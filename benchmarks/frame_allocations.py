@@ -0,0 +1,104 @@
+"""
+Per-frame memory churn of the display frame path, before and after the buffer pool.
+
+"before" replays the original path: a new frame per read, a BGR->RGB copy for
+MediaPipe, a second conversion for display, a full-frame overlay copy and a
+full-frame addWeighted. "after" is detect_hands_in_video(rgb=True) plus
+draw_gesture_label. Both run MediaPipe on synthetic frames.
+
+NumPy/OpenCV arrays are traced by tracemalloc. The benchmark reports the peak of
+traced memory during one frame above what was live before it, i.e. the
+frame-sized buffers the path allocates and holds at the same time. The
+allocator recycles freed blocks, so this is a lower bound on the number of
+allocations: the original path allocates four frames per iteration but frees
+some before the next is created.
+
+Usage:
+    python -m benchmarks.frame_allocations --frames 200
+"""
+import argparse
+import time
+import tracemalloc
+
+import cv2
+
+from capture import SyntheticSource
+from media_controls import detect_hands_in_video, draw_gesture_label, hands, mp_draw, mp_hands
+
+
+def legacy_frames(source):
+    """The frame path as it was before the buffer pool, detection and display combined."""
+    while source.isOpened():
+        ret, frame = source.read()
+        if not ret:
+            break
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        results = hands.process(frame_rgb)
+        if results.multi_hand_landmarks:
+            for hand_landmarks in results.multi_hand_landmarks:
+                mp_draw.draw_landmarks(frame, hand_landmarks, mp_hands.HAND_CONNECTIONS)
+
+        label = "Gesture: play"
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        overlay = frame_rgb.copy()
+        text_position = (20, frame_rgb.shape[0] - 30)
+        cv2.putText(overlay, label, text_position, cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        x, y = text_position
+        text_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 1, 2)
+        cv2.rectangle(frame_rgb, (x - 10, y + 10), (x + text_size[0] + 10, y - text_size[1] - 10), (0, 0, 0), -1)
+        cv2.addWeighted(overlay, 0.8, frame_rgb, 0.2, 0, frame_rgb)
+        cv2.putText(frame_rgb, label, text_position, cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        yield frame_rgb
+
+
+def pooled_frames(source):
+    """The current path: one conversion, pooled buffers, region-only label blending."""
+    for frame_rgb, _ in detect_hands_in_video(source=source, rgb=True):
+        draw_gesture_label(frame_rgb, "Gesture: play")
+        yield frame_rgb
+
+
+def measure(frames, warmup=10):
+    """Return (mean ms per frame, mean peak of extra traced bytes per frame)."""
+    for _ in range(warmup):
+        next(frames)
+
+    times = []
+    peaks = []
+    tracemalloc.start()
+    try:
+        while True:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            start = time.perf_counter()
+            try:
+                next(frames)
+            except StopIteration:
+                break
+            times.append(time.perf_counter() - start)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+    finally:
+        tracemalloc.stop()
+        frames.close()
+
+    return sum(times) / len(times) * 1000, sum(peaks) / len(peaks)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    args = parser.parse_args(argv)
+
+    frame_bytes = args.width * args.height * 3
+    print(f"{'path':<8} {'ms/frame':>9} {'peak extra MB/frame':>20} {'frames at peak':>15}")
+    for name, path in (("before", legacy_frames), ("after", pooled_frames)):
+        source = SyntheticSource(args.width, args.height, fps=None, frames=args.frames + 10)
+        ms, peak = measure(path(source))
+        print(f"{name:<8} {ms:>9.2f} {peak / 1e6:>20.2f} {peak / frame_bytes:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Load test of the frame ingestion server (ingest_server.py): how many browser
+clients one recognition host can serve, and what that does to its memory.
+
+Starts ingest_server.py, then runs a series of load levels, each with the
+given number of WebSocket clients sending JPEG frames at --fps for --duration
+seconds, the way static/js/capture.js does but without its in-flight limit,
+so the server's latest-frame-wins dropping is exercised too. Frames come from
+--video or a synthetic clip, scaled to --width and encoded once up front.
+
+For each level it reports the answered frame rate per client (mean and
+slowest), the send-to-answer latency percentiles, the share of frames the
+server dropped, the share of frames run on the pool's static-image instances
+(by clients without a tracking lease), and the server's peak RSS and thread
+count. RSS should level off once the pool is fully built, whatever the
+number of clients.
+
+Usage:
+    python -m benchmarks.ingest_load --levels 1,4,12,24,48 --models 4 --fps 10
+    python -m benchmarks.ingest_load --video clip.mp4 --width 320 --one-hand
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+import psutil
+import requests
+from tornado.websocket import websocket_connect
+
+from benchmarks.load_test import free_port
+from capture import SyntheticSource, open_source
+
+
+def encode_frames(video, width, count, quality):
+    """JPEG-encode up to `count` frames of the video (or synthetic frames), scaled to `width`."""
+    source = open_source(video) if video else SyntheticSource(fps=None, frames=count)
+    frames = []
+    try:
+        while len(frames) < count:
+            ret, frame = source.read()
+            if not ret:
+                break
+            height = round(frame.shape[0] * width / frame.shape[1])
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+            ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            if ok:
+                frames.append(jpeg.tobytes())
+    finally:
+        source.release()
+    if not frames:
+        raise RuntimeError(f"No frames could be read from {video!r}")
+    return frames
+
+
+def start_server(port, models, static_models, workers, max_clients, one_hand):
+    """Start ingest_server.py and wait until /stats answers."""
+    command = [sys.executable, "ingest_server.py", "--port", str(port), "--models", str(models),
+               "--static-models", str(static_models), "--max-clients", str(max_clients)]
+    if workers:
+        command += ["--workers", str(workers)]
+    if one_hand:
+        command.append("--one-hand")
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"ingest_server.py exited with code {server.returncode}")
+        try:
+            requests.get(f"{url}/stats", timeout=1)
+            return server, url
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    server.kill()
+    raise RuntimeError("ingest_server.py did not start within 60s")
+
+
+async def client(url, frames, fps, duration, offset, answered, latencies, counts, errors):
+    """Send frames at `fps` for `duration` seconds; record the answer times, latencies and drops."""
+    try:
+        connection = await websocket_connect(url)
+    except Exception as e:
+        errors.append(str(e))
+        return
+    sent_at = {}
+    end = time.monotonic() + duration
+
+    async def receive():
+        while True:
+            message = await connection.read_message()
+            if message is None:
+                return
+            result = json.loads(message)
+            if "error" in result:
+                errors.append(result["error"])
+                continue
+            answered.append(time.monotonic())
+            latencies.append(time.monotonic() - sent_at.pop(result["frame"]))
+            counts["dropped"] = result["dropped"]
+
+    reader = asyncio.ensure_future(receive())
+    index = 0
+    next_send = time.monotonic()
+    while time.monotonic() < end and not reader.done():
+        sent_at[index] = time.monotonic()
+        await connection.write_message(frames[(offset + index) % len(frames)], binary=True)
+        index += 1
+        counts["sent"] = index
+        next_send += 1 / fps
+        await asyncio.sleep(max(0.0, next_send - time.monotonic()))
+    # Let the last answers arrive
+    await asyncio.sleep(0.5)
+    connection.close()
+    await reader
+
+
+def run_level(url, server_pid, clients, frames, fps, duration, warmup=2.0):
+    """Run one load level; returns its metrics dict."""
+    ws_url = url.replace("http://", "ws://") + "/ingest"
+    answered = [[] for _ in range(clients)]
+    counts = [{"sent": 0, "dropped": 0} for _ in range(clients)]
+    latencies, errors = [], []
+    process = psutil.Process(server_pid)
+    before = requests.get(f"{url}/stats", timeout=5).json()["pool"]["static_frames"]
+
+    async def level():
+        await asyncio.gather(*(client(ws_url, frames, fps, duration + warmup, i * 7, answered[i], latencies,
+                                      counts[i], errors)
+                               for i in range(clients)))
+
+    started = time.monotonic()
+    # Sample the server while the clients run
+    peak = {"rss": 0.0, "threads": 0}
+
+    async def sample():
+        while True:
+            peak["rss"] = max(peak["rss"], process.memory_info().rss / 2 ** 20)
+            peak["threads"] = max(peak["threads"], process.num_threads())
+            await asyncio.sleep(0.5)
+
+    async def main():
+        sampler = asyncio.ensure_future(sample())
+        await level()
+        sampler.cancel()
+
+    asyncio.run(main())
+    window_start = started + warmup
+    window_end = started + warmup + duration
+    after = requests.get(f"{url}/stats", timeout=5).json()["pool"]["static_frames"]
+    client_fps = [sum(window_start <= t < window_end for t in times) / duration for times in answered]
+    sent = sum(count["sent"] for count in counts)
+    return {
+        "clients": clients,
+        "fps": client_fps,
+        "latency_ms": np.array(latencies) * 1000,
+        "dropped": sum(count["dropped"] for count in counts) / max(sent, 1),
+        "static": (after - before) / max(sum(len(times) for times in answered), 1),
+        "rss": peak["rss"],
+        "threads": peak["threads"],
+        "errors": len(errors),
+    }
+
+
+def format_row(result):
+    fps = result["fps"]
+    latency = "/".join(f"{np.percentile(result['latency_ms'], q):.0f}" for q in (50, 95)) \
+        if len(result["latency_ms"]) else "-"
+    return (f"{result['clients']:>7} {sum(fps) / len(fps):>6.1f}/{min(fps):<5.1f} {latency:>11} "
+            f"{result['dropped']:>8.1%} {result['static']:>7.1%} {result['rss']:>8.0f} "
+            f"{result['threads']:>7} {result['errors']:>6}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the frame ingestion server.")
+    parser.add_argument("--levels", default="1,4,12,24,48", help="Client counts, comma-separated")
+    parser.add_argument("--fps", type=float, default=10.0, help="Frames per second each client sends")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per level")
+    parser.add_argument("--video", help="Clip to take the frames from (default: synthetic frames)")
+    parser.add_argument("--width", type=int, default=320, help="Width the frames are scaled to")
+    parser.add_argument("--quality", type=int, default=70, help="JPEG quality")
+    parser.add_argument("--models", type=int, default=4, help="Server's --models")
+    parser.add_argument("--static-models", type=int, default=2, help="Server's --static-models")
+    parser.add_argument("--workers", type=int, default=None, help="Server's --workers")
+    parser.add_argument("--one-hand", action="store_true")
+    args = parser.parse_args(argv)
+    levels = [int(level) for level in args.levels.split(",")]
+
+    frames = encode_frames(args.video, args.width, 60, args.quality)
+    print(f"{len(frames)} frames of {sum(map(len, frames)) / len(frames) / 1024:.1f} KiB on average")
+    server, url = start_server(free_port(), args.models, args.static_models, args.workers, max(levels), args.one_hand)
+    try:
+        print(f"{'clients':>7} {'fps mean/min':>12} {'ms p50/p95':>11} {'dropped':>8} {'static':>7} "
+              f"{'rss MiB':>8} {'threads':>7} {'errors':>6}")
+        for clients in levels:
+            print(format_row(run_level(url, server.pid, clients, frames, args.fps, args.duration)), flush=True)
+    finally:
+        server.terminate()
+        try:
+            server.wait(10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+if __name__ == "__main__":
+    main()
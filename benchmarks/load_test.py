@@ -0,0 +1,264 @@
+"""
+Local load test of the web UI server (web_app.py): how many viewers and
+controllers one host can serve.
+
+Starts web_app.py on a replayed video (looped at its own frame rate, so the
+recognizer sees a steady "camera"), then runs a series of load levels. Each
+level runs for --duration seconds with:
+    viewers   clients reading /video_feed, counting MJPEG frames
+    pollers   clients fetching /status every --poll-interval seconds (like script.js)
+    clickers  clients calling /control/<action> every --click-interval seconds
+For each level it reports /status and /control latency percentiles, stream
+fps per viewer (mean and slowest), the server's CPU use, and the recognizer's
+own frame rate as reported by /status. The first level whose recognizer fps
+falls more than --drop below the first level's is reported as the knee.
+
+Without --video a short synthetic clip is written to a temporary file. Audio
+goes to SDL's dummy driver unless SDL_AUDIODRIVER is set.
+
+Usage:
+    python -m benchmarks.load_test --levels 1:1:1,4:4:1,8:8:2,16:16:4 --duration 10
+    python -m benchmarks.load_test --video clip.mp4 --one-hand
+"""
+import argparse
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import numpy as np
+import psutil
+import requests
+
+BOUNDARY = b"--frame\r\n"
+CONTROL_ACTIONS = ("play", "volume_up", "volume_down", "volume")
+
+
+def write_synthetic_video(path, seconds=10, fps=30):
+    """Write a synthetic clip to `path` for the server to replay."""
+    import cv2
+
+    from capture import SyntheticSource
+
+    source = SyntheticSource(fps=None, frames=seconds * fps)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (source.width, source.height))
+    while True:
+        ret, frame = source.read()
+        if not ret:
+            break
+        writer.write(frame)
+    writer.release()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(video, port, songs, one_hand):
+    """Start web_app.py on the replayed video and wait until /status answers."""
+    env = dict(os.environ, SDL_AUDIODRIVER=os.environ.get("SDL_AUDIODRIVER", "dummy"))
+    command = [sys.executable, "web_app.py", "--source", video, "--replay", "--port", str(port), "--songs", songs]
+    if one_hand:
+        command.append("--one-hand")
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"web_app.py exited with code {server.returncode}")
+        try:
+            # Wait for the recognizer too, not just the HTTP server
+            if requests.get(f"{url}/status", timeout=1).json().get("recognizer_fps"):
+                return server, url
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    server.kill()
+    raise RuntimeError("web_app.py did not start within 60s")
+
+
+def viewer(url, stop, frame_times):
+    """Read /video_feed and record the arrival time of every frame."""
+    try:
+        with requests.get(f"{url}/video_feed", stream=True, timeout=5) as response:
+            tail = b""
+            for chunk in response.iter_content(chunk_size=16384):
+                data = tail + chunk
+                count = data.count(BOUNDARY)
+                if count:
+                    now = time.monotonic()
+                    frame_times.extend([now] * count)
+                # Keep enough bytes to catch a boundary split between chunks
+                tail = data[-(len(BOUNDARY) - 1):]
+                if stop.is_set():
+                    break
+    except requests.RequestException as e:
+        print(f"viewer error: {e}")
+
+
+def poller(url, stop, interval, latencies, errors, fps_samples):
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            response = requests.get(f"{url}/status", timeout=5)
+            latencies.append(time.perf_counter() - start)
+            if response.ok:
+                fps_samples.append(response.json().get("recognizer_fps", 0.0))
+            else:
+                errors.append(response.status_code)
+        except requests.RequestException:
+            errors.append("timeout")
+        stop.wait(interval)
+
+
+def clicker(url, stop, interval, latencies, errors, seed):
+    rng = random.Random(seed)
+    while not stop.is_set():
+        action = rng.choice(CONTROL_ACTIONS)
+        params = {"value": rng.randint(20, 80)} if action == "volume" else None
+        headers = {"Idempotency-Key": uuid.uuid4().hex}
+        start = time.perf_counter()
+        try:
+            response = requests.get(f"{url}/control/{action}", params=params, headers=headers, timeout=5)
+            latencies.append(time.perf_counter() - start)
+            if not response.ok:
+                errors.append(response.status_code)
+        except requests.RequestException:
+            errors.append("timeout")
+        stop.wait(interval)
+
+
+def run_level(url, server_pid, viewers, pollers, clickers, duration, poll_interval, click_interval, warmup=1.0):
+    """Run one load level; returns its metrics dict."""
+    stop = threading.Event()
+    frame_times = [[] for _ in range(viewers)]
+    status_latencies, control_latencies, errors, fps_samples = [], [], [], []
+    threads = [threading.Thread(target=viewer, args=(url, stop, frame_times[i]), daemon=True)
+               for i in range(viewers)]
+    threads += [threading.Thread(target=poller, args=(url, stop, poll_interval, status_latencies, errors, fps_samples),
+                                 daemon=True) for _ in range(pollers)]
+    threads += [threading.Thread(target=clicker, args=(url, stop, click_interval, control_latencies, errors, i),
+                                 daemon=True) for i in range(clickers)]
+    # Recognizer fps is sampled separately so it is known even without pollers
+    recognizer = []
+    threads.append(threading.Thread(target=poller, args=(url, stop, 0.5, [], [], recognizer), daemon=True))
+
+    process = psutil.Process(server_pid) if server_pid else None
+    for t in threads:
+        t.start()
+    time.sleep(warmup)
+    if process is not None:
+        process.cpu_percent(None)
+    window_start = time.monotonic()
+    recognizer_start = len(recognizer)
+    time.sleep(duration)
+    window_end = time.monotonic()
+    cpu = process.cpu_percent(None) if process is not None else None
+    stop.set()
+    for t in threads:
+        t.join(6)
+
+    stream_fps = [sum(window_start <= t < window_end for t in times) / (window_end - window_start)
+                  for times in frame_times]
+    return {
+        "viewers": viewers, "pollers": pollers, "clickers": clickers,
+        "status_ms": np.array(status_latencies) * 1000,
+        "control_ms": np.array(control_latencies) * 1000,
+        "errors": len(errors),
+        "stream_fps": stream_fps,
+        "cpu": cpu,
+        "recognizer_fps": statistics.median(recognizer[recognizer_start:] or [0.0]),
+    }
+
+
+def _percentiles(values):
+    if not len(values):
+        return "-"
+    return "/".join(f"{np.percentile(values, q):.0f}" for q in (50, 95, 99))
+
+
+def format_row(result):
+    fps = result["stream_fps"]
+    stream = f"{statistics.mean(fps):.1f}/{min(fps):.1f}" if fps else "-"
+    cpu = f"{result['cpu']:.0f}%" if result["cpu"] is not None else "-"
+    return (f"{result['viewers']:>3}:{result['pollers']}:{result['clickers']:<4} "
+            f"{_percentiles(result['status_ms']):>14} {_percentiles(result['control_ms']):>14} "
+            f"{stream:>11} {cpu:>6} {result['recognizer_fps']:>7.1f} {result['errors']:>6}")
+
+
+def parse_levels(text):
+    """"V:P:C,..." -> [(viewers, pollers, clickers), ...]"""
+    levels = []
+    for part in text.split(","):
+        viewers, pollers, clickers = (int(n) for n in part.split(":"))
+        levels.append((viewers, pollers, clickers))
+    return levels
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the web UI server locally.")
+    parser.add_argument("--levels", default="0:1:0,1:1:1,2:2:1,4:4:1,8:8:2,16:16:4",
+                        help="Comma-separated viewers:pollers:clickers per level")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per level")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between /status polls per poller")
+    parser.add_argument("--click-interval", type=float, default=0.5, help="Seconds between controls per clicker")
+    parser.add_argument("--drop", type=float, default=0.1,
+                        help="Recognizer fps drop (fraction of the first level's) that marks the knee")
+    parser.add_argument("--video", help="Video to replay (default: a synthetic clip)")
+    parser.add_argument("--songs", default="songs", help="Song folder for the server")
+    parser.add_argument("--one-hand", action="store_true", help="Run the server in one-hand mode")
+    parser.add_argument("--url", help="Test an already running server instead (no CPU figures)")
+    args = parser.parse_args(argv)
+
+    levels = parse_levels(args.levels)
+    server = None
+    temp_dir = None
+    if args.url:
+        url = args.url.rstrip("/")
+    else:
+        video = args.video
+        if video is None:
+            temp_dir = tempfile.TemporaryDirectory()
+            video = os.path.join(temp_dir.name, "replay.mp4")
+            write_synthetic_video(video)
+        server, url = start_server(video, free_port(), args.songs, args.one_hand)
+
+    print(f"{'V:P:C':<9} {'status ms p50/95/99':>14} {'control ms p50/95/99':>14} "
+          f"{'fps avg/min':>11} {'cpu':>6} {'recog':>7} {'errors':>6}")
+    try:
+        results = []
+        for viewers, pollers, clickers in levels:
+            result = run_level(url, server.pid if server else None, viewers, pollers, clickers,
+                               args.duration, args.poll_interval, args.click_interval)
+            results.append(result)
+            print(format_row(result), flush=True)
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+    baseline = results[0]["recognizer_fps"]
+    knee = next((r for r in results[1:] if r["recognizer_fps"] < baseline * (1 - args.drop)), None)
+    if knee is None:
+        print(f"Recognizer held {baseline:.1f} fps at every level")
+    else:
+        print(f"Recognizer fps dropped below {baseline * (1 - args.drop):.1f} at "
+              f"{knee['viewers']} viewers, {knee['pollers']} pollers, {knee['clickers']} clickers "
+              f"({knee['recognizer_fps']:.1f} fps)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Cost of the sampling profiler on the detection loop.
+
+Runs detect_hands_in_video on unpaced synthetic frames for --frames frames,
+first without the profiler and then with it sampling at each --intervals
+value. Each setting runs --repeat times and keeps its best frame rate, since
+MediaPipe's speed varies from run to run. It reports that frame rate, the slowdown against the unprofiled
+run, and the sampler's own busy time. The last run's collapsed stacks and
+summary are written to --output.
+
+Usage:
+    python -m benchmarks.profiler_overhead --frames 600 --intervals 0.01,0.001
+"""
+import argparse
+import tempfile
+import time
+
+from capture import SyntheticSource
+from media_controls import detect_hands_in_video, warm_up
+from sampling_profiler import SamplingProfiler
+
+
+def run_loop(frames):
+    """Frames per second of the detection loop over `frames` synthetic frames."""
+    start = time.perf_counter()
+    for _ in detect_hands_in_video(source=SyntheticSource(fps=None, frames=frames)):
+        pass
+    return frames / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the sampling profiler's overhead on the detection loop.")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per setting (the best one counts)")
+    parser.add_argument("--intervals", default="0.01,0.001", help="Sampling intervals in seconds")
+    parser.add_argument("--output", help="Directory for the last profile (default: a temporary one)")
+    args = parser.parse_args(argv)
+
+    warm_up()
+    run_loop(30)
+    base = max(run_loop(args.frames) for _ in range(args.repeat))
+    print(f"{'interval':>9} {'fps':>7} {'slowdown':>9} {'samples':>8} {'sampler busy':>13}")
+    print(f"{'off':>9} {base:>7.1f} {'':>9} {'':>8} {'':>13}")
+    profiler = None
+    for interval in (float(value) for value in args.intervals.split(",")):
+        profiler = SamplingProfiler(interval)
+        profiler.start()
+        fps = max(run_loop(args.frames) for _ in range(args.repeat))
+        profiler.stop()
+        elapsed = profiler.stopped - profiler.started
+        print(f"{interval * 1000:>7g}ms {fps:>7.1f} {1 - fps / base:>9.1%} {profiler.samples:>8} "
+              f"{profiler.sampler_time / elapsed:>13.2%}", flush=True)
+
+    if profiler is not None:
+        directory = args.output or tempfile.mkdtemp(prefix="profile-")
+        collapsed, summary = profiler.save(directory, top=10)
+        print(f"\nLast profile: {collapsed}\n")
+        print(profiler.format_summary(top=10))
+
+
+if __name__ == "__main__":
+    main()
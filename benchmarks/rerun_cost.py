@@ -0,0 +1,158 @@
+"""
+Cost of the Streamlit app's reruns: time and bytes per interaction.
+
+Starts `streamlit run app.py` and talks to it the way the browser does: over
+the /_stcore/stream WebSocket, sending a rerun request with the widget states
+of each interaction and reading the ForwardMsgs until the run finishes. For
+each interaction it reports:
+    ms        from the request to the script_finished message
+    bytes     sent by the server for the run
+    deltas    elements (re)sent
+    by ref    of those, sent as a reference to a message the browser already has
+              (Streamlit's ForwardMsg cache), i.e. not sent again
+The interactions are the first load, a rerun without changes, the playback
+buttons, and a library search, each --repeat times (the median is reported).
+The webcam loop is not measured: its run doesn't finish while the webcam is on.
+The server reads .streamlit/config.toml from the repository root, as
+`streamlit run app.py` does there; move it aside to measure without it.
+
+Audio goes to SDL's dummy driver unless SDL_AUDIODRIVER is set.
+
+Usage:
+    python -m benchmarks.rerun_cost --repeat 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from tornado.websocket import websocket_connect
+
+from benchmarks.load_test import free_port
+
+# (name, widget to trigger by label or key, value) in order; None triggers nothing
+INTERACTIONS = (
+    ("first load", None, None),
+    ("rerun", None, None),
+    ("play", "▶️", True),
+    ("pause", "⏸️", True),
+    ("next", "⏭️", True),
+    ("search", "library_query", "a"),
+    ("clear search", "library_query", ""),
+    ("stop", "⏹️", True),
+)
+
+
+def start_server(port):
+    """Start the app and wait until its health endpoint answers."""
+    env = dict(os.environ, SDL_AUDIODRIVER=os.environ.get("SDL_AUDIODRIVER", "dummy"))
+    command = [sys.executable, "-m", "streamlit", "run", "app.py", "--server.headless", "true",
+               "--server.port", str(port), "--browser.gatherUsageStats", "false"]
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"streamlit exited with code {server.returncode}")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/_stcore/health", timeout=1).ok:
+                return server
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    server.kill()
+    raise RuntimeError("streamlit did not start within 60s")
+
+
+class Session:
+    """One browser session: the socket and the ids of the widgets seen so far."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.widgets = {}  # label or key -> (widget id, kind)
+
+    def _remember(self, element):
+        kind = element.WhichOneof("type")
+        widget = getattr(element, kind, None)
+        if widget is None or not hasattr(widget, "id") or not widget.id:
+            return
+        self.widgets[widget.label] = (widget.id, kind)
+        # Widget ids of keyed widgets end with their key
+        key = widget.id.rsplit("-", 1)[-1]
+        self.widgets.setdefault(key, (widget.id, kind))
+
+    async def rerun(self, widget=None, value=None):
+        """Request a run with `widget` set to `value`; returns (seconds, bytes, deltas, by reference)."""
+        message = BackMsg()
+        message.rerun_script.query_string = ""
+        message.rerun_script.page_script_hash = ""
+        if widget is not None:
+            widget_id, kind = self.widgets[widget]
+            state = message.rerun_script.widget_states.widgets.add()
+            state.id = widget_id
+            if kind == "button":
+                state.trigger_value = value
+            else:
+                state.string_value = value
+        start = time.perf_counter()
+        await self.connection.write_message(message.SerializeToString(), binary=True)
+        size = deltas = references = 0
+        while True:
+            data = await self.connection.read_message()
+            if data is None:
+                raise RuntimeError("the server closed the connection")
+            size += len(data)
+            forward = ForwardMsg()
+            forward.ParseFromString(data)
+            kind = forward.WhichOneof("type")
+            if kind == "ref_hash":
+                deltas += 1
+                references += 1
+            elif kind == "delta":
+                deltas += 1
+                if forward.delta.WhichOneof("type") == "new_element":
+                    self._remember(forward.delta.new_element)
+            elif kind == "script_finished":
+                return time.perf_counter() - start, size, deltas, references
+
+
+async def measure(port, repeat):
+    results = {name: [] for name, _, _ in INTERACTIONS}
+    for _ in range(repeat):
+        # A fresh session each round, so "first load" is a first load
+        session = Session(await websocket_connect(f"ws://127.0.0.1:{port}/_stcore/stream"))
+        for name, widget, value in INTERACTIONS:
+            results[name].append(await session.rerun(widget, value))
+        session.connection.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the Streamlit app's rerun time and payload.")
+    parser.add_argument("--repeat", type=int, default=5, help="Sessions to run (medians are reported)")
+    args = parser.parse_args(argv)
+
+    port = free_port()
+    server = start_server(port)
+    try:
+        results = asyncio.run(measure(port, args.repeat))
+    finally:
+        server.terminate()
+        try:
+            server.wait(10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    print(f"{'interaction':<14} {'ms':>7} {'bytes':>8} {'deltas':>7} {'by ref':>7}")
+    for name, runs in results.items():
+        columns = [statistics.median(run[i] for run in runs) for i in range(4)]
+        print(f"{name:<14} {columns[0] * 1000:>7.1f} {columns[1]:>8.0f} {columns[2]:>7.0f} {columns[3]:>7.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Long-running soak test of the capture, inference and playback lifecycle.
+
+Replays a recorded clip (--video, default: a synthetic one) through
+media_controls.detect_hands_in_video in short sessions, for hours, and ends
+every session a different way, the way the app, the web server and headless
+runs do:
+    close       the caller stops early and closes the generator
+    abandon     the caller breaks out and drops the generator (Stop, a rerun)
+    error       the caller raises in the middle of the loop
+    exhaust     the session runs until its source ends
+Every --utils-every sessions run through mediapipe_utils.detect_hands_in_video
+and every --multiprocess-every sessions through the shared-memory pipeline
+(frame_ring) instead, and every --rebuild-every sessions close both modules'
+shared Hands models so they are built again. Each session also starts a player, plays
+a short song and closes the player.
+
+After every session it records the process's RSS, open file descriptors,
+threads and child processes. Once the first --settle sessions have warmed the
+caches up, these must stay flat: at the end, threads and children must be back
+at the baseline, descriptors within --fd-slack, and RSS within --rss-slack MiB.
+It exits with status 1 otherwise.
+
+Usage:
+    python -m benchmarks.soak_test --hours 4
+    python -m benchmarks.soak_test --sessions 200 --video recordings/kitchen.mp4
+"""
+import argparse
+import gc
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import wave
+
+import psutil
+
+from benchmarks.load_test import write_synthetic_video
+from capture import open_source
+from frame_ring import detect_hands_multiprocess
+import mediapipe_utils
+from media_controls import close_hands_models, detect_hands_in_video
+from player import MediaPlayer
+
+ENDINGS = ("close", "abandon", "error", "exhaust")
+
+
+class SessionError(Exception):
+    """Raised by the consumer to end an "error" session."""
+
+
+def write_song(path, seconds=1.0, rate=22050):
+    """Write a short silent WAV file."""
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(b"\0\0" * int(seconds * rate))
+
+
+def run_session(video, frames, ending, pipeline):
+    """One capture -> inference session of `frames` frames through `pipeline`, ended the given way."""
+    if pipeline == "frame_ring":
+        # Every frame, as for video files: an unpaced clip would overwrite the
+        # ring's slots before their results come back if frames could be dropped
+        generator = detect_hands_multiprocess(source=video, source_options={"loop": ending != "exhaust"},
+                                              drop_frames=False)
+    else:
+        source = open_source(video, loop=ending != "exhaust")
+        if pipeline == "mediapipe_utils":
+            generator = mediapipe_utils.detect_hands_in_video(None, source=source)
+        else:
+            generator = detect_hands_in_video(source=source, annotate=True)
+    try:
+        for count, _ in enumerate(generator, 1):
+            if count < frames:
+                continue
+            if ending == "error":
+                raise SessionError
+            if ending == "close":
+                generator.close()
+            if ending != "exhaust":
+                break
+    except SessionError:
+        pass
+    # "abandon": the generator is simply dropped here
+    del generator
+
+
+def run_player(songs):
+    player = MediaPlayer(song_folder=songs, volume=50)
+    player.load_songs()
+    player.play(0)
+    player.set_volume(30)
+    player.update()
+    player.close()
+
+
+def snapshot(process):
+    gc.collect()
+    return {
+        "rss": process.memory_info().rss / 2 ** 20,
+        "fds": process.num_fds() if hasattr(process, "num_fds") else process.num_handles(),
+        "threads": process.num_threads(),
+        "children": len(process.children()),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Soak-test the pipeline's resource lifecycle.")
+    parser.add_argument("--hours", type=float, default=2.0)
+    parser.add_argument("--sessions", type=int, help="Stop after this many sessions (before --hours if sooner)")
+    parser.add_argument("--video", help="Recorded clip to replay (default: a synthetic one)")
+    parser.add_argument("--min-frames", type=int, default=20)
+    parser.add_argument("--max-frames", type=int, default=200)
+    parser.add_argument("--utils-every", type=int, default=3, help="0 to never use mediapipe_utils")
+    parser.add_argument("--multiprocess-every", type=int, default=10, help="0 to never use frame_ring")
+    parser.add_argument("--rebuild-every", type=int, default=25, help="0 to keep the models")
+    parser.add_argument("--settle", type=int, default=10, help="Sessions before the baseline is taken")
+    parser.add_argument("--window", type=int, default=5, help="Sessions averaged for the baseline and the end")
+    parser.add_argument("--rss-slack", type=float, default=40.0, help="Allowed RSS growth in MiB")
+    parser.add_argument("--fd-slack", type=int, default=2)
+    parser.add_argument("--report", type=float, default=60.0, help="Seconds between progress lines")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    rng = random.Random(args.seed)
+    process = psutil.Process()
+    with tempfile.TemporaryDirectory() as temp:
+        video = args.video
+        if video is None:
+            video = os.path.join(temp, "soak.mp4")
+            write_synthetic_video(video, seconds=5)
+        songs = os.path.join(temp, "songs")
+        os.makedirs(songs)
+        write_song(os.path.join(songs, "silence.wav"))
+
+        samples = []
+        end = time.time() + args.hours * 3600
+        last_report = 0.0
+        session = 0
+        print(f"{'session':>7} {'elapsed':>8} {'rss MiB':>8} {'fds':>5} {'threads':>7} {'children':>8}")
+        while time.time() < end and (args.sessions is None or session < args.sessions):
+            session += 1
+            if args.multiprocess_every and session % args.multiprocess_every == 0:
+                pipeline = "frame_ring"
+            elif args.utils_every and session % args.utils_every == 0:
+                pipeline = "mediapipe_utils"
+            else:
+                pipeline = "media_controls"
+            ending = ENDINGS[session % len(ENDINGS)]
+            run_session(video, rng.randint(args.min_frames, args.max_frames), ending, pipeline)
+            run_player(songs)
+            if args.rebuild_every and session % args.rebuild_every == 0:
+                close_hands_models()
+                mediapipe_utils.close_models()
+            samples.append(snapshot(process))
+            if time.monotonic() - last_report >= args.report:
+                last_report = time.monotonic()
+                s = samples[-1]
+                elapsed = args.hours * 3600 - (end - time.time())
+                print(f"{session:>7} {elapsed / 60:>7.1f}m {s['rss']:>8.1f} {s['fds']:>5} {s['threads']:>7} "
+                      f"{s['children']:>8}", flush=True)
+
+    if len(samples) < args.settle + 2 * args.window:
+        print(f"Too few sessions ({len(samples)}) for a verdict, need {args.settle + 2 * args.window}")
+        return 1
+
+    def window(rows, key):
+        return statistics.median(row[key] for row in rows)
+
+    baseline = samples[args.settle:args.settle + args.window]
+    final = samples[-args.window:]
+    limits = {"rss": args.rss_slack, "fds": args.fd_slack, "threads": 0, "children": 0}
+    failed = False
+    print(f"\n{len(samples)} sessions")
+    for key, limit in limits.items():
+        growth = window(final, key) - window(baseline, key)
+        ok = growth <= limit
+        failed |= not ok
+        print(f"{key:<9} {window(baseline, key):>9.1f} -> {window(final, key):>9.1f} "
+              f"(growth {growth:+.1f}, limit {limit:g})  {'ok' if ok else 'FAIL'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
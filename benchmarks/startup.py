@@ -0,0 +1,81 @@
+"""
+Cold-start timings of the Streamlit app, each run in a fresh Python process.
+
+first render:  running app.py once (Streamlit's AppTest), i.e. everything the
+               script imports and builds before the page is on screen.
+first gesture: after waiting --click-delay seconds (the user looking at the
+               page), the time from "Start" to the first frame through hand
+               detection: importing media_controls and running one frame.
+
+Compare against another checkout (e.g. a `git worktree` of an older commit)
+with --tree.
+
+Usage:
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --tree /tmp/baseline
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Runs inside the fresh process, from the tree being measured
+_PROBE = """
+import json, sys, time
+sys.path.insert(0, ".")
+from streamlit.testing.v1 import AppTest
+
+app = AppTest.from_file("app.py", default_timeout=120)
+start = time.perf_counter()
+app.run()
+first_render = time.perf_counter() - start
+errors = [e.value for e in app.exception]
+
+time.sleep({click_delay})
+start = time.perf_counter()
+from capture import SyntheticSource
+from media_controls import detect_hands_in_video
+frames = detect_hands_in_video(source=SyntheticSource(fps=None, frames=1), annotate=False)
+next(frames)
+first_gesture = time.perf_counter() - start
+frames.close()
+
+print(json.dumps({{"first_render": first_render, "first_gesture": first_gesture, "errors": errors}}))
+"""
+
+
+def measure(tree, click_delay):
+    """Run the probe once in a new interpreter; returns its result dict."""
+    env = dict(os.environ, SDL_AUDIODRIVER=os.environ.get("SDL_AUDIODRIVER", "dummy"))
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(click_delay=click_delay)],
+        cwd=tree, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--click-delay", type=float, default=2.0,
+                        help="Seconds between the first render and clicking Start")
+    parser.add_argument("--tree", action="append",
+                        help="Checkout to measure (repeatable; default: this one)")
+    args = parser.parse_args(argv)
+
+    trees = args.tree or [os.getcwd()]
+    print(f"{'tree':<40} {'first render ms':>16} {'first gesture ms':>17}")
+    for tree in trees:
+        runs = [measure(tree, args.click_delay) for _ in range(args.runs)]
+        for run in runs:
+            if run["errors"]:
+                print(f"{tree}: app raised {run['errors'][0]}")
+        render = statistics.median(run["first_render"] for run in runs) * 1000
+        gesture = statistics.median(run["first_gesture"] for run in runs) * 1000
+        print(f"{tree:<40} {render:>16.0f} {gesture:>17.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Throughput of the multi-zone supervisor as zones are added.
+
+Runs 1, 2, 4, ... zones (up to --max-zones, default the number of cores), each
+a worker process reading unpaced synthetic frames through the full headless
+pipeline, and reports total and per-zone frames per second, plus the scaling
+efficiency against one zone. Throughput should grow roughly linearly until
+the cores are saturated.
+
+Usage:
+    python -m benchmarks.supervisor_scaling --duration 10
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from supervisor import Supervisor
+
+
+def measure(zones, duration, warmup, threads):
+    """Total frames per second of `zones` synthetic zones, and their per-zone rates."""
+    supervisor = Supervisor(zones, threads_per_worker=threads, startup_grace=120.0)
+    supervisor.start()
+    try:
+        # Wait until every worker produces frames, then let them settle
+        deadline = time.time() + 120
+        while time.time() < deadline and not all(w.heartbeat.value for w in supervisor.workers):
+            time.sleep(0.2)
+            supervisor.check()
+        time.sleep(warmup)
+        start_frames = [w.frames.value for w in supervisor.workers]
+        start = time.perf_counter()
+        time.sleep(duration)
+        elapsed = time.perf_counter() - start
+        rates = [(w.frames.value - f) / elapsed for w, f in zip(supervisor.workers, start_frames)]
+    finally:
+        supervisor.stop()
+    return sum(rates), rates
+
+
+def main(argv=None):
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    parser = argparse.ArgumentParser(description="Measure supervisor throughput against the number of zones.")
+    parser.add_argument("--max-zones", type=int, default=cores)
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per zone count")
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--threads", type=int, default=1, help="Thread pool size per library in each worker")
+    args = parser.parse_args(argv)
+
+    counts = [1]
+    while counts[-1] * 2 <= args.max_zones:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != args.max_zones:
+        counts.append(args.max_zones)
+
+    print(f"{cores} cores")
+    print(f"{'zones':>5} {'total fps':>10} {'per zone':>9} {'efficiency':>10}")
+    with tempfile.TemporaryDirectory() as songs:
+        base = None
+        for n in counts:
+            zones = [{"name": f"zone{i}", "source": "synthetic", "camera_mode": "@0", "songs": songs,
+                      "event_log": "", "volume_gesture": "off"} for i in range(n)]
+            total, rates = measure(zones, args.duration, args.warmup, args.threads)
+            base = base or total
+            print(f"{n:>5} {total:>10.1f} {total / n:>9.1f} {total / (base * n):>10.0%}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
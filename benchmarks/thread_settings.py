@@ -0,0 +1,182 @@
+"""
+Find the thread and CPU placement settings that suit a core count.
+
+Runs --pipelines concurrent pipelines (default: one per core), each a process
+running detect_hands_in_video on a synthetic camera, within a budget of
+--cores CPUs. It repeats this for every combination of:
+    cv threads   cv2.setNumThreads (default: OpenCV's default, 1, and cores per pipeline)
+    omp threads  OMP_NUM_THREADS & co. (default: library default and 1)
+    layout       shared:  every pipeline may use every CPU in the budget
+                 pinned:  each pipeline gets its own slice of the budget
+                 split:   each pipeline's slice is split between capture and inference
+It then reports the delivered frame rate and the per-frame latency from read to
+annotated frame (p50/p99/max over all pipelines). Settings go to the workers through the
+GESTURE_PLAYER_* variables (see runtime_config), so the pipeline code sees
+them exactly as in production. The recommendation is the setting with the
+lowest p99 that still delivers the camera rate, or the highest throughput with --fps 0.
+
+Usage:
+    python -m benchmarks.thread_settings --cores 4 --pipelines 3 --duration 8
+"""
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from runtime_config import RuntimeConfig, format_cpus, parse_cpus
+
+LAYOUTS = ("shared", "pinned", "split")
+
+
+def run_worker(args):
+    """One pipeline: print its frame rate and latency percentiles as JSON."""
+    if args.cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, parse_cpus(args.cpus))
+
+    from capture import SyntheticSource
+    from media_controls import detect_hands_in_video
+
+    source = SyntheticSource(fps=args.fps or None)
+    latencies = []
+    start = None
+    frames = 0
+    for frame, landmarks, trace in detect_hands_in_video(source=source, trace=True):
+        now = time.perf_counter()
+        if start is None:
+            # The first frame includes building the model
+            start = now + args.warmup
+            continue
+        if now < start:
+            continue
+        frames += 1
+        latencies.append((now - trace.stamps["read"]) * 1000)
+        if now - start >= args.duration:
+            break
+    elapsed = time.perf_counter() - start
+    latencies = np.array(latencies)
+    print(json.dumps({
+        "fps": frames / elapsed,
+        "p50": float(np.percentile(latencies, 50)),
+        "p99": float(np.percentile(latencies, 99)),
+        "max": float(latencies.max()),
+    }))
+
+
+def layout_affinity(layout, budget, pipelines):
+    """Per-pipeline stage affinity for a layout, or None if the budget is too small for it."""
+    if layout == "shared":
+        return [{} for _ in range(pipelines)]
+    size = len(budget) // pipelines
+    if size < (2 if layout == "split" else 1):
+        return None
+    slices = [budget[i * size:(i + 1) * size] for i in range(pipelines)]
+    if layout == "pinned":
+        return [{"capture": cpus, "inference": cpus} for cpus in slices]
+    # split: one CPU for reading/drawing, the rest for MediaPipe's graph
+    return [{"capture": cpus[:1], "inference": cpus[1:]} for cpus in slices]
+
+
+def measure(config, affinities, budget, args):
+    """Run the pipelines with one setting and combine their reports."""
+    processes = []
+    for affinity in affinities:
+        worker_config = RuntimeConfig(config.cv_threads, config.omp_threads, affinity=affinity)
+        env = dict(os.environ)
+        for name in ("GESTURE_PLAYER_CV_THREADS", "GESTURE_PLAYER_OMP_THREADS", "GESTURE_PLAYER_AFFINITY",
+                     "GESTURE_PLAYER_NICE", "OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+            env.pop(name, None)
+        env.update(worker_config.to_env())
+        command = [sys.executable, "-m", "benchmarks.thread_settings", "--worker", "--cpus", format_cpus(budget),
+                   "--fps", str(args.fps), "--duration", str(args.duration), "--warmup", str(args.warmup)]
+        processes.append(subprocess.Popen(command, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                          text=True))
+    reports = []
+    for process in processes:
+        try:
+            out, err = process.communicate(timeout=args.duration + args.warmup + 120)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            out, err = process.communicate()
+        if process.returncode != 0 or not out.strip():
+            print(f"Worker failed ({process.returncode}):\n{err[-2000:]}", file=sys.stderr)
+            return None
+        reports.append(json.loads(out.strip().splitlines()[-1]))
+    return {
+        "fps": sum(r["fps"] for r in reports),
+        "min_fps": min(r["fps"] for r in reports),
+        "p50": float(np.median([r["p50"] for r in reports])),
+        "p99": max(r["p99"] for r in reports),
+        "max": max(r["max"] for r in reports),
+    }
+
+
+def _int_list(text):
+    return [None if part == "default" else int(part) for part in text.split(",")]
+
+
+def main(argv=None):
+    allowed = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count()))
+    parser = argparse.ArgumentParser(description="Compare thread-count and CPU-affinity settings.")
+    parser.add_argument("--cores", type=int, default=len(allowed), help="CPUs the pipelines may use")
+    parser.add_argument("--pipelines", type=int, help="Concurrent pipelines (default: one per core)")
+    parser.add_argument("--fps", type=float, default=30.0, help="Camera rate per pipeline (0: as fast as possible)")
+    parser.add_argument("--duration", type=float, default=8.0, help="Measured seconds per setting")
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--cv-threads", type=_int_list, help="e.g. default,1,2")
+    parser.add_argument("--omp-threads", type=_int_list, default=[None, 1], help="e.g. default,1")
+    parser.add_argument("--layouts", default=",".join(LAYOUTS))
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--cpus", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    budget = allowed[:args.cores]
+    pipelines = args.pipelines or len(budget)
+    per_pipeline = max(1, len(budget) // pipelines)
+    cv_threads = args.cv_threads or list(dict.fromkeys([None, 1, per_pipeline]))
+
+    rate = f"{args.fps:g} fps" if args.fps else "as fast as possible"
+    print(f"{len(budget)} cores ({format_cpus(budget)}), {pipelines} pipelines at {rate}")
+    print(f"{'cv':>7} {'omp':>7} {'layout':<7} {'fps':>7} {'min':>6} {'p50 ms':>7} {'p99 ms':>7} {'max ms':>7}")
+    results = []
+    for cv, omp, layout in itertools.product(cv_threads, args.omp_threads, args.layouts.split(",")):
+        affinities = layout_affinity(layout, budget, pipelines)
+        if affinities is None:
+            continue
+        config = RuntimeConfig(cv_threads=cv, omp_threads=omp)
+        report = measure(config, affinities, budget, args)
+        if report is None:
+            continue
+        results.append((config, layout, affinities, report))
+        print(f"{'default' if cv is None else cv:>7} {'default' if omp is None else omp:>7} {layout:<7} "
+              f"{report['fps']:>7.1f} {report['min_fps']:>6.1f} {report['p50']:>7.1f} {report['p99']:>7.1f} "
+              f"{report['max']:>7.1f}", flush=True)
+
+    if not results:
+        print("No setting could be measured")
+        return
+    if args.fps:
+        # Settings that keep every pipeline at (nearly) the camera rate, by tail latency
+        keeping_up = [r for r in results if r[3]["min_fps"] >= 0.95 * args.fps]
+        best = min(keeping_up or results, key=lambda r: r[3]["p99"])
+    else:
+        best = max(results, key=lambda r: r[3]["fps"])
+    config, layout, affinities, report = best
+    print(f"\nBest: {config.describe()} layout={layout} "
+          f"({report['fps']:.1f} fps, p99 {report['p99']:.1f} ms)")
+    for i, affinity in enumerate(affinities):
+        env = RuntimeConfig(config.cv_threads, config.omp_threads, affinity=affinity).to_env()
+        env = {k: v for k, v in env.items() if k.startswith("GESTURE_PLAYER_")}
+        print(f"  pipeline {i}: " + (" ".join(f"{k}={v!r}" for k, v in env.items()) or "(defaults)"))
+
+
+if __name__ == "__main__":
+    main()
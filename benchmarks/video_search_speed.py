@@ -0,0 +1,119 @@
+"""
+Inference saved by the coarse-to-fine video search, and whether its timeline
+matches the exhaustive one.
+
+Without --video, it generates a long synthetic label track: idle stretches
+without hands, then hand stretches with gestures held for at least --min-hold
+seconds. A fake capture then replays the track, and the analyser looks each
+frame's label up instead of running MediaPipe. This checks the search itself
+at hours-of-footage scale. For each stride it reports the share of frames
+analysed and whether the timeline equals the exhaustive one. A stride longer
+than the shortest hold is expected to miss events.
+
+With --video, it runs the real pipeline on a recording, once exhaustively and
+once per stride, and also reports the wall-clock times.
+
+Usage:
+    python -m benchmarks.video_search_speed --hours 2 --strides 5,10,15,30
+    python -m benchmarks.video_search_speed --video recordings/session.mp4 --strides 5,10
+"""
+import argparse
+import random
+import time
+
+import cv2
+
+from video_search import HAND, NONE, FrameAnalyzer, coarse_to_fine, exhaustive, search_video, timeline
+
+GESTURES = ("play", "pause", "stop", "next", "previous", "volume_up", "volume_down")
+
+
+class LabelTrack:
+    """Stand-in for cv2.VideoCapture whose "frames" are indices into a label track."""
+
+    def __init__(self, length):
+        self.length = length
+        self.index = -1
+
+    def grab(self):
+        self.index += 1
+        return self.index < self.length
+
+    def retrieve(self, image=None):
+        return True, self.index
+
+    def read(self, image=None):
+        return (True, self.index) if self.grab() else (False, None)
+
+    def release(self):
+        pass
+
+
+class Lookup:
+    """Analyser that looks labels up, counting the frames it is asked about."""
+
+    def __init__(self, labels):
+        self.labels = labels
+        self.frames = 0
+
+    def __call__(self, index):
+        self.frames += 1
+        return self.labels[index]
+
+
+def synthetic_labels(hours, fps, min_hold, seed=0):
+    """Per-frame labels of idle stretches and hand stretches with held gestures."""
+    rng = random.Random(seed)
+    labels = []
+    total = int(hours * 3600 * fps)
+    while len(labels) < total:
+        labels += [NONE] * int(rng.uniform(5, 120) * fps)
+        for _ in range(rng.randint(1, 4)):
+            labels += [HAND] * int(rng.uniform(min_hold, 3) * fps)
+            labels += [rng.choice(GESTURES)] * int(rng.uniform(min_hold, 3) * fps)
+        labels += [HAND] * int(rng.uniform(min_hold, 2) * fps)
+    return labels[:total]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the coarse-to-fine video search.")
+    parser.add_argument("--video", help="Real recording to search (default: a synthetic label track)")
+    parser.add_argument("--hours", type=float, default=2.0, help="Length of the synthetic track")
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--min-hold", type=float, default=0.5, help="Shortest synthetic state, in seconds")
+    parser.add_argument("--strides", default="5,10,15,30")
+    args = parser.parse_args(argv)
+    strides = [int(s) for s in args.strides.split(",")]
+
+    print(f"{'stride':>6} {'analysed':>9} {'share':>7} {'events':>7} {'timeline':>10} {'seconds':>8}")
+    if args.video:
+        analyze = FrameAnalyzer()
+        start = time.perf_counter()
+        reference = exhaustive(lambda: cv2.VideoCapture(args.video), analyze)
+        elapsed = time.perf_counter() - start
+        expected = None
+        for stride in strides:
+            report = search_video(args.video, stride=stride, analyze=analyze)
+            if expected is None:
+                expected = timeline(reference, report["fps"])
+                print(f"{'all':>6} {len(reference):>9} {1:>7.1%} {len(expected):>7} {'':>10} {elapsed:>8.1f}")
+            print(f"{stride:>6} {report['analysed']:>9} {report['analysed'] / max(report['frames'], 1):>7.1%} "
+                  f"{len(report['timeline']):>7} {'same' if report['timeline'] == expected else 'DIFFERENT':>10} "
+                  f"{report['seconds']:>8.1f}", flush=True)
+        return
+
+    labels = synthetic_labels(args.hours, args.fps, args.min_hold)
+    expected = timeline(exhaustive(lambda: LabelTrack(len(labels)), lambda i: labels[i]), args.fps)
+    print(f"{'all':>6} {len(labels):>9} {1:>7.1%} {len(expected):>7}")
+    for stride in strides:
+        lookup = Lookup(labels)
+        start = time.perf_counter()
+        result = coarse_to_fine(lambda: LabelTrack(len(labels)), lookup, stride)
+        elapsed = time.perf_counter() - start
+        events = timeline(result["labels"], args.fps)
+        print(f"{stride:>6} {lookup.frames:>9} {lookup.frames / len(labels):>7.1%} {len(events):>7} "
+              f"{'same' if events == expected else 'DIFFERENT':>10} {elapsed:>8.1f}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+"""
+Frame sources for the detection pipeline.
+
+Every source mimics the parts of cv2.VideoCapture the pipeline uses
+(isOpened(), read(image=None), release()) and reports the mode it actually got
+in `mode`. Probe a camera from the command line with:
+    python capture.py --probe 0
+"""
+import argparse
+import inspect
+import os
+import re
+import sys
+import time
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+# Modes tried by probe_camera(): (width, height, fps, fourcc)
+PROBE_MODES = [
+    (640, 480, 30, "MJPG"),
+    (640, 480, 30, "YUYV"),
+    (1280, 720, 30, "MJPG"),
+    (1280, 720, 10, "YUYV"),
+    (1920, 1080, 30, "MJPG"),
+    (320, 240, 60, "MJPG"),
+    (640, 480, 60, "MJPG"),
+]
+
+
+def _fourcc_code(fourcc):
+    return cv2.VideoWriter_fourcc(*fourcc)
+
+
+def _fourcc_name(code):
+    code = int(code)
+    if code <= 0:
+        return None
+    return "".join(chr((code >> (8 * i)) & 0xFF) for i in range(4))
+
+
+def parse_mode(text):
+    """
+    Parse a mode string like "1280x720@30:MJPG" (every part optional, e.g. "@60" or ":MJPG").
+    Returns:
+        dict with the width, height, fps and fourcc keys that were given.
+    """
+    match = re.fullmatch(r"(?:(\d+)x(\d+))?(?:@(\d+(?:\.\d+)?))?(?::(\w{4}))?", text.strip())
+    if not match:
+        raise ValueError(f"Invalid capture mode: {text!r}")
+    width, height, fps, fourcc = match.groups()
+    options = {}
+    if width:
+        options.update(width=int(width), height=int(height))
+    if fps:
+        options["fps"] = float(fps)
+    if fourcc:
+        options["fourcc"] = fourcc.upper()
+    return options
+
+
+class CaptureSource:
+    """Base class for frame sources."""
+
+    def __init__(self):
+        self.mode = {}
+
+    def isOpened(self):
+        raise NotImplementedError
+
+    def read(self, image=None):
+        """Return (ok, frame); fills `image` in place when it has the right shape."""
+        raise NotImplementedError
+
+    def release(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class _Pacer:
+    """Sleep so frames come out no faster than `fps` (no-op when fps is falsy)."""
+
+    def __init__(self, fps):
+        self.interval = 1.0 / fps if fps else 0.0
+        self.next_time = None
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.perf_counter()
+        if self.next_time is None or now - self.next_time > self.interval:
+            # First frame, or we fell behind: don't try to catch up with a burst
+            self.next_time = now
+        elif self.next_time > now:
+            time.sleep(self.next_time - now)
+        self.next_time += self.interval
+
+
+class CameraSource(CaptureSource):
+    """
+    Live camera with resolution, fps, pixel format and buffer negotiation.
+    Settings left as None keep the driver defaults. After opening, `mode` holds
+    what the driver actually accepted, which may differ from what was requested.
+    Args:
+        device: Camera index or device path (e.g. "/dev/video2").
+        width, height (int): Requested resolution.
+        fps (float): Requested frame rate.
+        fourcc (str): Requested pixel format, e.g. "MJPG" (cheap USB bandwidth, high fps) or "YUYV".
+        buffer_size (int): Driver-side frame buffer; 1 gives the freshest frames.
+        backend (int): cv2.CAP_* backend (defaults to V4L2 on Linux).
+    """
+
+    def __init__(self, device=0, width=None, height=None, fps=None, fourcc=None, buffer_size=None, backend=None):
+        super().__init__()
+        if backend is None:
+            backend = cv2.CAP_V4L2 if sys.platform.startswith("linux") else cv2.CAP_ANY
+        self.requested = {"width": width, "height": height, "fps": fps, "fourcc": fourcc, "buffer_size": buffer_size}
+        self.cap = cv2.VideoCapture(device, backend)
+        if not self.cap.isOpened() and backend != cv2.CAP_ANY:
+            self.cap = cv2.VideoCapture(device)
+        if self.cap.isOpened():
+            self.configure(width, height, fps, fourcc, buffer_size)
+
+    def configure(self, width=None, height=None, fps=None, fourcc=None, buffer_size=None):
+        """
+        Request a capture mode and report what the driver accepted.
+        Returns:
+            dict: The actual mode (also stored in self.mode).
+        """
+        # V4L2 needs the pixel format before the resolution, or it may pick a
+        # resolution only the old format supports
+        if fourcc:
+            self.cap.set(cv2.CAP_PROP_FOURCC, _fourcc_code(fourcc))
+        if width and height:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        if fps:
+            self.cap.set(cv2.CAP_PROP_FPS, fps)
+        if buffer_size:
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+
+        self.mode = {
+            "source": "camera",
+            "backend": self.cap.getBackendName(),
+            "width": int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "fps": self.cap.get(cv2.CAP_PROP_FPS),
+            "fourcc": _fourcc_name(self.cap.get(cv2.CAP_PROP_FOURCC)),
+            "buffer_size": int(self.cap.get(cv2.CAP_PROP_BUFFERSIZE)),
+        }
+        return self.mode
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self, image=None):
+        return self.cap.read(image)
+
+    def release(self):
+        self.cap.release()
+
+
+class VideoFileSource(CaptureSource):
+    """
+    Video file, optionally replayed at its native frame rate and looped so it can
+    stand in for a camera.
+    Args:
+        path (str): Video file.
+        realtime (bool): Pace frames at the file's fps instead of as fast as possible.
+        loop (bool): Restart from the beginning at the end of the file.
+    """
+
+    def __init__(self, path, realtime=False, loop=False):
+        super().__init__()
+        self.path = path
+        self.loop = loop
+        self.cap = cv2.VideoCapture(path)
+        fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.pacer = _Pacer(fps if realtime else None)
+        self.mode = {
+            "source": "file",
+            "path": path,
+            "width": int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "fps": fps,
+            "frames": int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+        }
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self, image=None):
+        self.pacer.wait()
+        ret, frame = self.cap.read(image)
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read(image)
+        return ret, frame
+
+    def release(self):
+        self.cap.release()
+
+
+class ImageDirectorySource(CaptureSource):
+    """
+    Images of a directory, in name order, as a frame stream.
+    Args:
+        directory (str): Directory of images.
+        fps (float): Pace frames at this rate (None for as fast as possible).
+        loop (bool): Restart with the first image after the last one.
+    """
+
+    def __init__(self, directory, fps=None, loop=False):
+        super().__init__()
+        self.paths = [os.path.join(directory, f) for f in sorted(os.listdir(directory))
+                      if f.lower().endswith(IMAGE_EXTENSIONS)]
+        self.loop = loop
+        self.index = 0
+        self.pacer = _Pacer(fps)
+        self.mode = {"source": "images", "path": directory, "fps": fps, "frames": len(self.paths)}
+
+    def isOpened(self):
+        return self.index < len(self.paths) or (self.loop and len(self.paths) > 0)
+
+    def read(self, image=None):
+        if self.index >= len(self.paths):
+            if not self.loop or not self.paths:
+                return False, None
+            self.index = 0
+        self.pacer.wait()
+        frame = cv2.imread(self.paths[self.index], cv2.IMREAD_COLOR)
+        self.index += 1
+        if frame is None:
+            return False, None
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            frame = image
+        return True, frame
+
+
+class SyntheticSource(CaptureSource):
+    """
+    Generated test frames (a gradient with a moving disc), for benchmarks and
+    for running the pipeline without a camera.
+    Args:
+        width, height (int): Frame size.
+        fps (float): Pace frames at this rate (None for as fast as possible).
+        frames (int): Number of frames to produce (None for endless).
+    """
+
+    def __init__(self, width=640, height=480, fps=30, frames=None):
+        super().__init__()
+        self.width = width
+        self.height = height
+        self.frames = frames
+        self.count = 0
+        self.pacer = _Pacer(fps)
+        gradient = np.linspace(0, 255, width, dtype=np.uint8)
+        self.background = np.empty((height, width, 3), dtype=np.uint8)
+        self.background[:] = gradient[None, :, None]
+        self.mode = {"source": "synthetic", "width": width, "height": height, "fps": fps, "frames": frames}
+
+    def isOpened(self):
+        return self.frames is None or self.count < self.frames
+
+    def read(self, image=None):
+        if not self.isOpened():
+            return False, None
+        self.pacer.wait()
+        if image is None or image.shape != self.background.shape:
+            image = np.empty_like(self.background)
+        np.copyto(image, self.background)
+        x = int((self.count * 8) % self.width)
+        cv2.circle(image, (x, self.height // 2), self.height // 8, (255, 255, 255), -1)
+        self.count += 1
+        return True, image
+
+
+def open_source(spec=0, **options):
+    """
+    Open a frame source from a short description.
+    Args:
+        spec: Camera index (int or digit string), camera device path ("/dev/video*"),
+            "synthetic", an image directory, or a video file path.
+        **options: Keyword arguments for the matching source class, e.g.
+            width/height/fps/fourcc/buffer_size for cameras or realtime/loop for files.
+            Options the matching class doesn't take (e.g. a camera mode for a video
+            file) are ignored with a warning, so callers can pass the same options
+            whatever the spec turns out to be.
+    Returns:
+        CaptureSource instance.
+    """
+    if isinstance(spec, CaptureSource):
+        return spec
+    if isinstance(spec, int) or (isinstance(spec, str) and spec.isdigit()):
+        return CameraSource(int(spec), **_options_for(CameraSource, spec, options))
+    if spec.startswith("/dev/video"):
+        return CameraSource(spec, **_options_for(CameraSource, spec, options))
+    if spec == "synthetic":
+        return SyntheticSource(**_options_for(SyntheticSource, spec, options))
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec, **_options_for(ImageDirectorySource, spec, options))
+    return VideoFileSource(spec, **_options_for(VideoFileSource, spec, options))
+
+
+def _options_for(cls, spec, options):
+    """The subset of `options` that `cls` accepts; warns about the rest."""
+    accepted = inspect.signature(cls.__init__).parameters
+    ignored = [key for key, value in options.items() if key not in accepted and value is not None]
+    if ignored:
+        print(f"Warning: {', '.join(ignored)} not supported by {cls.__name__} ({spec!r}); ignored.",
+              file=sys.stderr)
+    return {key: value for key, value in options.items() if key in accepted}
+
+
+def probe_camera(device=0, modes=PROBE_MODES, backend=None):
+    """
+    Try a list of capture modes on a camera and report what it actually delivers.
+    Args:
+        device: Camera index or device path.
+        modes: Iterable of (width, height, fps, fourcc) to request.
+    Returns:
+        list of dicts with the requested mode, the mode reported by the driver and
+        the measured frame rate over a few frames.
+    """
+    camera = CameraSource(device, backend=backend)
+    results = []
+    try:
+        if not camera.isOpened():
+            return results
+        for width, height, fps, fourcc in modes:
+            actual = dict(camera.configure(width, height, fps, fourcc, buffer_size=1))
+            camera.read()  # the first frame after a mode switch is often slow
+            start = time.perf_counter()
+            frames = 0
+            while frames < 10 and camera.read()[0]:
+                frames += 1
+            elapsed = time.perf_counter() - start
+            actual["measured_fps"] = round(frames / elapsed, 1) if frames and elapsed > 0 else 0.0
+            results.append({"requested": {"width": width, "height": height, "fps": fps, "fourcc": fourcc},
+                            "actual": actual})
+    finally:
+        camera.release()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Probe camera capture modes.")
+    parser.add_argument("--probe", default="0", help="Camera index or device path")
+    args = parser.parse_args(argv)
+
+    device = int(args.probe) if args.probe.isdigit() else args.probe
+    results = probe_camera(device)
+    if not results:
+        print(f"Could not open camera {args.probe}")
+        return
+    for result in results:
+        r, a = result["requested"], result["actual"]
+        print(f"requested {r['width']}x{r['height']}@{r['fps']} {r['fourcc']} -> "
+              f"got {a['width']}x{a['height']}@{a['fps']:g} {a['fourcc']} "
+              f"(measured {a['measured_fps']} fps, buffer {a['buffer_size']})")
+
+
+if __name__ == "__main__":
+    main()
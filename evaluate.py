@@ -0,0 +1,381 @@
+"""
+Gesture-recognition evaluation over labelled recordings.
+
+Runs the recognition pipeline (optional smoothing -> map_gesture_to_action ->
+GestureDebouncer) over every recording, one process per file, and prints one
+report: per-frame confusion matrix, per-gesture precision/recall, trigger
+latency in frames, false triggers per minute and throughput.
+
+Recordings are either videos (hands are detected with MediaPipe) or landmark
+recordings (.npz, see save_recording()), which skip detection and evaluate
+only the classification stages. Ground truth is a per-frame action label
+(e.g. "play"), either stored in the .npz as `gestures` or in a sidecar
+`<name>.labels.csv` with `start,end,gesture` rows (frame range, end
+exclusive). Unlabelled frames count as "none".
+
+Usage:
+    python evaluate.py recordings/ --workers 4 --json report.json
+    python evaluate.py recordings/ --record landmarks/    # videos -> .npz, then evaluate those
+"""
+import argparse
+import csv
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+RECORDING_EXTENSIONS = VIDEO_EXTENSIONS + ('.npz',)
+
+NONE = "none"
+
+
+def list_recordings(paths):
+    """Expand files and directories into the sorted list of recordings."""
+    recordings = []
+    for path in paths:
+        if os.path.isdir(path):
+            recordings.extend(os.path.join(path, f) for f in sorted(os.listdir(path))
+                              if f.lower().endswith(RECORDING_EXTENSIONS))
+        else:
+            recordings.append(path)
+    return recordings
+
+
+def save_recording(path, hands_per_frame, fps, gestures=None):
+    """
+    Save a landmark recording.
+    Args:
+        path (str): Output .npz file.
+        hands_per_frame: List (one entry per frame) of lists of hands; a hand is
+            21 (x, y, z) landmarks, optionally a hand_tracking.Hand with a label.
+        fps (float): Frame rate of the recording.
+        gestures: Optional per-frame ground-truth labels.
+    """
+    max_hands = max((len(hands) for hands in hands_per_frame), default=0) or 1
+    landmarks = np.full((len(hands_per_frame), max_hands, 21, 3), np.nan, dtype=np.float32)
+    handedness = np.full((len(hands_per_frame), max_hands), "", dtype="<U5")
+    for i, hands in enumerate(hands_per_frame):
+        for j, hand in enumerate(hands):
+            landmarks[i, j] = hand
+            handedness[i, j] = getattr(hand, "label", None) or ""
+    arrays = {"landmarks": landmarks, "handedness": handedness, "fps": np.float64(fps)}
+    if gestures is not None:
+        arrays["gestures"] = np.asarray([g or NONE for g in gestures])
+    np.savez_compressed(path, **arrays)
+
+
+def _recording_frames(path):
+    """Yield the hands of every frame of an .npz recording."""
+    from hand_tracking import Hand
+
+    data = np.load(path)
+    handedness = data["handedness"] if "handedness" in data else None
+    for i, frame in enumerate(data["landmarks"]):
+        hands = []
+        for j, hand in enumerate(frame):
+            if np.isnan(hand[0, 0]):
+                continue
+            label = handedness[i, j] if handedness is not None and handedness[i, j] else None
+            hands.append(Hand(hand, label))
+        yield hands
+
+
+def load_labels(path, frames):
+    """
+    Ground-truth label of every frame.
+    Args:
+        path (str): Recording; labels come from its `gestures` array (.npz) or
+            from `<name>.labels.csv` next to it.
+        frames (int): Number of frames of the recording.
+    Returns:
+        List of `frames` labels ("none" where no gesture is shown).
+    """
+    labels = [NONE] * frames
+    if path.endswith(".npz"):
+        data = np.load(path)
+        if "gestures" in data:
+            stored = [str(g) or NONE for g in data["gestures"][:frames]]
+            labels[:len(stored)] = stored
+            return labels
+    csv_path = os.path.splitext(path)[0] + ".labels.csv"
+    if os.path.exists(csv_path):
+        with open(csv_path, newline="") as f:
+            for row in csv.DictReader(f):
+                start, end = int(row["start"]), min(int(row["end"]), frames)
+                labels[start:end] = [row["gesture"] or NONE] * max(0, end - start)
+    return labels
+
+
+def _segments(labels):
+    """Runs of the same non-"none" label: list of (start, end, label), end exclusive."""
+    segments = []
+    start = 0
+    for i in range(1, len(labels) + 1):
+        if i == len(labels) or labels[i] != labels[start]:
+            if labels[start] != NONE:
+                segments.append((start, i, labels[start]))
+            start = i
+    return segments
+
+
+def evaluate_recording(path, smoothing=True, cooldown=2.0, gestures_path=None, max_num_hands=2):
+    """
+    Run the pipeline over one recording.
+    Videos are detected with the shared tracking model, which is closed
+    afterwards: it would otherwise carry the hands it tracked at the end of
+    this recording into the first frames of the next one the process evaluates.
+    Returns:
+        dict with the recording's per-frame predictions and ground truth, the
+        fired triggers as (frame, action), its fps and the wall-clock seconds spent.
+    """
+    from landmark_filter import HandSmoother
+    from media_controls import GestureDebouncer, map_gesture_to_action
+
+    if gestures_path:
+        from gesture_map import GestureMap
+
+        classify = GestureMap(gestures_path).classify_hands
+    else:
+        classify = map_gesture_to_action
+
+    start = time.perf_counter()
+    detections = None
+    if path.endswith(".npz"):
+        fps = float(np.load(path)["fps"])
+        frames = _recording_frames(path)
+    else:
+        from capture import VideoFileSource
+        from media_controls import detect_hands_in_video
+
+        source = VideoFileSource(path)
+        fps = source.mode["fps"]
+        detections = detect_hands_in_video(source=source, annotate=False, max_num_hands=max_num_hands)
+        frames = (hands for _, hands in detections)
+
+    smoother = HandSmoother() if smoothing else None
+    # The cooldown must already have passed at t=0, so a gesture there fires on frame 0
+    debouncer = GestureDebouncer(cooldown=cooldown, start=-np.inf)
+    predictions = []
+    triggers = []
+    try:
+        for i, hands in enumerate(frames):
+            t = i / fps
+            if smoother is not None:
+                hands = smoother(hands, timestamp=t)
+            action = classify(hands) if hands else None
+            predictions.append(action or NONE)
+            if debouncer.update(action, now=t) is not None:
+                triggers.append((i, action))
+    finally:
+        if detections is not None:
+            from media_controls import close_hands_models
+
+            detections.close()
+            close_hands_models()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "path": path,
+        "fps": fps,
+        "frames": len(predictions),
+        "predictions": predictions,
+        "labels": load_labels(path, len(predictions)),
+        "triggers": triggers,
+        "seconds": elapsed,
+    }
+
+
+def _evaluate_worker(args):
+    import cv2
+    from runtime_config import get_config
+
+    # One file per process: keep OpenCV from oversubscribing the cores,
+    # unless GESTURE_PLAYER_CV_THREADS says otherwise
+    if get_config().cv_threads is None:
+        cv2.setNumThreads(1)
+    path, options = args
+    return evaluate_recording(path, **options)
+
+
+def evaluate(recordings, options, workers=None):
+    """
+    Evaluate recordings in a pool of `workers` processes (default: CPU count).
+    Returns:
+        The build_report() report; apart from the throughput figures it does
+        not depend on the number of workers.
+    """
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as pool:
+        results = list(pool.map(_evaluate_worker, [(path, options) for path in recordings]))
+    return build_report(results, time.perf_counter() - start)
+
+
+def build_report(results, wall_seconds):
+    """
+    Aggregate per-recording results into one report.
+    Returns:
+        dict with classes, confusion (rows: ground truth, columns: prediction),
+        per-gesture precision/recall/trigger stats, false triggers per minute
+        and throughput.
+    """
+    classes = sorted({label for r in results for label in r["labels"] + r["predictions"]} - {NONE}) + [NONE]
+    index = {name: i for i, name in enumerate(classes)}
+    confusion = np.zeros((len(classes), len(classes)), dtype=np.int64)
+    latencies = {name: [] for name in classes}
+    segments_total = dict.fromkeys(classes, 0)
+    false_triggers = 0
+    minutes = 0.0
+
+    for r in results:
+        truth = np.array([index[label] for label in r["labels"]], dtype=np.int64)
+        predicted = np.array([index[label] for label in r["predictions"]], dtype=np.int64)
+        np.add.at(confusion, (truth, predicted), 1)
+        minutes += r["frames"] / r["fps"] / 60
+
+        # A trigger is correct when it falls in a segment labelled with its action;
+        # the first correct trigger of a segment gives the segment's latency
+        segments = _segments(r["labels"])
+        hit = set()
+        for frame, action in r["triggers"]:
+            for k, (start, end, label) in enumerate(segments):
+                if start <= frame < end and label == action:
+                    if k not in hit:
+                        hit.add(k)
+                        latencies[label].append(frame - start)
+                    break
+            else:
+                false_triggers += 1
+        for start, end, label in segments:
+            segments_total[label] += 1
+
+    per_gesture = {}
+    for name in classes[:-1]:
+        i = index[name]
+        true_positive = confusion[i, i]
+        predicted = confusion[:, i].sum()
+        actual = confusion[i, :].sum()
+        per_gesture[name] = {
+            "precision": float(true_positive / predicted) if predicted else None,
+            "recall": float(true_positive / actual) if actual else None,
+            "segments": segments_total[name],
+            "triggered": len(latencies[name]),
+            "latency_frames": float(np.median(latencies[name])) if latencies[name] else None,
+        }
+
+    frames = sum(r["frames"] for r in results)
+    pipeline_seconds = sum(r["seconds"] for r in results)
+    return {
+        "recordings": len(results),
+        "frames": frames,
+        "minutes": minutes,
+        "classes": classes,
+        "confusion": confusion.tolist(),
+        "accuracy": float(np.trace(confusion) / frames) if frames else None,
+        "per_gesture": per_gesture,
+        "false_triggers": false_triggers,
+        "false_triggers_per_minute": false_triggers / minutes if minutes else None,
+        "fps_per_worker": frames / pipeline_seconds if pipeline_seconds else None,
+        "fps_total": frames / wall_seconds if wall_seconds else None,
+    }
+
+
+def format_report(report):
+    """Render a report as text."""
+    def number(value, spec):
+        return "-" if value is None else format(value, spec)
+
+    classes = report["classes"]
+    width = max(8, max(len(name) for name in classes) + 1)
+    lines = [
+        f"{report['recordings']} recordings, {report['frames']} frames ({report['minutes']:.1f} min)",
+        "",
+        "Confusion (rows: truth, columns: predicted)",
+        " " * width + "".join(f"{name:>{width}}" for name in classes),
+    ]
+    for name, row in zip(classes, report["confusion"]):
+        lines.append(f"{name:<{width}}" + "".join(f"{count:>{width}}" for count in row))
+    lines += [
+        "",
+        f"{'gesture':<{width}} {'precision':>9} {'recall':>7} {'segments':>9} {'triggered':>10} {'latency (frames)':>17}",
+    ]
+    for name, stats in report["per_gesture"].items():
+        lines.append(f"{name:<{width}} {number(stats['precision'], '.3f'):>9} {number(stats['recall'], '.3f'):>7} "
+                     f"{stats['segments']:>9} {stats['triggered']:>10} {number(stats['latency_frames'], '.1f'):>17}")
+    lines += [
+        "",
+        f"frame accuracy:        {number(report['accuracy'], '.3f')}",
+        f"false triggers:        {report['false_triggers']} ({number(report['false_triggers_per_minute'], '.2f')}/min)",
+        f"throughput:            {number(report['fps_per_worker'], '.1f')} frames/s per worker, "
+        f"{number(report['fps_total'], '.1f')} frames/s total",
+    ]
+    return "\n".join(lines)
+
+
+def record_videos(videos, directory, max_num_hands=2):
+    """
+    Detect hands in videos once and save them as landmark recordings, with
+    their labels, so later evaluations can skip MediaPipe.
+    Returns:
+        List of the written .npz paths.
+    """
+    from capture import VideoFileSource
+    from media_controls import close_hands_models, detect_hands_in_video
+
+    os.makedirs(directory, exist_ok=True)
+    written = []
+    for video in videos:
+        source = VideoFileSource(video)
+        fps = source.mode["fps"]
+        try:
+            hands_per_frame = [hands for _, hands in detect_hands_in_video(source=source, annotate=False,
+                                                                           max_num_hands=max_num_hands)]
+        finally:
+            # Start every video without the hands tracked at the end of the previous one
+            close_hands_models()
+        out_path = os.path.join(directory, os.path.splitext(os.path.basename(video))[0] + ".npz")
+        save_recording(out_path, hands_per_frame, fps, load_labels(video, len(hands_per_frame)))
+        written.append(out_path)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate gesture recognition on labelled recordings.")
+    parser.add_argument("recordings", nargs="+", help="Videos, .npz landmark recordings, or directories of them")
+    parser.add_argument("--workers", type=int, default=None, help="Evaluation processes (default: CPU count)")
+    parser.add_argument("--cooldown", type=float, default=2.0, help="Debouncer cooldown in seconds")
+    parser.add_argument("--no-smoothing", action="store_true", help="Classify raw landmarks")
+    parser.add_argument("--gestures", default=None, help="Gesture rules file (default: gestures.json)")
+    parser.add_argument("--one-hand", action="store_true", help="Detect a single hand in videos")
+    parser.add_argument("--record", default=None,
+                        help="Convert the videos to .npz landmark recordings in this directory first")
+    parser.add_argument("--json", default=None, help="Also write the report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    recordings = list_recordings(args.recordings)
+    if not recordings:
+        print("No recordings found", file=sys.stderr)
+        return 1
+    max_num_hands = 1 if args.one_hand else 2
+    if args.record:
+        videos = [path for path in recordings if path.lower().endswith(VIDEO_EXTENSIONS)]
+        recordings = [path for path in recordings if path.endswith(".npz")]
+        recordings += record_videos(videos, args.record, max_num_hands)
+
+    options = {"smoothing": not args.no_smoothing, "cooldown": args.cooldown,
+               "gestures_path": args.gestures, "max_num_hands": max_num_hands}
+    report = evaluate(recordings, options, args.workers)
+
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
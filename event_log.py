@@ -0,0 +1,450 @@
+"""
+Append-only columnar log of gesture events, for usage analytics.
+
+Events (one row each):
+    frames    per-interval summary of the loop: frames seen, frames with hands
+    gesture   a recognized gesture appeared (the classification changed to it)
+    action    an action was executed (value: the volume for "volume")
+
+Rows are buffered in memory and appended by a background thread in batches,
+so logging costs the live loop one tuple append. On disk each segment is a
+directory holding one raw NumPy file per column (strings are stored as codes
+into the segment's strings.json), about 27 bytes per event. A new segment is
+started when the current one passes `max_bytes`. Readers memory-map the
+columns and stop at the shortest one, so a segment being written (or cut
+short by a crash) is still readable.
+
+Usage:
+    python event_log.py logs/events --since 2026-01-01 --undo-window 3
+"""
+import argparse
+import atexit
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+from dateutil.tz import gettz, tzlocal
+
+KINDS = ("frames", "gesture", "action")
+
+# (name, dtype); string columns hold codes into strings.json, 0 meaning None
+COLUMNS = (
+    ("ts", "<f8"),
+    ("session", "<u2"),
+    ("source", "<u2"),
+    ("kind", "<u2"),
+    ("gesture", "<u2"),
+    ("action", "<u2"),
+    ("hands", "<i1"),
+    ("frames", "<u2"),
+    ("hand_frames", "<u2"),
+    ("value", "<f4"),
+)
+STRING_COLUMNS = ("session", "source", "kind", "gesture", "action")
+
+# Action pairs that undo each other: one right after the other counts as a misfire
+INVERSE_ACTIONS = {
+    "play": "pause", "pause": "play",
+    "next": "previous", "previous": "next",
+    "volume_up": "volume_down", "volume_down": "volume_up",
+    "seek_forward": "seek_backward", "seek_backward": "seek_forward",
+}
+
+STRINGS_FILE = "strings.json"
+
+
+def _column_path(segment, name, dtype):
+    return os.path.join(segment, f"{name}.{np.dtype(dtype).str[1:]}")
+
+
+class EventLog:
+    """
+    Buffered, append-only writer for the event log.
+    Args:
+        directory (str): Log directory (created if needed).
+        batch_size (int): Rows that trigger a write before flush_interval is up.
+        flush_interval (float): Seconds between two writes of the buffered rows.
+        max_bytes (int): Segment size after which a new segment is started.
+        max_total_bytes (int): Oldest segments are deleted beyond this total (None: keep all).
+    """
+
+    def __init__(self, directory, batch_size=10000, flush_interval=5.0, max_bytes=32 * 1024 * 1024,
+                 max_total_bytes=None):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.max_total_bytes = max_total_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._rows = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._segment = None
+        self._segment_rows = 0
+        self._strings = None
+        self._codes = None
+        self._row_bytes = sum(np.dtype(dtype).itemsize for _, dtype in COLUMNS)
+        self._thread = threading.Thread(target=self._run, name="event-log", daemon=True)
+        self._thread.start()
+
+    def log(self, kind, session=None, source=None, gesture=None, action=None, hands=None,
+            frames=0, hand_frames=0, value=None, ts=None):
+        """Buffer one event (see the module docstring for the kinds)."""
+        row = (time.time() if ts is None else ts, session, source, kind, gesture, action,
+               -1 if hands is None else hands, frames, hand_frames, np.nan if value is None else value)
+        with self._lock:
+            self._rows.append(row)
+            full = len(self._rows) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write the buffered rows now."""
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if not rows:
+            return
+        with self._write_lock:
+            try:
+                self._write(rows)
+            except OSError as e:
+                print(f"Error writing the event log: {e}")
+
+    def _new_segment(self):
+        name = f"segment-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self._segment = os.path.join(self.directory, name)
+        os.makedirs(self._segment)
+        self._segment_rows = 0
+        self._strings = {column: [None] for column in STRING_COLUMNS}
+        self._codes = {column: {None: 0} for column in STRING_COLUMNS}
+
+    def _encode(self, column, values):
+        """Codes of a string column, adding new strings to the segment's table."""
+        codes = self._codes[column]
+        strings = self._strings[column]
+        out = np.empty(len(values), dtype=np.uint16)
+        for i, value in enumerate(values):
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(strings)
+                strings.append(value)
+            out[i] = code
+        return out
+
+    def _write(self, rows):
+        if (self._segment is None or self._segment_rows * self._row_bytes >= self.max_bytes
+                # Keep every string column within its uint16 codes
+                or any(len(strings) > 60000 for strings in self._strings.values())):
+            self._new_segment()
+            self._enforce_total_size()
+
+        values = list(zip(*rows))
+        known = {column: len(self._strings[column]) for column in STRING_COLUMNS}
+        arrays = {}
+        for (name, dtype), column in zip(COLUMNS, values):
+            if name in STRING_COLUMNS:
+                arrays[name] = self._encode(name, column)
+            else:
+                arrays[name] = np.asarray(column, dtype=dtype)
+
+        # New strings go to disk before the codes that refer to them
+        if any(len(self._strings[column]) != known[column] for column in STRING_COLUMNS):
+            path = os.path.join(self._segment, STRINGS_FILE)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(self._strings, f)
+            os.replace(path + ".tmp", path)
+        for name, dtype in COLUMNS:
+            with open(_column_path(self._segment, name, dtype), "ab") as f:
+                arrays[name].astype(dtype, copy=False).tofile(f)
+        self._segment_rows += len(rows)
+
+    def _enforce_total_size(self):
+        if self.max_total_bytes is None:
+            return
+        segments = list_segments(self.directory)
+        sizes = [_segment_bytes(segment) for segment in segments]
+        total = sum(sizes)
+        for segment, size in zip(segments, sizes):
+            if total <= self.max_total_bytes or segment == self._segment:
+                break
+            shutil.rmtree(segment, ignore_errors=True)
+            total -= size
+
+    def close(self):
+        """Write what is buffered and stop the writer thread."""
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+
+
+class SessionRecorder:
+    """
+    Turns one gesture loop's frames and actions into events.
+    Call frame() once per frame and action() for every executed action.
+    Args:
+        log (EventLog): Where events go (shared by any number of recorders).
+        source (str): What runs the loop, e.g. "app", "headless" or "web".
+        summary_interval (float): Seconds covered by one "frames" event.
+    """
+
+    def __init__(self, log, source, summary_interval=1.0):
+        self.log = log
+        self.source = source
+        self.session = uuid.uuid4().hex[:12]
+        self.summary_interval = summary_interval
+        self._frames = 0
+        self._hand_frames = 0
+        self._since = time.monotonic()
+        self._gesture = None
+
+    def frame(self, hands, gesture):
+        """
+        Count one frame.
+        Args:
+            hands (list): Hands detected in the frame.
+            gesture (str): Its classification (None when there is none).
+        """
+        self._frames += 1
+        if hands:
+            self._hand_frames += 1
+        if gesture != self._gesture:
+            self._gesture = gesture
+            if gesture is not None:
+                self.log.log("gesture", self.session, self.source, gesture=gesture, hands=len(hands))
+        if time.monotonic() - self._since >= self.summary_interval:
+            self.flush()
+
+    def action(self, action, gesture=None, value=None):
+        """Record an executed action, with the gesture that triggered it."""
+        self.log.log("action", self.session, self.source, gesture=gesture, action=action, value=value)
+
+    def flush(self):
+        """Log the frame counts since the last summary."""
+        if self._frames:
+            self.log.log("frames", self.session, self.source, frames=self._frames, hand_frames=self._hand_frames)
+        self._frames = 0
+        self._hand_frames = 0
+        self._since = time.monotonic()
+
+
+_default_log = None
+_default_lock = threading.Lock()
+
+
+def get_event_log(directory):
+    """Process-wide EventLog, created for `directory` on the first call and flushed at exit."""
+    global _default_log
+    with _default_lock:
+        if _default_log is None:
+            _default_log = EventLog(directory)
+            atexit.register(_default_log.close)
+        return _default_log
+
+
+def list_segments(directory):
+    """Segment directories of a log, oldest first."""
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory)) if name.startswith("segment-")]
+
+
+def _segment_bytes(segment):
+    return sum(entry.stat().st_size for entry in os.scandir(segment))
+
+
+def _read_segment(segment):
+    """Columns of one segment as memory-mapped arrays, plus its string tables."""
+    try:
+        with open(os.path.join(segment, STRINGS_FILE), encoding="utf-8") as f:
+            strings = json.load(f)
+    except (OSError, ValueError):
+        return None, None
+    rows = None
+    for name, dtype in COLUMNS:
+        path = _column_path(segment, name, dtype)
+        n = os.path.getsize(path) // np.dtype(dtype).itemsize if os.path.exists(path) else 0
+        rows = n if rows is None else min(rows, n)
+    if not rows:
+        return None, None
+    columns = {name: np.memmap(_column_path(segment, name, dtype), dtype=dtype, mode="r", shape=(rows,))
+               for name, dtype in COLUMNS}
+    return columns, strings
+
+
+def read_events(directory, since=None, until=None, kinds=None):
+    """
+    Load events into a DataFrame.
+    Args:
+        directory (str): Log directory.
+        since, until (float): Epoch-second bounds (inclusive, exclusive), or None.
+        kinds (tuple): Only these event kinds, or None for all.
+    Returns:
+        pandas.DataFrame with one row per event; string columns are categoricals
+        and "ts" holds epoch seconds.
+    """
+    import pandas as pd
+
+    vocab = {column: {} for column in STRING_COLUMNS}
+    parts = {name: [] for name, _ in COLUMNS}
+    for segment in list_segments(directory):
+        columns, strings = _read_segment(segment)
+        if columns is None:
+            continue
+        ts = columns["ts"]
+        # Rows are appended in time order: skip whole segments outside the range
+        if (since is not None and ts[-1] < since) or (until is not None and ts[0] >= until):
+            continue
+        mask = np.ones(len(ts), dtype=bool)
+        if since is not None:
+            mask &= ts >= since
+        if until is not None:
+            mask &= ts < until
+        if kinds is not None:
+            wanted = [i for i, kind in enumerate(strings["kind"]) if kind in kinds]
+            mask &= np.isin(columns["kind"], wanted)
+        for name, _ in COLUMNS:
+            values = np.asarray(columns[name])[mask]
+            if name in STRING_COLUMNS:
+                # Re-code into the table shared by all segments; -1 is None for pandas
+                lookup = np.array([-1 if s is None else vocab[name].setdefault(s, len(vocab[name]))
+                                   for s in strings[name]], dtype=np.int32)
+                values = lookup[values]
+            parts[name].append(values)
+
+    data = {}
+    for name, dtype in COLUMNS:
+        if name in STRING_COLUMNS:
+            codes = np.concatenate(parts[name]) if parts[name] else np.empty(0, dtype=np.int32)
+            data[name] = pd.Categorical.from_codes(codes, categories=list(vocab[name]))
+        else:
+            data[name] = np.concatenate(parts[name]) if parts[name] else np.empty(0, dtype=dtype)
+    return pd.DataFrame(data)
+
+
+def _hour_of_day(ts, tz=None):
+    """Local hour of each epoch timestamp, converting each distinct quarter hour only once."""
+    zone = gettz(tz) if tz else tzlocal()
+    # Quarter hours, so zones with :30 and :45 offsets are right too
+    quarters, inverse = np.unique(np.floor_divide(ts, 900).astype(np.int64), return_inverse=True)
+    hours = np.array([datetime.fromtimestamp(q * 900, zone).hour for q in quarters], dtype=np.int64)
+    return hours[inverse]
+
+
+def summarize(events, undo_window=3.0, tz=None):
+    """
+    Usage report of an event DataFrame (output of read_events()).
+    Args:
+        events: pandas.DataFrame of events.
+        undo_window (float): An action undone by its inverse (pause after play,
+            previous after next, ...) within this many seconds counts as a misfire.
+        tz (str): Time zone for the time-of-day table (default: local time).
+    Returns:
+        dict with "gestures" (recognized count per gesture), "actions" (per action:
+        count, misfires, misfire_rate), "hourly" (actions per hour of day),
+        "sessions", "frames" and "hand_presence" (share of frames with hands).
+    """
+    import pandas as pd
+
+    gestures = events[events["kind"] == "gesture"]
+    actions = events[events["kind"] == "action"]
+    frames = events[events["kind"] == "frames"]
+
+    # Each action against the next one in the same session
+    actions = actions.sort_values(["session", "ts"], kind="stable")
+    codes = actions["action"].cat.codes.to_numpy()
+    categories = list(actions["action"].cat.categories)
+    inverse = np.array([categories.index(INVERSE_ACTIONS[a]) if INVERSE_ACTIONS.get(a) in categories else -2
+                        for a in categories] + [-2], dtype=np.int32)
+    session = actions["session"].cat.codes.to_numpy()
+    ts = actions["ts"].to_numpy()
+    misfire = np.zeros(len(actions), dtype=bool)
+    if len(actions) > 1:
+        misfire[:-1] = ((session[1:] == session[:-1]) & (ts[1:] - ts[:-1] <= undo_window)
+                        & (codes[1:] == inverse[codes[:-1]]))
+    per_action = pd.DataFrame({"action": actions["action"], "misfire": misfire}).groupby(
+        "action", observed=True)["misfire"].agg(count="size", misfires="sum")
+    per_action["misfire_rate"] = per_action["misfires"] / per_action["count"]
+
+    hourly = pd.Series(np.bincount(_hour_of_day(ts, tz), minlength=24), index=range(24))
+
+    frame_count = int(frames["frames"].sum())
+    return {
+        "gestures": gestures["gesture"].value_counts().sort_values(ascending=False),
+        "actions": per_action.sort_values("count", ascending=False),
+        "hourly": hourly,
+        "sessions": int(events["session"].nunique()),
+        "frames": frame_count,
+        "hand_presence": int(frames["hand_frames"].sum()) / frame_count if frame_count else 0.0,
+    }
+
+
+def format_summary(summary):
+    lines = [f"{summary['sessions']} sessions, {summary['frames']} frames, "
+             f"hands in {summary['hand_presence']:.1%} of frames", "", "Recognized gestures:"]
+    lines += [f"  {gesture:<16} {count:>10}" for gesture, count in summary["gestures"].items() if count]
+    lines += ["", f"  {'action':<16} {'count':>10} {'misfires':>9} {'rate':>7}"]
+    # itertuples() keeps each column's dtype; iterrows() would make the counts floats
+    columns = summary["actions"][["count", "misfires", "misfire_rate"]]
+    for action, count, misfires, rate in columns.itertuples(name=None):
+        lines.append(f"  {action:<16} {count:>10} {misfires:>9} {rate:>7.1%}")
+    lines += ["", "Actions by hour of day:"]
+    peak = max(summary["hourly"].max(), 1)
+    for hour, count in summary["hourly"].items():
+        lines.append(f"  {hour:02d}:00 {count:>10} {'#' * round(40 * count / peak)}")
+    return "\n".join(lines)
+
+
+def _parse_time(text):
+    """Epoch seconds from a number or an ISO date/time (local time unless it has an offset)."""
+    try:
+        return float(text)
+    except ValueError:
+        import pandas as pd
+
+        stamp = pd.Timestamp(text)
+        if stamp.tzinfo is None:
+            stamp = stamp.tz_localize(tzlocal())
+        return stamp.timestamp()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize the gesture event log.")
+    parser.add_argument("directory", nargs="?", default="logs/events", help="Event log directory")
+    parser.add_argument("--since", help="Start (ISO date/time or epoch seconds)")
+    parser.add_argument("--until", help="End (ISO date/time or epoch seconds)")
+    parser.add_argument("--undo-window", type=float, default=3.0,
+                        help="Seconds within which an undone action counts as a misfire")
+    parser.add_argument("--tz", help="Time zone for the hour-of-day table (default: local)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    events = read_events(args.directory, since=_parse_time(args.since) if args.since else None,
+                         until=_parse_time(args.until) if args.until else None)
+    loaded = time.perf_counter()
+    if events.empty:
+        print(f"No events in {args.directory}")
+        return 1
+    summary = summarize(events, undo_window=args.undo_window, tz=args.tz)
+    print(format_summary(summary))
+    print(f"\n{len(events)} events: loaded in {loaded - start:.2f}s, "
+          f"summarized in {time.perf_counter() - loaded:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
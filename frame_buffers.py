@@ -0,0 +1,45 @@
+import numpy as np
+
+
+class FramePool:
+    """
+    Small ring of preallocated frame buffers, handed out round-robin so OpenCV
+    calls can write into them through their dst= argument instead of allocating
+    a new array per frame. A buffer handed out by next() is reused `count` calls
+    later, so consumers must be done with a frame by then.
+    Args:
+        count (int): Number of buffers in the ring.
+        dtype: Element type of the buffers.
+    """
+
+    def __init__(self, count=3, dtype=np.uint8):
+        self.count = count
+        self.dtype = np.dtype(dtype)
+        self.shape = None
+        self._buffers = []
+        self._index = 0
+
+    def fit(self, shape):
+        """(Re)allocate the ring for frames of `shape`; no-op if it already matches."""
+        shape = tuple(shape)
+        if shape != self.shape:
+            self.shape = shape
+            self._buffers = [np.empty(shape, dtype=self.dtype) for _ in range(self.count)]
+            self._index = 0
+
+    def next(self, shape=None):
+        """
+        Return the next buffer of the ring.
+        Args:
+            shape (tuple): Frame shape; reallocates the ring when it changes.
+                If omitted, the current shape is used.
+        Returns:
+            numpy.ndarray, or None if no shape is known yet.
+        """
+        if shape is not None:
+            self.fit(shape)
+        if self.shape is None:
+            return None
+        buffer = self._buffers[self._index]
+        self._index = (self._index + 1) % self.count
+        return buffer
@@ -0,0 +1,441 @@
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from hand_tracking import HandTracker
+from latency_trace import FrameTrace
+
+# Header layout (int64 words) in front of the frame slots
+_WRITE_SEQ = 0   # sequence number of the last completed write
+_READ_SEQ = 1    # sequence number of the last frame the consumer has released
+_CLOSED = 2      # set to 1 by the writer when the source is exhausted
+_SLOT_SEQ = 3    # first of `slots` words holding the sequence number stored in each slot,
+                 # followed by `slots` words holding the frame a reader has put on hold there
+
+
+class FrameRing:
+    """
+    Ring buffer of preallocated frame slots in multiprocessing shared memory.
+    One writer fills the slots round-robin and readers address frames by slot
+    index, so frames cross process boundaries without pickling.
+    Every slot carries the sequence number of the frame it holds; a reader
+    remembers the sequence number it started with and checks it again with
+    is_current() to find out whether the writer overwrote the slot meanwhile.
+    Readers never write to a slot. They can hold() a frame until the consumer
+    releases it, which makes the writer skip that slot while another one is
+    free, but must still copy the frame out and check is_current() afterwards.
+    Use FrameRing.create() in the owning process and FrameRing.attach() elsewhere.
+    """
+
+    def __init__(self, shm, shape, slots, dtype, owner):
+        self.shm = shm
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.dtype = np.dtype(dtype)
+        self.owner = owner
+
+        header_words = _SLOT_SEQ + 2 * slots
+        self._held = _SLOT_SEQ + slots
+        self._header = np.ndarray((header_words,), dtype=np.int64, buffer=shm.buf)
+        # perf_counter() before and after each slot's frame was read from the source
+        self._read_times = np.ndarray((slots, 2), dtype=np.float64, buffer=shm.buf, offset=header_words * 8)
+        self._frames = np.ndarray((slots,) + self.shape, dtype=self.dtype,
+                                  buffer=shm.buf, offset=(header_words + 2 * slots) * 8)
+
+    @classmethod
+    def create(cls, shape, slots=4, dtype=np.uint8):
+        """
+        Allocate a new ring.
+        Args:
+            shape (tuple): Shape of one frame, e.g. (480, 640, 3).
+            slots (int): Number of frame slots.
+            dtype: Frame element type.
+        Returns:
+            FrameRing owning the shared memory block.
+        """
+        header_bytes = (_SLOT_SEQ + 4 * slots) * 8
+        frame_bytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        shm = shared_memory.SharedMemory(create=True, size=header_bytes + slots * frame_bytes)
+        ring = cls(shm, shape, slots, dtype, owner=True)
+        ring._header[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, spec):
+        """
+        Attach to a ring created by another process.
+        Args:
+            spec (dict): The creating ring's spec.
+        Returns:
+            FrameRing sharing the same memory block.
+        """
+        shm = shared_memory.SharedMemory(name=spec["name"])
+        return cls(shm, spec["shape"], spec["slots"], spec["dtype"], owner=False)
+
+    @property
+    def spec(self):
+        """Picklable description used to attach() from another process."""
+        return {"name": self.shm.name, "shape": self.shape, "slots": self.slots, "dtype": self.dtype.str}
+
+    @property
+    def closed(self):
+        """True once the writer has marked the stream as finished."""
+        return bool(self._header[_CLOSED])
+
+    def write(self, frame, read_start=0.0, read_end=0.0):
+        """
+        Copy a frame into the next slot.
+        Args:
+            frame (numpy.ndarray): Frame with the ring's shape and dtype.
+            read_start, read_end (float): perf_counter() around reading the frame.
+        Returns:
+            int sequence number assigned to the frame.
+        """
+        seq, view = self.slot_for_write()
+        np.copyto(view, frame)
+        self.commit(seq, read_start, read_end)
+        return seq
+
+    def slot_for_write(self):
+        """
+        Reserve the next slot so a producer can decode straight into it.
+        Slots holding a frame on hold are skipped (leaving a gap in the sequence
+        numbers), unless every other slot is on hold too.
+        Returns:
+            tuple: (seq, frame view). Call commit(seq) once the view is filled.
+        """
+        seq = int(self._header[_WRITE_SEQ]) + 1
+        read_seq = int(self._header[_READ_SEQ])
+        for _ in range(self.slots - 1):
+            if not self._is_held(seq % self.slots, read_seq):
+                break
+            seq += 1
+        slot = seq % self.slots
+        # A negative sequence marks the slot as being written
+        self._header[_SLOT_SEQ + slot] = -seq
+        return seq, self._frames[slot]
+
+    def commit(self, seq, read_start=0.0, read_end=0.0):
+        """Publish a frame reserved with slot_for_write(), with optional read timestamps."""
+        slot = seq % self.slots
+        self._read_times[slot] = (read_start, read_end)
+        self._header[_SLOT_SEQ + slot] = seq
+        self._header[_WRITE_SEQ] = seq
+
+    def read_times(self, slot):
+        """perf_counter() values taken before and after the slot's frame was read."""
+        return float(self._read_times[slot, 0]), float(self._read_times[slot, 1])
+
+    def release(self, seq):
+        """Tell the writer that the consumer is done with every frame up to `seq`."""
+        self._header[_READ_SEQ] = seq
+
+    def hold(self, slot, seq):
+        """
+        Ask the writer to leave frame `seq` in its slot until the consumer releases it.
+        Returns:
+            bool: False if the slot no longer holds the frame.
+        """
+        self._header[self._held + slot] = seq
+        return self.is_current(slot, seq)
+
+    def _is_held(self, slot, read_seq):
+        held = int(self._header[self._held + slot])
+        return held > read_seq and held == int(self._header[_SLOT_SEQ + slot])
+
+    def wait_writable(self, stop_event=None, poll=0.002):
+        """
+        Block until the next write would not overwrite an unreleased frame.
+        Used for sources like video files where no frame may be dropped.
+        Returns:
+            bool: False if stop_event was set while waiting.
+        """
+        next_seq = int(self._header[_WRITE_SEQ]) + 1
+        while next_seq - self.slots > int(self._header[_READ_SEQ]):
+            if stop_event is not None and stop_event.wait(poll):
+                return False
+            if stop_event is None:
+                time.sleep(poll)
+        return True
+
+    def mark_closed(self):
+        """Tell readers that no more frames will be written."""
+        self._header[_CLOSED] = 1
+
+    def written(self, seq):
+        """
+        Locate frame `seq` if it has been written.
+        Returns:
+            int slot index, or None if the frame is not available (yet).
+        """
+        if seq > int(self._header[_WRITE_SEQ]):
+            return None
+        return seq % self.slots
+
+    def latest(self):
+        """
+        Locate the newest complete frame.
+        Returns:
+            tuple: (seq, slot), or (0, None) if nothing has been written yet.
+        """
+        seq = int(self._header[_WRITE_SEQ])
+        if seq == 0:
+            return 0, None
+        return seq, seq % self.slots
+
+    def frame(self, slot):
+        """Return a zero-copy view of the frame stored in a slot."""
+        return self._frames[slot]
+
+    def is_current(self, slot, seq):
+        """True if the slot still holds frame `seq` (i.e. it was not overwritten)."""
+        return int(self._header[_SLOT_SEQ + slot]) == seq
+
+    def close(self):
+        """Detach from the shared memory (and free it if this process owns it)."""
+        self._header = None
+        self._read_times = None
+        self._frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # A caller still holds a frame view; the mapping goes away with it
+            pass
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _capture_worker(source, source_options, slots, drop_frames, spec_queue, new_frame, stop_event):
+    """
+    Capture process: read frames from the source straight into the ring.
+    Sends (ring spec, drop_frames) on spec_queue once the first frame is in, or None.
+    """
+    from capture import CameraSource, open_source
+    from runtime_config import enter_stage
+
+    enter_stage("capture")
+    cap = open_source(source, **source_options)
+    if drop_frames is None:
+        # Only a camera keeps going while we are busy; other sources can wait for us
+        drop_frames = isinstance(cap, CameraSource)
+    ring = None
+    try:
+        read_start = time.perf_counter()
+        ret, frame = cap.read()
+        if not ret:
+            spec_queue.put(None)
+            return
+
+        ring = FrameRing.create(frame.shape, slots=slots, dtype=frame.dtype)
+        ring.write(frame, read_start, time.perf_counter())
+        spec_queue.put((ring.spec, drop_frames))
+        new_frame.set()
+
+        while not stop_event.is_set():
+            if not drop_frames and not ring.wait_writable(stop_event):
+                break
+            # Decode directly into the next slot instead of a temporary frame
+            seq, view = ring.slot_for_write()
+            read_start = time.perf_counter()
+            ret, decoded = cap.read(view)
+            if not ret:
+                break
+            if decoded.ctypes.data != view.ctypes.data:
+                # The backend could not decode in place (e.g. the size changed)
+                np.copyto(view, decoded)
+            ring.commit(seq, read_start, time.perf_counter())
+            new_frame.set()
+
+        ring.mark_closed()
+        new_frame.set()
+        # Keep the block alive until the consumers are done with it
+        stop_event.wait()
+    finally:
+        cap.release()
+        if ring is not None:
+            ring.close()
+
+
+def _inference_worker(spec, drop_frames, max_num_hands, result_queue, new_frame, stop_event):
+    """
+    Inference process: run MediaPipe on the frames in the ring and send their landmarks.
+    With drop_frames it always jumps to the newest frame, otherwise it visits every frame.
+    It never writes to the ring: the capture process may be refilling a slot meanwhile.
+    """
+    import cv2
+    from hand_tracking import hands_from_results
+    from media_controls import get_hands_model
+    from runtime_config import enter_stage
+
+    enter_stage("inference")
+    hands = get_hands_model(max_num_hands)
+
+    ring = FrameRing.attach(spec)
+    rgb = np.empty(ring.shape, dtype=ring.dtype)
+    last_seq = 0
+    try:
+        while not stop_event.is_set():
+            if drop_frames:
+                seq, slot = ring.latest()
+            else:
+                seq = last_seq + 1
+                slot = ring.written(seq)
+            if slot is None or seq == last_seq:
+                if ring.closed:
+                    break
+                new_frame.wait(0.05)
+                new_frame.clear()
+                continue
+            last_seq = seq
+            # Keep the frame around until the consumer has copied it
+            if not ring.hold(slot, seq):
+                continue
+
+            cv2.cvtColor(ring.frame(slot), cv2.COLOR_BGR2RGB, dst=rgb)
+            if not ring.is_current(slot, seq):
+                continue  # overwritten while we were converting it
+
+            landmarks = hands_from_results(hands.process(rgb))
+            inference_end = time.perf_counter()
+            if not ring.is_current(slot, seq):
+                continue  # overwritten during inference, so the consumer couldn't show it
+
+            while not stop_event.is_set():
+                try:
+                    result_queue.put((seq, slot, landmarks, inference_end), timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+    finally:
+        try:
+            result_queue.put(None, timeout=1.0)
+        except queue.Full:
+            pass
+        ring.close()
+
+
+def _draw_hands(frame, hands):
+    """Draw Hand landmarks on a BGR frame the way draw_landmarks does for MediaPipe results."""
+    from mediapipe.framework.formats import landmark_pb2
+    from media_controls import mp_draw, mp_hands
+
+    for hand in hands:
+        hand_landmarks = landmark_pb2.NormalizedLandmarkList()
+        for x, y, z in hand.tolist():
+            hand_landmarks.landmark.add(x=x, y=y, z=z)
+        mp_draw.draw_landmarks(frame, hand_landmarks, mp_hands.HAND_CONNECTIONS)
+
+
+def detect_hands_multiprocess(video_path=None, is_webcam=True, slots=4, drop_frames=None, trace=False,
+                              source=None, source_options=None, max_num_hands=2):
+    """
+    Multiprocess variant of media_controls.detect_hands_in_video.
+    Capture and inference run in their own processes and exchange frames through
+    a shared-memory FrameRing; only slot indices and landmark lists are pickled.
+    Args:
+        video_path (str): Path to video file (None if using webcam).
+        is_webcam (bool): Flag to indicate whether to use webcam or video.
+        slots (int): Number of shared frame slots.
+        drop_frames (bool): Skip to the newest frame when inference falls behind.
+            Defaults to True for cameras and False for other sources (files, images).
+        trace (bool): Also yield a FrameTrace with the read and inference stages marked.
+        source: open_source() spec to read from instead of video_path/is_webcam.
+            It is opened in the capture process, so it must be picklable.
+        source_options (dict): Keyword arguments for open_source(), e.g. a camera mode.
+        max_num_hands (int): Hands to look for; 1 is the faster one-hand mode.
+    Yields:
+        tuple: (frame, landmarks) like detect_hands_in_video, or (frame, landmarks, trace).
+        The frame is a copy of the shared slot, reused (and overwritten) by the next iteration.
+    """
+    if source is None:
+        source = 0 if is_webcam else video_path
+
+    ctx = mp.get_context("spawn")
+    spec_queue = ctx.Queue()
+    result_queue = ctx.Queue(maxsize=slots - 1)
+    new_frame = ctx.Event()
+    stop_event = ctx.Event()
+
+    capture = ctx.Process(target=_capture_worker, daemon=True,
+                          args=(source, source_options or {}, slots, drop_frames, spec_queue, new_frame, stop_event))
+    capture.start()
+    workers = [capture]
+    # Import MediaPipe's drawing code while the capture process starts, not at the first frame
+    from media_controls import mp_draw  # noqa: F401
+    ring = None
+    try:
+        spec = None
+        while capture.is_alive() or not spec_queue.empty():
+            try:
+                spec = spec_queue.get(timeout=0.5)
+                break
+            except queue.Empty:
+                pass
+        if spec is None:
+            print("Error: Could not open video source.")
+            return
+
+        spec, drop_frames = spec
+        ring = FrameRing.attach(spec)
+        # The frames handed to the caller: a slot can be refilled while the caller holds it
+        output = np.empty(ring.shape, dtype=ring.dtype)
+        # Hand IDs are assigned here, in frame order
+        tracker = HandTracker()
+        inference = ctx.Process(target=_inference_worker, daemon=True,
+                                args=(spec, drop_frames, max_num_hands, result_queue, new_frame, stop_event))
+        inference.start()
+        workers.append(inference)
+
+        while True:
+            try:
+                item = result_queue.get(timeout=1.0)
+            except queue.Empty:
+                if not inference.is_alive():
+                    break
+                continue
+            if item is None:
+                break
+
+            seq, slot, landmarks, inference_end = item
+            landmarks = tracker(landmarks)
+            # Copy the frame out, then make sure the capture process didn't start
+            # refilling the slot before or during the copy
+            current = ring.is_current(slot, seq)
+            if current:
+                np.copyto(output, ring.frame(slot))
+                read_start, read_end = ring.read_times(slot)
+                current = ring.is_current(slot, seq)
+            ring.release(seq)
+            if not current:
+                continue  # already recycled for a newer frame
+
+            _draw_hands(output, landmarks)
+            if trace:
+                # perf_counter() is system wide, so the stamps compare across processes
+                frame_trace = FrameTrace(start=read_start)
+                frame_trace.stamps.update(read=read_end, inference=inference_end)
+                yield output, landmarks, frame_trace
+            else:
+                yield output, landmarks
+    finally:
+        stop_event.set()
+        for worker in workers:
+            worker.join(timeout=2.0)
+            if worker.is_alive():
+                worker.terminate()
+                worker.join(timeout=2.0)
+                if worker.is_alive():
+                    worker.kill()
+                    worker.join()
+            worker.close()
+        # Close the queues' pipes now rather than whenever they are garbage collected
+        spec_queue.close()
+        result_queue.close()
+        if ring is not None:
+            ring.close()
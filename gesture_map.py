@@ -0,0 +1,289 @@
+"""
+Declarative gesture -> action mapping.
+
+Rules live in gestures.json (finger patterns, orientation predicates and the
+action to run). They are compiled into a 32-entry table indexed by the finger
+bitmask, so classifying a hand is one table lookup plus, at most, the few
+predicates of the rules that share its finger pattern. Chords combine two
+hands: while one hand holds a modifier gesture, the gesture of the other hand
+selects the chord's action. The file is re-read when it changes on disk.
+"""
+import json
+import os
+import threading
+import time
+
+from player import ACTIONS
+
+FINGERS = ("thumb", "index", "middle", "ring", "pinky")
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gestures.json")
+
+# (tip, pip) landmark indices of index..pinky
+_FINGER_JOINTS = ((8, 6), (12, 10), (16, 14), (20, 18))
+
+
+def finger_mask(hand):
+    """
+    Finger states of one hand as a bitmask: bit i is set when finger i
+    (thumb, index, middle, ring, pinky) is up.
+    Args:
+        hand: 21 (x, y, z) landmarks; a hand_tracking.Hand with a handedness label
+            decides the thumb direction from the label, other inputs guess it
+            from the side of the wrist the thumb is on.
+    """
+    # The thumb folds sideways: it is up when its tip is further out than its IP joint
+    thumb_x = hand[4][0]
+    label = getattr(hand, "label", None)
+    if label is not None:
+        # MediaPipe labels assume a mirrored image: on raw camera frames a
+        # "Left" hand is the user's right hand, whose thumb points to the image's right
+        thumb_right = label == "Left"
+    else:
+        thumb_right = thumb_x > hand[0][0]
+    if thumb_right:
+        mask = 1 if thumb_x > hand[3][0] else 0
+    else:
+        mask = 1 if thumb_x < hand[3][0] else 0
+    # Other fingers are up when the tip is above the PIP joint
+    bit = 2
+    for tip, pip in _FINGER_JOINTS:
+        if hand[tip][1] < hand[pip][1]:
+            mask |= bit
+        bit <<= 1
+    return mask
+
+
+# Orientation predicates usable in the "when" list of a rule
+PREDICATES = {
+    # Wrist above the middle finger MCP
+    "palm_down": lambda hand: hand[0][1] < hand[9][1],
+    "palm_up": lambda hand: hand[0][1] >= hand[9][1],
+}
+
+
+def _matching_masks(rule):
+    """All finger bitmasks a rule's pattern and count constraints accept."""
+    pattern = rule.get("fingers", "xxxxx")
+    if len(pattern) != 5 or set(pattern) - set("01x"):
+        raise ValueError(f"{rule.get('name')}: 'fingers' must be 5 characters of 0, 1 or x, got {pattern!r}")
+    counted = rule.get("count", FINGERS)
+    unknown = set(counted) - set(FINGERS)
+    if unknown:
+        raise ValueError(f"{rule.get('name')}: unknown fingers in 'count': {sorted(unknown)}")
+    count_bits = sum(1 << FINGERS.index(finger) for finger in counted)
+    min_up = rule.get("min_up", 0)
+    max_up = rule.get("max_up", 5)
+
+    masks = []
+    for mask in range(32):
+        if any(c != "x" and int(c) != (mask >> i) & 1 for i, c in enumerate(pattern)):
+            continue
+        if min_up <= bin(mask & count_bits).count("1") <= max_up:
+            masks.append(mask)
+    return masks
+
+
+def _check_action(owner, action):
+    """Raise ValueError unless `action` is None or one of player.ACTIONS."""
+    if action is not None and action not in ACTIONS:
+        raise ValueError(f"{owner}: unknown action {action!r} (expected one of {', '.join(ACTIONS)} or null)")
+
+
+def compile_rules(rules):
+    """
+    Compile gesture rules into the lookup table.
+    Args:
+        rules: List of rule dicts (see gestures.json), highest priority first.
+    Returns:
+        List of 32 tuples of (predicates, action, name), in rule order. Entries
+        after the first rule without predicates can never match and are dropped.
+    """
+    table = [[] for _ in range(32)]
+    for rule in rules:
+        # A rule with "action": null only serves as a chord modifier or gesture
+        if "action" not in rule:
+            raise ValueError(f"{rule.get('name')}: missing 'action'")
+        _check_action(rule.get("name"), rule["action"])
+        when = rule.get("when", [])
+        if isinstance(when, str):
+            when = [when]
+        unknown = [name for name in when if name not in PREDICATES]
+        if unknown:
+            raise ValueError(f"{rule.get('name')}: unknown predicates {unknown}")
+        predicates = tuple(PREDICATES[name] for name in when)
+        for mask in _matching_masks(rule):
+            entry = table[mask]
+            if not (entry and not entry[-1][0]):
+                entry.append((predicates, rule["action"], rule.get("name", rule["action"])))
+    return [tuple(entry) for entry in table]
+
+
+def compile_chords(chords, rules):
+    """
+    Compile two-hand chords.
+    Args:
+        chords: List of chord dicts with "modifier" and "gesture" (names of
+            gesture rules) and the "action" to run.
+        rules: The gesture rules the names refer to.
+    Returns:
+        dict mapping (modifier name, gesture name) to the action.
+    """
+    names = {rule.get("name", rule["action"]) for rule in rules}
+    compiled = {}
+    for chord in chords:
+        for key in ("modifier", "gesture", "action"):
+            if key not in chord:
+                raise ValueError(f"chord {chord.get('name')}: missing {key!r}")
+        for key in ("modifier", "gesture"):
+            if chord[key] not in names:
+                raise ValueError(f"chord {chord.get('name')}: unknown gesture {chord[key]!r}")
+        _check_action(f"chord {chord.get('name')}", chord["action"])
+        compiled[(chord["modifier"], chord["gesture"])] = chord["action"]
+    return compiled
+
+
+class GestureMap:
+    """
+    Gesture rules loaded from a JSON file, compiled to a bitmask table and
+    reloaded when the file changes.
+    Args:
+        path (str): Rules file (defaults to gestures.json next to this module).
+        check_interval (float): Minimum seconds between two checks of the file's mtime.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.rules = []
+        self.chords = []
+        self.table = [()] * 32
+        self.chord_table = {}
+        self.modifiers = frozenset()
+        self._stamp = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self):
+        """
+        Re-read and compile the rules file. If it is missing or invalid, the
+        error is printed and the previous rules stay in effect.
+        Returns:
+            True if new rules were loaded.
+        """
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+                self._stamp = (stat.st_mtime_ns, stat.st_size)
+                with open(self.path, encoding="utf-8") as f:
+                    config = json.load(f)
+                rules = config["gestures"]
+                chords = config.get("chords", [])
+                table = compile_rules(rules)
+                chord_table = compile_chords(chords, rules)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"Error loading gesture rules from {self.path}: {e}")
+                return False
+            self.rules = rules
+            self.chords = chords
+            self.table = table
+            self.chord_table = chord_table
+            self.modifiers = frozenset(modifier for modifier, _ in chord_table)
+            return True
+
+    def reload_if_changed(self):
+        """Reload the rules if the file changed since the last load (throttled)."""
+        now = time.monotonic()
+        if now < self._next_check:
+            return False
+        self._next_check = now + self.check_interval
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        if (stat.st_mtime_ns, stat.st_size) == self._stamp:
+            return False
+        return self.reload()
+
+    def match(self, hand):
+        """
+        First rule matching one hand.
+        Returns:
+            (action, name) of the rule, or (None, None).
+        """
+        for predicates, action, name in self.table[finger_mask(hand)]:
+            if all(predicate(hand) for predicate in predicates):
+                return action, name
+        return None, None
+
+    def classify(self, hand):
+        """
+        Action for one hand.
+        Args:
+            hand: 21 (x, y, z) landmarks.
+        Returns:
+            The action name, or None.
+        """
+        return self.match(hand)[0]
+
+    def classify_hands(self, hands):
+        """
+        Action for all hands of a frame.
+        While one hand holds a chord modifier and another hand is visible, only
+        chords can fire (the modifier's own action is suppressed). Otherwise
+        the first hand, in the given order, with an action wins.
+        Args:
+            hands: List of hands (21 (x, y, z) landmarks each), e.g. ordered by hand_id.
+        Returns:
+            The action name, or None.
+        """
+        matches = [self.match(hand) for hand in hands]
+        if len(matches) > 1 and self.modifiers:
+            names = [name for _, name in matches]
+            held = [i for i, name in enumerate(names) if name in self.modifiers]
+            if held:
+                for i in held:
+                    for j, name in enumerate(names):
+                        if j != i:
+                            action = self.chord_table.get((names[i], name))
+                            if action is not None:
+                                return action
+                return None
+        for action, _ in matches:
+            if action is not None:
+                return action
+        return None
+
+    def guide(self):
+        """Rules and chords with an action, as shown in the gesture guides: list of dicts with name, emoji, hint, action and label."""
+        return [{
+            "name": rule.get("name", rule["action"]),
+            "emoji": rule.get("emoji", ""),
+            "hint": rule.get("hint", ""),
+            "action": rule["action"],
+            "label": rule.get("label", rule["action"].replace("_", " ").title()),
+        } for rule in self.rules + self.chords if rule["action"] is not None]
+
+
+_default_map = None
+_default_lock = threading.Lock()
+
+
+def set_gesture_file(path):
+    """Make get_gesture_map() use the rules in `path` instead of gestures.json (e.g. per zone)."""
+    global _default_map
+    with _default_lock:
+        _default_map = GestureMap(path)
+
+
+def get_gesture_map():
+    """Shared GestureMap for gestures.json (or set_gesture_file()), checked for changes on each call."""
+    global _default_map
+    if _default_map is None:
+        with _default_lock:
+            if _default_map is None:
+                _default_map = GestureMap()
+    else:
+        _default_map.reload_if_changed()
+    return _default_map
@@ -0,0 +1,156 @@
+"""
+Hands with MediaPipe's handedness attached, and stable IDs across frames.
+
+MediaPipe reports a "Left"/"Right" label and a confidence score per hand
+(multi_handedness). The labels assume a mirrored (selfie) image; on the raw,
+unflipped camera frames this pipeline uses, "Left" is the user's right hand.
+"""
+import time
+
+import numpy as np
+
+WRIST = 0
+
+
+class Hand(np.ndarray):
+    """
+    (21, 3) landmark array that also carries the hand's handedness and track ID.
+    It behaves like any ndarray (indexing, arithmetic, np.asarray); the extra
+    attributes survive views, copies and pickling.
+    Attributes:
+        label (str): MediaPipe handedness, "Left" or "Right" (None if unknown).
+        score (float): Handedness confidence.
+        hand_id (int): Stable ID assigned by HandTracker (None until tracked).
+    """
+
+    def __new__(cls, landmarks, label=None, score=None, hand_id=None):
+        hand = np.asarray(landmarks, dtype=np.float64).view(cls)
+        hand.label = label
+        hand.score = score
+        hand.hand_id = hand_id
+        return hand
+
+    def __array_finalize__(self, obj):
+        self.label = getattr(obj, "label", None)
+        self.score = getattr(obj, "score", None)
+        self.hand_id = getattr(obj, "hand_id", None)
+
+    def __reduce__(self):
+        constructor, args, state = super().__reduce__()
+        return constructor, args, (state, self.label, self.score, self.hand_id)
+
+    def __setstate__(self, state):
+        array_state, self.label, self.score, self.hand_id = state
+        super().__setstate__(array_state)
+
+    def with_landmarks(self, landmarks):
+        """New Hand with other landmarks (e.g. smoothed ones) and this hand's metadata."""
+        return Hand(landmarks, self.label, self.score, self.hand_id)
+
+
+def hands_from_results(results):
+    """
+    Turn a MediaPipe Hands result into a list of Hand objects.
+    Args:
+        results: Output of mediapipe Hands.process().
+    Returns:
+        List of Hand, in MediaPipe's order.
+    """
+    if not results.multi_hand_landmarks:
+        return []
+    handedness = results.multi_handedness or []
+    hands = []
+    for i, hand_landmarks in enumerate(results.multi_hand_landmarks):
+        label = score = None
+        if i < len(handedness):
+            classification = handedness[i].classification[0]
+            label, score = classification.label, classification.score
+        hands.append(Hand([(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark], label, score))
+    return hands
+
+
+def match_greedy(current, previous, max_jump, forbid=None):
+    """
+    Pair the hands of this frame with the tracks of earlier ones, closest pairs first.
+    Args:
+        current: (n, 2) wrist positions in this frame.
+        previous: (m, 2) last known wrist positions of the tracks.
+        max_jump (float): Largest distance that still counts as the same hand.
+        forbid: Optional (n, m) boolean array of pairs that must never match.
+    Returns:
+        List of n indices into `previous` (None for hands without a match).
+    """
+    assigned = [None] * len(current)
+    if len(current) == 0 or len(previous) == 0:
+        return assigned
+    current = np.asarray(current, dtype=np.float64)
+    previous = np.asarray(previous, dtype=np.float64)
+    distances = np.linalg.norm(current[:, None, :] - previous[None, :, :], axis=2)
+    if forbid is not None:
+        distances[forbid] = np.inf
+
+    used_tracks = set()
+    for flat_index in np.argsort(distances, axis=None):
+        hand_index, track_index = divmod(int(flat_index), len(previous))
+        if distances[hand_index, track_index] > max_jump:
+            break
+        if assigned[hand_index] is not None or track_index in used_tracks:
+            continue
+        assigned[hand_index] = track_index
+        used_tracks.add(track_index)
+    return assigned
+
+
+class HandTracker:
+    """
+    Give each physical hand a stable ID across frames.
+    A hand keeps its ID when it reappears close to where that ID was last seen
+    with the same handedness, so IDs don't swap when MediaPipe reorders its
+    results or two hands cross.
+    Args:
+        max_jump (float): Largest wrist movement (normalized units) between frames
+            that still counts as the same hand.
+        forget_after (float): Seconds a hand may be missing before its ID is retired.
+    """
+
+    def __init__(self, max_jump=0.25, forget_after=0.5):
+        self.max_jump = max_jump
+        self.forget_after = forget_after
+        self._tracks = []  # list of [hand_id, label, last_wrist, last_seen]
+        self._next_id = 0
+
+    def reset(self):
+        """Forget all hands."""
+        self._tracks = []
+
+    def __call__(self, hands, timestamp=None):
+        """
+        Assign hand IDs in place.
+        Args:
+            hands: List of Hand from one frame.
+            timestamp (float): Frame time in seconds (defaults to time.monotonic()).
+        Returns:
+            The same list, sorted by hand_id (oldest hand first).
+        """
+        t = time.monotonic() if timestamp is None else timestamp
+        self._tracks = [track for track in self._tracks if t - track[3] <= self.forget_after]
+        if not hands:
+            return hands
+
+        # A hand never continues a track of the other handedness
+        forbid = np.array([[hand.label is not None and track[1] is not None and hand.label != track[1]
+                            for track in self._tracks] for hand in hands], dtype=bool)
+        matches = match_greedy([hand[WRIST, :2] for hand in hands], [track[2] for track in self._tracks],
+                               self.max_jump, forbid.reshape(len(hands), len(self._tracks)))
+        assigned = [None if index is None else self._tracks[index] for index in matches]
+
+        for hand, track in zip(hands, assigned):
+            if track is None:
+                track = [self._next_id, hand.label, None, t]
+                self._next_id += 1
+                self._tracks.append(track)
+            track[2] = hand[WRIST, :2].copy()
+            track[3] = t
+            hand.hand_id = track[0]
+        hands.sort(key=lambda hand: hand.hand_id)
+        return hands
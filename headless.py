@@ -0,0 +1,200 @@
+"""
+Headless gesture controller for kiosk deployments.
+
+Runs capture -> hand detection -> gesture mapping -> playback without Streamlit
+or a browser. Stop it with Ctrl+C or SIGTERM; SIGUSR1 profiles it for a while.
+
+Usage:
+    python -m headless --source 0 --songs songs --cooldown 2 --status
+"""
+import argparse
+import signal
+import sys
+import time
+
+from capture import open_source, parse_mode
+from event_log import EventLog, SessionRecorder
+from gesture_map import set_gesture_file
+from landmark_filter import HandSmoother
+from latency_trace import LatencyLog
+from media_controls import GestureDebouncer, detect_hands_in_video, map_gesture_to_action
+from pinch_volume import MODES as VOLUME_GESTURE_MODES
+from pinch_volume import PinchVolumeControl
+from player import MediaPlayer
+from sampling_profiler import install_signal_handler
+
+
+class StatusLine:
+    """Single self-overwriting terminal line with player state, gesture and frame rate."""
+
+    def __init__(self, stream=sys.stderr, interval=0.5):
+        self.stream = stream
+        self.interval = interval
+        self.last_write = 0.0
+        self.frames = 0
+        self.width = 0
+
+    def update(self, player, gesture):
+        self.frames += 1
+        now = time.monotonic()
+        elapsed = now - self.last_write
+        if elapsed < self.interval:
+            return
+        fps = self.frames / elapsed if self.last_write else 0.0
+        position = int(player.position())
+        duration = int(player.duration or 0)
+        line = (f"[{player.status}] {player.current_song} {position // 60}:{position % 60:02d}/"
+                f"{duration // 60}:{duration % 60:02d} | gesture: {gesture or '-'} | {fps:.1f} fps")
+        self.stream.write("\r" + line.ljust(self.width))
+        self.stream.flush()
+        self.width = len(line)
+        self.last_write = now
+        self.frames = 0
+
+    def close(self):
+        if self.width:
+            self.stream.write("\n")
+            self.stream.flush()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Control music playback with hand gestures, without a UI.")
+    parser.add_argument("--source", default="0",
+                        help="Camera index or /dev/video* path, video file, image directory or 'synthetic'")
+    parser.add_argument("--camera-mode", default="", help="Requested camera mode, e.g. 640x480@30:MJPG")
+    parser.add_argument("--camera-buffer", type=int, default=None, help="Driver frame buffer size (1 = freshest)")
+    parser.add_argument("--songs", default="songs", help="Song folder")
+    parser.add_argument("--audio-device", default=None, help="Audio output device name (default: the system's)")
+    parser.add_argument("--gestures", default=None, help="Gesture rules file (default: gestures.json)")
+    parser.add_argument("--volume", type=int, default=70, help="Initial volume (0-100)")
+    parser.add_argument("--cooldown", type=float, default=2.0, help="Seconds between two gesture actions")
+    parser.add_argument("--no-smoothing", action="store_true", help="Classify raw landmarks")
+    parser.add_argument("--one-hand", action="store_true",
+                        help="Track a single hand (faster; disables two-hand chords)")
+    parser.add_argument("--volume-gesture", choices=VOLUME_GESTURE_MODES + ("off",), default="pinch",
+                        help="Continuous volume control after holding the thumb+index 'L' pose")
+    parser.add_argument("--event-log", default="logs/events",
+                        help="Directory of the gesture event log ('' to disable; see event_log.py)")
+    parser.add_argument("--zone", default="headless", help="Name recorded as the source of logged events")
+    parser.add_argument("--latency-log", default="logs/latency-{zone}.npz",
+                        help="Where the gesture-to-audio latency log is saved, every minute and at exit "
+                             "('' to disable; {zone} is replaced by --zone)")
+    parser.add_argument("--status", action="store_true", help="Show a terminal status line")
+    parser.add_argument("--profile-dir", default="profiles",
+                        help="Where SIGUSR1 profiling windows are written (see sampling_profiler.py)")
+    parser.add_argument("--profile-seconds", type=float, default=30.0, help="Length of a profiling window")
+    return parser
+
+
+def run(args, stop_requested=lambda: False, on_frame=None):
+    """
+    Run the controller until the source ends or stop_requested() returns True.
+    Args:
+        args: Parsed command line arguments (see build_parser()).
+        stop_requested: Callable polled once per frame.
+        on_frame: Optional callable run after every frame (e.g. a supervisor heartbeat).
+    """
+    if args.gestures:
+        set_gesture_file(args.gestures)
+    player = MediaPlayer(song_folder=args.songs, volume=args.volume, audio_device=args.audio_device)
+    player.load_songs()
+    if not player.has_songs:
+        print(f"No songs found in '{args.songs}'", file=sys.stderr)
+
+    source_options = parse_mode(args.camera_mode)
+    if args.camera_buffer:
+        source_options["buffer_size"] = args.camera_buffer
+    source = open_source(args.source, **source_options)
+    if not source.isOpened():
+        print(f"Error: Could not open video source {args.source!r}", file=sys.stderr)
+        player.close()
+        return 1
+    print(f"Capturing from {source.mode}", file=sys.stderr)
+
+    smoother = None if args.no_smoothing else HandSmoother()
+    debouncer = GestureDebouncer(cooldown=args.cooldown)
+    event_log = EventLog(args.event_log) if args.event_log else None
+    recorder = SessionRecorder(event_log, args.zone) if event_log is not None else None
+    latency_log = LatencyLog(path=args.latency_log.format(zone=args.zone)) if args.latency_log else None
+
+    def set_volume(volume):
+        player.set_volume(volume)
+        if recorder is not None:
+            recorder.action("volume", value=volume)
+
+    volume_control = None
+    if args.volume_gesture != "off":
+        volume_control = PinchVolumeControl(set_volume, volume=player.volume, mode=args.volume_gesture)
+    status = StatusLine() if args.status else None
+    frames = detect_hands_in_video(source=source, annotate=False, trace=True,
+                                   max_num_hands=1 if args.one_hand else 2)
+    # Trace of the first frame showing the current gesture, so the time spent
+    # waiting for the cooldown shows up in the latency breakdown
+    previous_gesture = None
+    onset_trace = None
+    try:
+        for _, landmarks, trace in frames:
+            if stop_requested():
+                break
+            if smoother is not None:
+                landmarks = smoother(landmarks)
+            if volume_control is not None and volume_control.update(landmarks):
+                # Volume mode: logged and shown as the "volume" gesture
+                gesture = "volume" if volume_control.engaged else None
+                trace.mark("classify")
+                action = None
+            else:
+                gesture = map_gesture_to_action(landmarks)
+                trace.mark("classify")
+                action = debouncer.update(gesture)
+            if gesture != previous_gesture:
+                previous_gesture = gesture
+                onset_trace = trace
+            if action is not None:
+                onset_trace.mark("debounce")
+                player.handle_action(action)
+                onset_trace.mark("playback")
+                if latency_log is not None:
+                    latency_log.record(action, onset_trace)
+                if recorder is not None:
+                    recorder.action(action, gesture)
+            if recorder is not None:
+                recorder.frame(landmarks, gesture)
+            # Auto-advance at the end of a track
+            player.update()
+            if status is not None:
+                status.update(player, gesture)
+            if on_frame is not None:
+                on_frame()
+    finally:
+        frames.close()
+        source.release()
+        player.close()
+        if status is not None:
+            status.close()
+        if event_log is not None:
+            recorder.flush()
+            event_log.close()
+        if latency_log is not None:
+            latency_log.save()
+            if len(latency_log):
+                print(latency_log.format_summary(), file=sys.stderr)
+    return 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    stop = []
+
+    def request_stop(signum, frame):
+        stop.append(signum)
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+    install_signal_handler(duration=args.profile_seconds, directory=args.profile_dir)
+    return run(args, stop_requested=lambda: bool(stop))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,487 @@
+"""
+Central recognition host for thin clients that capture with the browser.
+
+Clients send their camera frames as binary WebSocket messages (JPEG, PNG or
+WebP, one image per message) to /ingest and get one JSON text message back
+per recognised frame, over the same socket:
+    {"frame": 41, "gesture": "play", "action": "play", "hands": [...],
+     "latency_ms": 38.2, "dropped": 3}
+`frame` counts the client's messages from 0, `gesture` is the frame's
+classification, `action` is set on the frames where the debouncer fires it,
+and `hands` lists each hand's hand_id and handedness (with ?landmarks=1 also
+its 21 landmarks). A frame that can't be decoded gets {"frame": n, "error": ...}.
+
+Per client, only the newest frame waits: one arriving while the previous one
+is still waiting replaces it (latest frame wins; `dropped` counts those). A
+client never has more than one frame queued or in progress, and the worker
+threads decode and recognise the clients' frames in turn, so a fast sender
+can't starve the others.
+
+Hands instances (about 80 MB each) come from a bounded HandsPool instead of
+one per client. A client leases one of the --models tracking-mode instances
+and keeps it while it streams, so the instance follows that client's hands
+only. Clients beyond that run on the --static-models static-image instances,
+which keep no state between frames and so can take any client's next frame.
+They are a bit slower per frame with a hand in view, since palm detection runs
+every time. Moving a tracking instance to another client every frame would
+mean a graph reset each time, which costs more than a frame of inference. A
+lease moves only when its client leaves or pauses for two seconds.
+
+Memory is bounded by the pool, --max-clients pending frames of at most
+--max-frame-kb, and one decoded frame per worker thread.
+
+Also served:
+    /           capture page (templates/capture.html, static/js/capture.js)
+    /stats      clients, frames, drops and pool usage (JSON)
+
+The Flask app (web_app.py) has no WebSocket support, so this is a separate
+Tornado server. SIGUSR1 profiles it for --profile-seconds (see sampling_profiler.py).
+
+Usage:
+    python ingest_server.py --port 8765 --models 4 --static-models 2 --max-clients 48
+"""
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import tornado.ioloop
+import tornado.web
+import tornado.websocket
+
+from hand_tracking import HandTracker, hands_from_results
+from landmark_filter import HandSmoother
+from media_controls import GestureDebouncer, map_gesture_to_action
+from runtime_config import enter_stage, run_in_stage
+from sampling_profiler import install_signal_handler
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class HandsPool:
+    """
+    Bounded set of Hands instances shared by many client streams.
+    A stream leases a tracking-mode instance and keeps it for as long as it
+    sends frames, so the instance tracks that stream's hands only. Streams that
+    hold no lease (all are taken) get a stateless static-image instance per
+    frame instead. A lease ends when its stream closes or has been idle for
+    `lease_timeout` seconds; the instance's graph is reset before its next lease.
+    Instances are built on demand.
+    Args:
+        size (int): Tracking-mode instances, i.e. streams that can hold a lease.
+        static (int): Static-image instances for the streams without a lease (at least 1).
+        max_num_hands (int): Hands to look for; 1 is the faster one-hand mode.
+        lease_timeout (float): Idle seconds after which another stream may take a lease.
+    """
+
+    def __init__(self, size=4, static=2, max_num_hands=2, lease_timeout=2.0):
+        self.size = size
+        self.static = max(1, static)
+        self.max_num_hands = max_num_hands
+        self.lease_timeout = lease_timeout
+        self.leases_granted = 0
+        self.static_frames = 0
+        self._tracking = []  # built tracking instances
+        self._leases = {}  # tracking instance -> [owner or None, last use]
+        self._building = 0
+        self._static_free = []
+        self._static_built = 0
+        self._busy = set()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def _build(self, static_image_mode):
+        import mediapipe as mp
+
+        mp_hands = mp.solutions.hands
+        # Built under the inference stage's settings so the graph's threads inherit them
+        return run_in_stage("inference", lambda: mp_hands.Hands(
+            static_image_mode=static_image_mode, max_num_hands=self.max_num_hands,
+            min_detection_confidence=0.5, min_tracking_confidence=0.5))
+
+    def _take(self, owner, now):
+        """Pick an instance under the lock: (instance or None, what to do with it)."""
+        for model, lease in self._leases.items():
+            if lease[0] is owner and model not in self._busy:
+                return model, "use"
+        expired = [model for model, lease in self._leases.items() if model not in self._busy
+                   and (lease[0] is None or now - lease[1] > self.lease_timeout)]
+        if expired:
+            return min(expired, key=lambda model: self._leases[model][1]), "lease"
+        if len(self._tracking) + self._building < self.size:
+            self._building += 1
+            return None, "build"
+        if self._static_free:
+            return self._static_free.pop(), "static"
+        if self._static_built < self.static:
+            self._static_built += 1
+            return None, "build static"
+        return None, "wait"
+
+    def acquire(self, owner):
+        """
+        Check an instance out for one frame of `owner`'s stream; blocks only
+        while the stream has no lease and every static instance is in use.
+        Returns:
+            A Hands instance, to be given back with release().
+        """
+        now = time.monotonic()
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("HandsPool is closed")
+                model, step = self._take(owner, now)
+                if step != "wait":
+                    break
+                self._cond.wait()
+            if model is not None:
+                self._busy.add(model)
+            if step == "lease":
+                self._leases[model] = [owner, now]
+                self.leases_granted += 1
+            elif step == "use":
+                self._leases[model][1] = now
+            elif step == "static":
+                self.static_frames += 1
+
+        try:
+            if step == "build":
+                model = self._build(False)
+            elif step == "build static":
+                model = self._build(True)
+            elif step == "lease":
+                # The graph still tracks the previous lease holder's hands
+                model.reset()
+        except BaseException:
+            with self._cond:
+                if step == "build":
+                    self._building -= 1
+                elif step == "build static":
+                    self._static_built -= 1
+                else:
+                    self._busy.discard(model)
+                    if step == "static":
+                        self._static_free.append(model)
+                    else:
+                        self._leases[model] = [None, 0.0]
+                self._cond.notify_all()
+            raise
+
+        with self._cond:
+            self._busy.add(model)
+            if step == "build":
+                self._building -= 1
+                self._tracking.append(model)
+                self._leases[model] = [owner, now]
+                self.leases_granted += 1
+            elif step == "build static":
+                self.static_frames += 1
+        return model
+
+    def release(self, model):
+        with self._cond:
+            self._busy.discard(model)
+            if self._closed:
+                model.close()
+                return
+            if model not in self._leases:
+                self._static_free.append(model)
+            self._cond.notify_all()
+
+    def forget(self, owner):
+        """End `owner`'s lease (its stream closed), so another stream can take the instance."""
+        with self._cond:
+            for lease in self._leases.values():
+                if lease[0] is owner:
+                    lease[0] = None
+            self._cond.notify_all()
+
+    def close(self):
+        """Close the idle instances; instances still in use are closed when they come back."""
+        with self._cond:
+            self._closed = True
+            models = [model for model in self._tracking if model not in self._busy] + self._static_free
+            self._tracking, self._static_free = [], []
+            self._leases.clear()
+            self._cond.notify_all()
+        for model in models:
+            model.close()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "static": self.static,
+                "built": len(self._tracking) + self._static_built,
+                "leased": sum(lease[0] is not None for lease in self._leases.values()),
+                "leases_granted": self.leases_granted,
+                "static_frames": self.static_frames,
+            }
+
+
+class ClientStream:
+    """
+    Recognition state of one connected client: its newest waiting frame, hand
+    tracker, landmark smoother and gesture debouncer.
+    Args:
+        server (IngestServer): Server whose workers and pool process the frames.
+        send: Callable taking the result dict of a frame; called from a worker thread.
+        landmarks (bool): Include the landmarks of each hand in the results.
+    """
+
+    def __init__(self, server, send, landmarks=False):
+        self.server = server
+        self.send = send
+        self.landmarks = landmarks
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.closed = False
+        self._pending = None  # (frame index, data, receive time)
+        self._busy = False
+        self._lock = threading.Lock()
+        self._tracker = HandTracker()
+        self._smoother = HandSmoother()
+        self._debouncer = GestureDebouncer(cooldown=server.cooldown)
+
+    def push(self, data):
+        """Queue a compressed frame, replacing the one still waiting if any."""
+        with self._lock:
+            if self.closed:
+                return
+            if self._pending is not None:
+                self.dropped += 1
+            self._pending = (self.received, data, time.monotonic())
+            self.received += 1
+            if self._busy:
+                return
+            self._busy = True
+        self.server.submit(self._process_next)
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+            self._pending = None
+        self.server.pool.forget(self)
+
+    def _process_next(self):
+        with self._lock:
+            pending, self._pending = self._pending, None
+        try:
+            if pending is not None:
+                self.send(self._recognise(*pending))
+        except Exception as e:
+            print(f"Error: ingest worker failed: {e}", file=sys.stderr)
+        finally:
+            with self._lock:
+                self._busy = self._pending is not None and not self.closed
+            # One frame per turn: go to the back of the queue so other clients get theirs
+            if self._busy:
+                self.server.submit(self._process_next)
+
+    def _recognise(self, index, data, received):
+        frame_rgb = self.server.decode(data)
+        if frame_rgb is None:
+            return {"frame": index, "error": "could not decode the frame"}
+        model = self.server.pool.acquire(self)
+        try:
+            results = model.process(frame_rgb)
+        finally:
+            self.server.pool.release(model)
+        hands = self._smoother(self._tracker(hands_from_results(results), received), received)
+        gesture = map_gesture_to_action(hands)
+        action = self._debouncer.update(gesture)
+        self.processed += 1
+        described = []
+        for hand in hands:
+            entry = {"hand_id": hand.hand_id, "label": hand.label}
+            if self.landmarks:
+                entry["landmarks"] = np.round(np.asarray(hand), 4).tolist()
+            described.append(entry)
+        return {
+            "frame": index,
+            "gesture": gesture,
+            "action": action,
+            "hands": described,
+            "latency_ms": round((time.monotonic() - received) * 1000, 1),
+            "dropped": self.dropped,
+        }
+
+
+class IngestServer:
+    """
+    Worker threads, Hands pool and client registry behind the /ingest endpoint.
+    Args:
+        models (int): Tracking-mode instances of the HandsPool (clients that can hold a lease).
+        static_models (int): Static-image instances for the other clients.
+        workers (int): Decode and inference threads (default: one per instance).
+        max_clients (int): Connections beyond this are refused.
+        max_frame_bytes (int): Largest accepted message.
+        cooldown (float): Seconds between two gesture actions of a client.
+        max_num_hands (int): Hands to look for; 1 is the faster one-hand mode.
+    """
+
+    def __init__(self, models=4, static_models=2, workers=None, max_clients=48, max_frame_bytes=512 * 1024,
+                 cooldown=2.0, max_num_hands=2):
+        self.max_clients = max_clients
+        self.max_frame_bytes = max_frame_bytes
+        self.cooldown = cooldown
+        self.pool = HandsPool(models, static_models, max_num_hands)
+        self.clients = set()
+        self.refused = 0
+        self._buffers = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=workers or models + self.pool.static, thread_name_prefix="ingest",
+                                            initializer=enter_stage, initargs=("capture",))
+
+    def submit(self, function):
+        self._executor.submit(function)
+
+    def decode(self, data):
+        """Decode a compressed frame into this thread's reused RGB buffer; None if it isn't an image."""
+        frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            return None
+        rgb = getattr(self._buffers, "rgb", None)
+        if rgb is None or rgb.shape != frame.shape:
+            rgb = self._buffers.rgb = np.empty_like(frame)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+
+    def stats(self):
+        clients = list(self.clients)
+        return {
+            "clients": len(clients),
+            "refused": self.refused,
+            "received": sum(client.received for client in clients),
+            "processed": sum(client.processed for client in clients),
+            "dropped": sum(client.dropped for client in clients),
+            "pool": self.pool.stats(),
+        }
+
+    def close(self):
+        for client in list(self.clients):
+            client.close()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self.pool.close()
+
+
+class IngestHandler(tornado.websocket.WebSocketHandler):
+    """One client's /ingest socket: binary frames in, JSON results out."""
+
+    def initialize(self, server):
+        self.server = server
+        self.stream = None
+
+    def check_origin(self, origin):
+        # Thin clients may be served from anywhere (a kiosk page, a file:// page)
+        return True
+
+    def open(self):
+        if len(self.server.clients) >= self.server.max_clients:
+            self.server.refused += 1
+            self.close(1013, "Too many clients, try again later")
+            return
+        loop = tornado.ioloop.IOLoop.current()
+        self.stream = ClientStream(self.server, lambda result: loop.add_callback(self._send, result),
+                                   landmarks=self.get_argument("landmarks", "0") == "1")
+        self.server.clients.add(self.stream)
+        self.set_nodelay(True)
+
+    def on_message(self, message):
+        if self.stream is None:
+            return
+        if not isinstance(message, bytes):
+            self.write_message(json.dumps({"error": "frames must be sent as binary messages"}))
+            return
+        self.stream.push(message)
+
+    def _send(self, result):
+        if self.ws_connection is None:
+            return
+        try:
+            self.write_message(json.dumps(result))
+        except tornado.websocket.WebSocketClosedError:
+            pass
+
+    def on_close(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.server.clients.discard(self.stream)
+            self.stream = None
+
+
+class StatsHandler(tornado.web.RequestHandler):
+    def initialize(self, server):
+        self.server = server
+
+    def get(self):
+        self.write(self.server.stats())
+
+
+class CaptureHandler(tornado.web.RequestHandler):
+    def get(self):
+        self.render("capture.html")
+
+
+def create_app(server):
+    """Tornado application serving /ingest, /stats and the capture page."""
+    return tornado.web.Application(
+        [
+            (r"/ingest", IngestHandler, {"server": server}),
+            (r"/stats", StatsHandler, {"server": server}),
+            (r"/", CaptureHandler),
+        ],
+        template_path=os.path.join(BASE_DIR, "templates"),
+        static_path=os.path.join(BASE_DIR, "static"),
+        websocket_max_message_size=server.max_frame_bytes,
+        websocket_ping_interval=10,
+    )
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Recognise gestures in frames sent by browser clients.")
+    parser.add_argument("--models", type=int, default=4,
+                        help="Tracking-mode Hands instances, one per client that holds a lease (about 80 MB each)")
+    parser.add_argument("--static-models", type=int, default=2,
+                        help="Static-image Hands instances shared by the clients without a lease")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Decode and inference threads (default: --models + --static-models)")
+    parser.add_argument("--max-clients", type=int, default=48)
+    parser.add_argument("--max-frame-kb", type=int, default=512, help="Largest accepted frame message")
+    parser.add_argument("--cooldown", type=float, default=2.0, help="Seconds between two gesture actions")
+    parser.add_argument("--one-hand", action="store_true", help="Track a single hand (faster)")
+    parser.add_argument("--profile-dir", default="profiles",
+                        help="Where SIGUSR1 profiling windows are written (see sampling_profiler.py)")
+    parser.add_argument("--profile-seconds", type=float, default=30.0, help="Length of a profiling window")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    install_signal_handler(duration=args.profile_seconds, directory=args.profile_dir)
+    server = IngestServer(models=args.models, static_models=args.static_models, workers=args.workers, max_clients=args.max_clients,
+                          max_frame_bytes=args.max_frame_kb * 1024, cooldown=args.cooldown,
+                          max_num_hands=1 if args.one_hand else 2)
+    http_server = create_app(server).listen(args.port, address=args.host)
+    print(f"Ingesting frames on ws://{args.host}:{args.port}/ingest", flush=True)
+    try:
+        tornado.ioloop.IOLoop.current().start()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        http_server.stop()
+        server.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+import math
+import time
+
+import numpy as np
+
+from hand_tracking import Hand, match_greedy
+
+# Landmark index of the wrist, used to follow a hand from one frame to the next
+WRIST = 0
+
+
+def _smoothing_factor(cutoff, dt):
+    """Exponential smoothing factor for a low-pass filter with the given cutoff (Hz)."""
+    r = 2 * math.pi * cutoff * dt
+    return r / (r + 1)
+
+
+class OneEuroFilter:
+    """
+    Vectorized One-Euro filter for a whole landmark array.
+    Every coordinate of the (21, 3) array gets its own adaptive cutoff: slow
+    movements are smoothed heavily to remove jitter, fast movements pass through
+    with little lag.
+    Args:
+        min_cutoff (float): Cutoff frequency (Hz) used when a landmark is still.
+        beta (float): How quickly the cutoff rises with landmark speed.
+        d_cutoff (float): Cutoff frequency (Hz) for the speed estimate.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=10.0, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        """Forget the filter history so the next sample passes through unchanged."""
+        self._x = None
+        self._dx = None
+        self._t = None
+        self._scratch = None
+
+    def __call__(self, x, t):
+        """
+        Filter one sample.
+        Args:
+            x: Array-like of landmark coordinates, usually shape (21, 3).
+            t (float): Sample timestamp in seconds.
+        Returns:
+            numpy.ndarray with the filtered coordinates (a new array each call).
+        """
+        x = np.asarray(x, dtype=np.float64)
+
+        if self._x is None or self._x.shape != x.shape:
+            self._x = x.copy()
+            self._dx = np.zeros_like(x)
+            self._scratch = np.empty_like(x)
+            self._t = t
+            return self._x.copy()
+
+        dt = t - self._t
+        if dt <= 0:
+            # Duplicate timestamp, keep the previous estimate
+            return self._x.copy()
+        self._t = t
+
+        # Smoothed speed of every coordinate
+        scratch = self._scratch
+        np.subtract(x, self._x, out=scratch)
+        scratch /= dt
+        scratch -= self._dx
+        scratch *= _smoothing_factor(self.d_cutoff, dt)
+        self._dx += scratch
+
+        # Adaptive cutoff -> per coordinate smoothing factor a = r / (r + 1)
+        np.abs(self._dx, out=scratch)
+        scratch *= self.beta
+        scratch += self.min_cutoff
+        scratch *= 2 * math.pi * dt
+        np.divide(scratch, scratch + 1, out=scratch)
+
+        # x_hat += a * (x - x_hat)
+        scratch *= x - self._x
+        self._x += scratch
+        return self._x.copy()
+
+
+class HandSmoother:
+    """
+    Keep one OneEuroFilter per visible hand and follow each hand across frames.
+    Hands tracked by a HandTracker are followed by their hand_id; others are
+    matched to the previous frame by wrist position, so the filter state stays
+    with the same physical hand even when MediaPipe reorders its results.
+    Args:
+        min_cutoff, beta, d_cutoff: OneEuroFilter parameters used for every hand.
+        max_jump (float): Largest wrist movement (normalized units) between frames
+            that still counts as the same hand.
+        forget_after (float): Seconds a hand may be missing before its state is dropped.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=10.0, d_cutoff=1.0, max_jump=0.25, forget_after=0.5):
+        self.filter_params = dict(min_cutoff=min_cutoff, beta=beta, d_cutoff=d_cutoff)
+        self.max_jump = max_jump
+        self.forget_after = forget_after
+        self._tracks = []  # list of [filter, last_wrist, last_seen, hand_id]
+
+    def reset(self):
+        """Drop all tracked hands."""
+        self._tracks = []
+
+    def __call__(self, landmarks, timestamp=None):
+        """
+        Smooth every hand of one frame.
+        Args:
+            landmarks: List of landmark lists for detected hands, as yielded by
+                detect_hands_in_video.
+            timestamp (float): Frame time in seconds (defaults to time.monotonic()).
+        Returns:
+            List of (21, 3) numpy arrays in the same order as the input hands
+            (Hand objects, with the same label and hand_id, for Hand input).
+        """
+        t = time.monotonic() if timestamp is None else timestamp
+
+        # Drop hands that have been gone for too long
+        self._tracks = [track for track in self._tracks if t - track[2] <= self.forget_after]
+
+        if not landmarks:
+            return []
+
+        hand_ids = [getattr(hand, "hand_id", None) for hand in landmarks]
+        hands = [np.asarray(hand, dtype=np.float64) for hand in landmarks]
+        if None in hand_ids:
+            assigned = self._match([hand[WRIST, :2] for hand in hands])
+        else:
+            by_id = {track[3]: track for track in self._tracks}
+            assigned = [by_id.get(hand_id) for hand_id in hand_ids]
+
+        smoothed = []
+        for original, hand, hand_id, track in zip(landmarks, hands, hand_ids, assigned):
+            if track is None:
+                track = [OneEuroFilter(**self.filter_params), None, t, hand_id]
+                self._tracks.append(track)
+            track[1] = hand[WRIST, :2].copy()
+            track[2] = t
+            filtered = track[0](hand, t)
+            if isinstance(original, Hand):
+                filtered = original.with_landmarks(filtered)
+            smoothed.append(filtered)
+        return smoothed
+
+    def _match(self, wrists):
+        """Greedily pair each wrist with the closest unused track (or None)."""
+        matches = match_greedy(wrists, [track[1] for track in self._tracks], self.max_jump)
+        return [None if index is None else self._tracks[index] for index in matches]
@@ -0,0 +1,157 @@
+import os
+import time
+
+import numpy as np
+
+# Pipeline stages in the order they happen; each is timed from the previous mark
+STAGES = ("read", "inference", "classify", "debounce", "playback")
+
+
+class FrameTrace:
+    """
+    Timestamps of one frame on its way from the camera to the speakers.
+    The trace starts right before the frame is read from the capture device and
+    every stage calls mark() when it finishes.
+    """
+    __slots__ = ("start", "stamps")
+
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self.stamps = {}
+
+    def mark(self, stage):
+        """Record that `stage` has just finished."""
+        self.stamps[stage] = time.perf_counter()
+
+    def breakdown(self):
+        """
+        Per stage durations.
+        Returns:
+            dict mapping stage name to milliseconds (only stages that were marked),
+            plus 'total' from capture to the last mark.
+        """
+        result = {}
+        previous = self.start
+        for stage in STAGES:
+            stamp = self.stamps.get(stage)
+            if stamp is None:
+                continue
+            result[stage] = (stamp - previous) * 1000
+            previous = stamp
+        result["total"] = (previous - self.start) * 1000
+        return result
+
+
+class LatencyLog:
+    """
+    Rolling log of per action latency breakdowns.
+    Rows live in a fixed size float32 ring (one column per stage plus the total),
+    so recording is O(1) and memory stays constant however long the session runs.
+    With a path, record() also saves the log there every `save_interval` seconds;
+    call save() once more at shutdown.
+    Args:
+        capacity (int): Number of most recent actions kept.
+        path (str): .npz file the log is saved to (None to keep it in memory only).
+        save_interval (float): Seconds between two automatic saves.
+    """
+
+    COLUMNS = STAGES + ("total",)
+
+    def __init__(self, capacity=1024, path=None, save_interval=60.0):
+        self.capacity = capacity
+        self.path = path
+        self.save_interval = save_interval
+        self._rows = np.full((capacity, len(self.COLUMNS)), np.nan, dtype=np.float32)
+        self._actions = [None] * capacity
+        self._count = 0
+        self._saved_count = 0
+        self._saved_at = time.monotonic()
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    def record(self, action, trace):
+        """Store the breakdown of a trace that ended in `action`."""
+        index = self._count % self.capacity
+        breakdown = trace.breakdown()
+        row = self._rows[index]
+        for column, name in enumerate(self.COLUMNS):
+            row[column] = breakdown.get(name, np.nan)
+        self._actions[index] = action
+        self._count += 1
+        if self.path is not None and time.monotonic() - self._saved_at >= self.save_interval:
+            try:
+                self.save()
+            except OSError as e:
+                # Keep recording; the next interval tries again
+                print(f"Error saving the latency log to {self.path}: {e}")
+
+    def summary(self, percentiles=(50, 90, 99)):
+        """
+        Latency percentiles per action and over all actions.
+        Returns:
+            dict: {action: {"count": n, stage: {"p50": ms, ...}, ...}}, including an "all" key.
+        """
+        n = len(self)
+        if n == 0:
+            return {}
+        rows = self._rows[:n]
+        actions = np.array(self._actions[:n], dtype=object)
+
+        groups = {"all": np.ones(n, dtype=bool)}
+        for action in sorted(set(self._actions[:n])):
+            groups[action] = actions == action
+
+        summary = {}
+        for action, mask in groups.items():
+            selected = rows[mask]
+            entry = {"count": int(mask.sum())}
+            for column, name in enumerate(self.COLUMNS):
+                values = selected[:, column]
+                values = values[~np.isnan(values)]
+                if len(values):
+                    entry[name] = {f"p{p}": float(v) for p, v in zip(percentiles, np.percentile(values, percentiles))}
+            summary[action] = entry
+        return summary
+
+    def format_summary(self, percentiles=(50, 90, 99)):
+        """Human readable table of summary()."""
+        summary = self.summary(percentiles)
+        if not summary:
+            return "No actions recorded yet"
+        header = f"{'action':<10} {'n':>5} " + " ".join(f"{name:>22}" for name in self.COLUMNS)
+        lines = [header]
+        for action, entry in summary.items():
+            cells = []
+            for name in self.COLUMNS:
+                stats = entry.get(name)
+                cells.append(f"{'/'.join(f'{v:.0f}' for v in stats.values()):>22}" if stats else f"{'-':>22}")
+            lines.append(f"{action:<10} {entry['count']:>5} " + " ".join(cells))
+        lines.append("(milliseconds, " + "/".join(f"p{p}" for p in percentiles) + ")")
+        return "\n".join(lines)
+
+    def save(self, path=None):
+        """
+        Write the recorded rows (oldest first) to a compressed .npz file.
+        Args:
+            path (str): File to write (defaults to the log's path). It is replaced
+                atomically, so readers never see a partly written file.
+        """
+        path = path or self.path
+        if path is None:
+            raise ValueError("LatencyLog.save() needs a path")
+        self._saved_at = time.monotonic()
+        if path == self.path and self._count == self._saved_count and os.path.exists(path):
+            return
+        n = len(self)
+        order = (np.arange(n) + (self._count - n)) % self.capacity
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as f:
+            np.savez_compressed(f, columns=np.array(self.COLUMNS), rows=self._rows[order],
+                                actions=np.array([str(self._actions[i]) for i in order]))
+        os.replace(temporary, path)
+        if path == self.path:
+            self._saved_count = self._count
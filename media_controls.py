@@ -1,41 +1,162 @@
+import atexit
+import threading
+import time
+
 import cv2
-import mediapipe as mp
 
-# MediaPipe Setup for Hand Tracking
-mp_hands = mp.solutions.hands
-hands = mp_hands.Hands(min_detection_confidence=0.5, min_tracking_confidence=0.5)
-mp_draw = mp.solutions.drawing_utils
+from capture import open_source
+from frame_buffers import FramePool
+from gesture_map import finger_mask, get_gesture_map
+from hand_tracking import HandTracker, hands_from_results
+from latency_trace import FrameTrace
+from runtime_config import enter_stage, run_in_stage
+
+# MediaPipe is slow to import and its Hands graph slow to build, so both happen
+# on first use (or in warm_up()) rather than at import time. The module
+# attributes `hands`, `mp_hands` and `mp_draw` are still available and resolve lazily.
+_model_lock = threading.Lock()
+_hands_models = {}  # max_num_hands -> Hands
+
+def _mediapipe():
+    import mediapipe as mp
+    return mp
+
+def get_hands_model(max_num_hands=2):
+    """
+    Return the shared MediaPipe Hands model, building it on first use.
+    Args:
+        max_num_hands (int): 1 gives a faster model that stops running palm
+            detection once it tracks a hand, instead of looking for a second one.
+    """
+    model = _hands_models.get(max_num_hands)
+    if model is None:
+        with _model_lock:
+            model = _hands_models.get(max_num_hands)
+            if model is None:
+                mp_hands = _mediapipe().solutions.hands
+                # Built under the inference stage's settings so the graph's threads inherit them
+                model = run_in_stage("inference", lambda: mp_hands.Hands(
+                    max_num_hands=max_num_hands, min_detection_confidence=0.5, min_tracking_confidence=0.5))
+                _hands_models[max_num_hands] = model
+    return model
+
+def close_hands_models():
+    """Close the shared Hands models (their graphs and threads); the next use builds them again."""
+    with _model_lock:
+        models = list(_hands_models.values())
+        _hands_models.clear()
+    for model in models:
+        model.close()
+
+# Tear the graphs down while the interpreter is still intact
+atexit.register(close_hands_models)
 
-def detect_hands_in_video(video_path=None, is_webcam=True):
+def warm_up(max_num_hands=2):
+    """Import MediaPipe, build the model and run it once so the first real frame is fast."""
+    import numpy as np
+    get_hands_model(max_num_hands).process(np.zeros((64, 64, 3), dtype=np.uint8))
+
+def __getattr__(name):
+    # Lazy module attributes (PEP 562)
+    if name == "hands":
+        return get_hands_model()
+    if name == "mp_hands":
+        return _mediapipe().solutions.hands
+    if name == "mp_draw":
+        return _mediapipe().solutions.drawing_utils
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def detect_hands_in_video(video_path=None, is_webcam=True, trace=False, source=None, rgb=False, annotate=True,
+                          max_num_hands=2):
     """
     Detect hands in video from webcam or video file and yield processed frames.
     Args:
         video_path (str): Path to video file (None if using webcam).
         is_webcam (bool): Flag to indicate whether to use webcam or video.
+        trace (bool): Also yield a FrameTrace with the read and inference stages marked.
+        source: CaptureSource (or open_source() spec) to read from instead of video_path/is_webcam.
+        rgb (bool): Yield the annotated frame in RGB order (the colour conversion
+            MediaPipe needs anyway), so displays don't have to convert it again.
+        annotate (bool): Draw the landmarks on the frame (headless callers can skip it).
+        max_num_hands (int): Hands to look for; 1 is the faster one-hand mode.
     Yields:
         tuple: (frame, landmarks) where frame is the processed image, and landmarks is the list of landmarks.
+        Each hand is a hand_tracking.Hand carrying MediaPipe's handedness and a stable
+        hand_id, and the hands are ordered by hand_id.
+        With trace=True: (frame, landmarks, trace).
+        Frames come from a small pool of reused buffers and are overwritten a few frames later.
     """
-    cap = cv2.VideoCapture(0 if is_webcam else video_path)
-    
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
+    if source is None:
+        source = 0 if is_webcam else video_path
+    # This thread reads, converts and draws the frames
+    enter_stage("capture")
+    hands = get_hands_model(max_num_hands)
+    tracker = HandTracker()
+    mp_hands = _mediapipe().solutions.hands
+    mp_draw = _mediapipe().solutions.drawing_utils
+    # draw_landmarks' default colours (red joints, grey bones) for frames in RGB order
+    rgb_landmark_style = mp_draw.DrawingSpec(color=(255, 0, 0))
+    rgb_connection_style = mp_draw.DrawingSpec()
+    bgr_pool = FramePool()
+    rgb_pool = FramePool()
+
+    cap = open_source(source)
+    # Release the capture however the loop ends: exhausted, or closed by a caller that
+    # stopped early (generator.close(), which also runs when it is garbage collected)
+    try:
+        while cap.isOpened():
+            frame_trace = FrameTrace() if trace else None
+            # Decode straight into a pooled buffer (a fresh one only for the first frame)
+            ret, frame = cap.read(bgr_pool.next())
+            if not ret:
+                break
+            bgr_pool.fit(frame.shape)
+            if trace:
+                frame_trace.mark("read")
+
+            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb_pool.next(frame.shape))
+            results = hands.process(frame_rgb)
+            landmarks = tracker(hands_from_results(results))
+            output = frame_rgb if rgb else frame
 
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = hands.process(frame_rgb)
-        landmarks = []
+            if annotate and results.multi_hand_landmarks:
+                for hand_landmarks in results.multi_hand_landmarks:
+                    if rgb:
+                        mp_draw.draw_landmarks(output, hand_landmarks, mp_hands.HAND_CONNECTIONS,
+                                               rgb_landmark_style, rgb_connection_style)
+                    else:
+                        mp_draw.draw_landmarks(output, hand_landmarks, mp_hands.HAND_CONNECTIONS)
 
-        if results.multi_hand_landmarks:
-            for hand_landmarks in results.multi_hand_landmarks:
-                # Collect landmarks for each hand
-                hand_coords = [(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark]
-                landmarks.append(hand_coords)
-                mp_draw.draw_landmarks(frame, hand_landmarks, mp_hands.HAND_CONNECTIONS)
+            if trace:
+                frame_trace.mark("inference")
+                yield output, landmarks, frame_trace
+            else:
+                yield output, landmarks
+    finally:
+        cap.release()
+
+def draw_gesture_label(frame, text, color=(0, 255, 0)):
+    """
+    Draw a text label on a darkened box at the bottom left of the frame, in place.
+    Only the box region is blended, the rest of the frame is left untouched.
+    Args:
+        frame: Image to draw on (modified in place).
+        text (str): Label text.
+        color (tuple): Text colour in the frame's channel order.
+    Returns:
+        The same frame.
+    """
+    x, y = 20, frame.shape[0] - 30
+    (text_width, text_height), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 1, 2)
 
-        yield frame, landmarks
+    # Darken the box behind the text to 80% for better text visibility
+    top, bottom = max(y - text_height - 10, 0), min(y + 11, frame.shape[0])
+    left, right = max(x - 10, 0), min(x + text_width + 11, frame.shape[1])
+    box = frame[top:bottom, left:right]
+    cv2.convertScaleAbs(box, dst=box, alpha=0.8)
 
-    cap.release()
+    cv2.putText(frame, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
+    return frame
 
 def get_finger_states(landmarks):
     """
@@ -46,64 +167,54 @@ def get_finger_states(landmarks):
     Returns:
         List of 5 binary values (0 or 1) for each finger state.
     """
-    fingers = []
-    
-    # Thumb detection (different for left vs right hand)
-    is_right_hand = landmarks[4][0] > landmarks[0][0]  # Determine if it's the right hand
-    
-    if is_right_hand:
-        # Right hand - thumb is up if thumb tip is to the right of thumb IP joint
-        fingers.append(1 if landmarks[4][0] > landmarks[3][0] else 0)
-    else:
-        # Left hand - thumb is up if thumb tip is to the left of thumb IP joint
-        fingers.append(1 if landmarks[4][0] < landmarks[3][0] else 0)
-    
-    # For other fingers, check if the tip is above the PIP joint (indicates it's up)
-    for finger_id in range(1, 5):
-        tip_id = finger_id * 4 + 4  # Index of the fingertip landmark
-        pip_id = finger_id * 4 + 2  # Index of the PIP joint landmark
-        
-        if landmarks[tip_id][1] < landmarks[pip_id][1]:
-            fingers.append(1)  # Finger is up
-        else:
-            fingers.append(0)  # Finger is down
-    
-    return fingers
+    mask = finger_mask(landmarks)
+    return [(mask >> i) & 1 for i in range(5)]
 
 def map_gesture_to_action(landmarks):
     """
     Map hand gesture based on landmarks to media control action.
+    The rules come from gestures.json (see gesture_map.py) and are reloaded when it changes.
+    With two hands, chords (one hand holding a modifier gesture) take precedence;
+    otherwise the first hand showing a gesture wins.
     Args:
         landmarks: List of landmark lists for detected hands.
     Returns:
-        String with the action name: 'play', 'pause', 'stop', 'next', 'previous', or None.
+        String with the action name: 'play', 'pause', 'stop', 'next', 'previous',
+        'volume_up', 'volume_down', or None.
     """
     if not landmarks or len(landmarks) == 0:
         return None
     
-    # Get finger states for the first detected hand
-    finger_states = get_finger_states(landmarks[0])
-    
-    # Open palm (all fingers up) = play
-    if sum(finger_states) == 5:
-        return "play"
-    
-    # Closed fist (all fingers down) = pause
-    elif sum(finger_states) == 0:
-        return "pause"
-    
-    # Check for palm down gesture (stop)
-    palm_facing_down = landmarks[0][0][1] < landmarks[0][9][1]
-    if palm_facing_down and sum(finger_states[1:]) >= 3:  # at least 3 fingers extended
-        return "stop"
-    
-    # Peace sign - index and middle fingers up, others down
-    elif finger_states == [0, 1, 1, 0, 0]:
-        return "next"
-    
-    # Index finger up only - one finger pointing
-    elif finger_states == [0, 1, 0, 0, 0]:
-        return "previous"
-    
-    # If no recognizable gesture, return None
-    return None
+    return get_gesture_map().classify_hands(landmarks)
+
+class GestureDebouncer:
+    """
+    Turn per-frame gesture classifications into actions.
+    A gesture fires once, when it differs from the last fired action and the
+    cooldown since that action has passed.
+    Args:
+        cooldown (float): Minimum seconds between two actions.
+        start (float): Time the cooldown starts from (defaults to now); pass the
+            first timestamp when replaying recordings with their own clock.
+    """
+
+    def __init__(self, cooldown=2.0, start=None):
+        self.cooldown = cooldown
+        self.last_action = None
+        self.last_time = time.time() if start is None else start
+
+    def update(self, action, now=None):
+        """
+        Feed the gesture of one frame.
+        Args:
+            action (str): Output of map_gesture_to_action (may be None).
+            now (float): Current time in seconds (defaults to time.time()).
+        Returns:
+            The action to execute now, or None.
+        """
+        now = time.time() if now is None else now
+        if action is not None and action != self.last_action and now - self.last_time > self.cooldown:
+            self.last_action = action
+            self.last_time = now
+            return action
+        return None
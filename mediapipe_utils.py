@@ -1,41 +1,242 @@
 # mediapipe_utils.py
+import atexit
+import hashlib
+import itertools
+import threading
+import weakref
+from collections import OrderedDict
+
 import cv2
-import mediapipe as mp
-
-mp_hands = mp.solutions.hands
-mp_drawing = mp.solutions.drawing_utils
-mp_drawing_styles = mp.solutions.drawing_styles
-
-# Initialize the hands model with better parameters
-hands_model = mp_hands.Hands(
-    static_image_mode=True,  # Set to False for video streams
-    max_num_hands=2,
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.5
-)
-
-# For video streams, we'll use a separate model instance
-video_hands_model = mp_hands.Hands(
-    static_image_mode=False,  # Better for tracking in videos
-    max_num_hands=2,
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.5
-)
-
-def detect_hands_in_image(image):
-    """Detect hands and return annotated image and landmark list."""
+import numpy as np
+
+from capture import open_source
+from runtime_config import enter_stage, run_in_stage
+
+# MediaPipe and the models are loaded on first use; `hands_model`,
+# `video_hands_model`, `mp_hands`, `mp_drawing` and `mp_drawing_styles` remain
+# available as lazy module attributes
+_models = {}
+_model_lock = threading.Lock()
+
+def _solutions():
+    """MediaPipe's hands, drawing_utils and drawing_styles modules."""
+    import mediapipe as mp
+    return mp.solutions.hands, mp.solutions.drawing_utils, mp.solutions.drawing_styles
+
+def _get_model(static_image_mode):
+    model = _models.get(static_image_mode)
+    if model is None:
+        with _model_lock:
+            model = _models.get(static_image_mode)
+            if model is None:
+                mp_hands = _solutions()[0]
+                model = run_in_stage("inference", lambda: mp_hands.Hands(
+                    static_image_mode=static_image_mode,
+                    max_num_hands=2,
+                    min_detection_confidence=0.5,
+                    min_tracking_confidence=0.5
+                ))
+                _models[static_image_mode] = model
+    return model
+
+def get_image_model():
+    """Shared static-mode model for single images, built on first use."""
+    return _get_model(True)
+
+def get_video_model():
+    """Shared tracking-mode model for video streams, built on first use."""
+    return _get_model(False)
+
+def close_models():
+    """Close the shared models (their graphs and threads); the next use builds them again."""
+    with _model_lock:
+        models = list(_models.values())
+        _models.clear()
+    for model in models:
+        model.close()
+
+atexit.register(close_models)
+
+def __getattr__(name):
+    # Lazy module attributes (PEP 562)
+    if name == "hands_model":
+        return get_image_model()
+    if name == "video_hands_model":
+        return get_video_model()
+    if name in ("mp_hands", "mp_drawing", "mp_drawing_styles"):
+        return _solutions()[("mp_hands", "mp_drawing", "mp_drawing_styles").index(name)]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class DetectionCache:
+    """
+    LRU cache of detect_hands_in_image results keyed by image content and model.
+    Entries hold the landmarks and, optionally, the annotated image. The least
+    recently used entries are evicted once either budget is exceeded.
+    A hit still hashes the image: SHA-256 runs at about 0.5 GB/s, so ~2 ms for
+    a 640x480 frame. Callers that still have the encoded file (an upload, a
+    thumbnail) can key on those much smaller bytes instead, see key().
+    Args:
+        max_entries (int): Maximum number of cached images.
+        max_bytes (int): Maximum total size of the cached data.
+        store_images (bool): Also keep annotated images (otherwise they are
+            redrawn from the cached landmarks on a hit).
+    """
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024, store_images=True):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.store_images = store_images
+        self._entries = OrderedDict()  # key -> (landmarks, annotated image or None, size)
+        # Models other than the shared one get a number for the keys, dropped with the model
+        self._model_ids = weakref.WeakKeyDictionary()
+        self._next_model_id = itertools.count(1)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, image, model=None):
+        """
+        Cache key of an image for a model.
+        Args:
+            image: Decoded image (its shape and dtype are included), or the bytes
+                of the encoded file it was decoded from.
+            model: The model detect_hands_in_image is called with (None for the
+                shared one); results of different models never mix.
+        Returns:
+            bytes key.
+        """
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            digest = hashlib.sha256(b"encoded")
+            digest.update(image)
+        else:
+            image = np.ascontiguousarray(image)
+            digest = hashlib.sha256(f"{image.shape}{image.dtype.str}".encode())
+            digest.update(image.data)
+        return self._model_id(model).to_bytes(8, "little") + digest.digest()
+
+    def _model_id(self, model):
+        if model is None:
+            return 0
+        with self._lock:
+            model_id = self._model_ids.get(model)
+            if model_id is None:
+                model_id = self._model_ids[model] = next(self._next_model_id)
+            return model_id
+
+    def get(self, key):
+        """
+        Return (landmarks, annotated image or None) for a key, or None on a miss.
+        The landmarks are a fresh list per call; the image is read-only.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return [list(hand) for hand in entry[0]], entry[1]
+
+    def put(self, key, landmarks, annotated_image=None):
+        """Store a result and evict least recently used entries beyond the budgets."""
+        if not self.store_images:
+            annotated_image = None
+        # Stored immutable, so callers can't change an entry through what they got back
+        landmarks = tuple(tuple(tuple(point) for point in hand) for hand in landmarks)
+        # 21 landmarks x 3 floats per hand, plus container overhead
+        size = 64 + len(landmarks) * 21 * 3 * 32
+        if annotated_image is not None:
+            if size + annotated_image.nbytes > self.max_bytes:
+                annotated_image = None
+            else:
+                annotated_image = annotated_image.copy()
+                annotated_image.setflags(write=False)
+                size += annotated_image.nbytes
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (landmarks, annotated_image, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[2]
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry (statistics are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Hit/miss statistics and current usage."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+def draw_hand_landmarks(image, landmarks_list):
+    """Draw landmark tuples (as returned by the detect functions) onto an image in place."""
+    from mediapipe.framework.formats import landmark_pb2
+
+    mp_hands, mp_drawing, mp_drawing_styles = _solutions()
+    for landmarks in landmarks_list:
+        hand_landmarks = landmark_pb2.NormalizedLandmarkList(
+            landmark=[landmark_pb2.NormalizedLandmark(x=x, y=y, z=z) for x, y, z in landmarks]
+        )
+        mp_drawing.draw_landmarks(
+            image,
+            hand_landmarks,
+            mp_hands.HAND_CONNECTIONS,
+            mp_drawing_styles.get_default_hand_landmarks_style(),
+            mp_drawing_styles.get_default_hand_connections_style()
+        )
+    return image
+
+
+def detect_hands_in_image(image, annotate=True, model=None, cache=None, cache_key=None):
+    """
+    Detect hands and return annotated image and landmark list.
+    With annotate=False the input image is returned untouched (no copy is made).
+    `model` overrides the shared static-mode hands_model, e.g. in worker processes.
+    With a DetectionCache, images already seen skip MediaPipe entirely. `cache_key`
+    is a precomputed cache.key(), e.g. of the encoded file, to avoid hashing the pixels.
+    """
     # Check if image is empty or invalid
     if image is None or image.size == 0:
         return image, []
     
+    if cache is not None:
+        key = cache_key if cache_key is not None else cache.key(image, model)
+        cached = cache.get(key)
+        if cached is not None:
+            landmarks_list, cached_image = cached
+            if not annotate:
+                return image, landmarks_list
+            if cached_image is not None:
+                return cached_image.copy(), landmarks_list
+            return draw_hand_landmarks(image.copy(), landmarks_list), landmarks_list
+
     # Convert the image to RGB format for MediaPipe
     image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
     
     # Process the image with MediaPipe Hands
-    results = hands_model.process(image_rgb)
+    results = (model or get_image_model()).process(image_rgb)
+    mp_hands, mp_drawing, mp_drawing_styles = _solutions()
     
     # Create a copy of the image for annotation
-    annotated_image = image.copy()
+    annotated_image = image.copy() if annotate else image
     
     # List to store hand landmarks
     landmarks_list = []
@@ -44,60 +245,73 @@ def detect_hands_in_image(image):
     if results.multi_hand_landmarks:
         for hand_landmarks in results.multi_hand_landmarks:
             # Draw the hand landmarks and connections
-            mp_drawing.draw_landmarks(
-                annotated_image,
-                hand_landmarks,
-                mp_hands.HAND_CONNECTIONS,
-                mp_drawing_styles.get_default_hand_landmarks_style(),
-                mp_drawing_styles.get_default_hand_connections_style()
-            )
+            if annotate:
+                mp_drawing.draw_landmarks(
+                    annotated_image,
+                    hand_landmarks,
+                    mp_hands.HAND_CONNECTIONS,
+                    mp_drawing_styles.get_default_hand_landmarks_style(),
+                    mp_drawing_styles.get_default_hand_connections_style()
+                )
             
             # Extract the landmarks coordinates
             landmarks = [(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark]
             landmarks_list.append(landmarks)
     
+    if cache is not None:
+        cache.put(key, landmarks_list, annotated_image if annotate else None)
+    
     return annotated_image, landmarks_list
 
-def detect_hands_in_video(video_path, is_webcam=False):
-    """Process video or webcam feed to detect hands. Yields frames with annotations."""
+def detect_hands_in_video(video_path, is_webcam=False, source=None):
+    """
+    Process video or webcam feed to detect hands. Yields frames with annotations.
+    `source` (a CaptureSource or open_source() spec) overrides video_path/is_webcam.
+    """
     # Initialize video capture
-    cap = cv2.VideoCapture(0 if is_webcam else video_path)
+    if source is None:
+        source = 0 if is_webcam else video_path
+    enter_stage("capture")
+    cap = open_source(source)
     
-    # Check if video opened successfully
-    if not cap.isOpened():
-        print("Error: Could not open video source.")
-        return
+    # Release the capture however the loop ends, including a caller closing the generator early
+    try:
+        # Check if video opened successfully
+        if not cap.isOpened():
+            print("Error: Could not open video source.")
+            return
     
-    while cap.isOpened():
-        # Read a frame
-        success, frame = cap.read()
-        if not success:
-            break
-        
-        # Process the frame
-        image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = video_hands_model.process(image_rgb)
-        
-        landmarks_list = []
-        
-        # If hands detected, draw landmarks and extract coordinates
-        if results.multi_hand_landmarks:
-            for hand_landmarks in results.multi_hand_landmarks:
-                # Draw the hand landmarks and connections
-                mp_drawing.draw_landmarks(
-                    frame,
-                    hand_landmarks,
-                    mp_hands.HAND_CONNECTIONS,
-                    mp_drawing_styles.get_default_hand_landmarks_style(),
-                    mp_drawing_styles.get_default_hand_connections_style()
-                )
-                
-                # Extract the landmarks coordinates
-                landmarks = [(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark]
-                landmarks_list.append(landmarks)
-        
-        # Yield the annotated frame and landmarks
-        yield frame, landmarks_list
+        video_hands_model = get_video_model()
+        mp_hands, mp_drawing, mp_drawing_styles = _solutions()
+        while cap.isOpened():
+            # Read a frame
+            success, frame = cap.read()
+            if not success:
+                break
+    
+            # Process the frame
+            image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            results = video_hands_model.process(image_rgb)
+    
+            landmarks_list = []
+    
+            # If hands detected, draw landmarks and extract coordinates
+            if results.multi_hand_landmarks:
+                for hand_landmarks in results.multi_hand_landmarks:
+                    # Draw the hand landmarks and connections
+                    mp_drawing.draw_landmarks(
+                        frame,
+                        hand_landmarks,
+                        mp_hands.HAND_CONNECTIONS,
+                        mp_drawing_styles.get_default_hand_landmarks_style(),
+                        mp_drawing_styles.get_default_hand_connections_style()
+                    )
+    
+                    # Extract the landmarks coordinates
+                    landmarks = [(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark]
+                    landmarks_list.append(landmarks)
     
-    # Release resources
-    cap.release()
\ No newline at end of file
+            # Yield the annotated frame and landmarks
+            yield frame, landmarks_list
+    finally:
+        cap.release()
\ No newline at end of file
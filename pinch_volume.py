@@ -0,0 +1,190 @@
+"""
+Continuous volume control with one hand.
+
+Holding the engage pose (thumb and index out, the other fingers curled, an
+"L") for a moment turns on volume mode. While it is on, the distance between
+the thumb and index tips sets the volume (or the hand's height, with
+mode="height"), and the discrete gestures are suppressed. Opening any of the
+other three fingers, or taking the hand away, turns it off.
+
+The measured level is smoothed, and the volume is only written when it moved
+by at least `min_change` and at most every `min_interval` seconds, so the mixer
+isn't touched on every frame.
+"""
+import math
+import time
+
+from gesture_map import finger_mask
+
+# Thumb and index up, middle, ring and pinky down
+ENGAGE_MASK = 0b00011
+# Middle, ring and pinky: lifting any of them ends volume mode
+RELEASE_BITS = 0b11100
+
+THUMB_TIP = 4
+INDEX_TIP = 8
+INDEX_MCP = 5
+WRIST = 0
+
+MODES = ("pinch", "height")
+
+
+def guide_entry(mode):
+    """Gesture guide item for volume mode, in the format of GestureMap.guide()."""
+    if mode == "pinch":
+        hint = "hold thumb & index out, then pinch to set"
+    else:
+        hint = "hold thumb & index out, then raise or lower the hand"
+    return {"name": "L Pose", "emoji": "🤏", "hint": hint, "action": "volume", "label": "Set Volume"}
+
+
+def _distance(hand, a, b):
+    return math.hypot(hand[a][0] - hand[b][0], hand[a][1] - hand[b][1])
+
+
+class PinchVolumeControl:
+    """
+    Engage/disengage state machine that turns one hand into a volume knob.
+    Args:
+        set_volume: Called with the new volume (int, 0-100) when it should change.
+        volume (int): Last known volume; the first level of every engagement is written regardless.
+        mode (str): "pinch" (thumb-index distance) or "height" (wrist height in the frame).
+        engage_time (float): Seconds the engage pose must be held.
+        release_time (float): Seconds a lost hand is waited for before volume mode ends.
+        min_interval (float): Minimum seconds between two volume writes.
+        min_change (int): Minimum volume change worth a write.
+        smoothing (float): Time constant (seconds) of the level smoothing.
+        pinch_range (tuple): Thumb-index distance, relative to the index finger's
+            distance from the wrist, that maps to volume 0 and 100.
+        height_range (tuple): Normalized wrist y (top of the frame is 0) that maps
+            to volume 100 and 0.
+    """
+
+    def __init__(self, set_volume, volume=70, mode="pinch", engage_time=0.3, release_time=0.5,
+                 min_interval=0.1, min_change=2, smoothing=0.15, pinch_range=(0.2, 1.2),
+                 height_range=(0.2, 0.8)):
+        if mode not in MODES:
+            raise ValueError(f"Unknown volume gesture mode {mode!r}, expected one of {MODES}")
+        self.set_volume = set_volume
+        self.volume = volume
+        self.mode = mode
+        self.engage_time = engage_time
+        self.release_time = release_time
+        self.min_interval = min_interval
+        self.min_change = min_change
+        self.smoothing = smoothing
+        self.pinch_range = pinch_range
+        self.height_range = height_range
+        self.engaged = False
+        self.writes = 0
+        self._pose_since = None
+        self._hand_id = None
+        self._last_seen = 0.0
+        self._level = None
+        self._level_time = None
+        self._last_write = -math.inf
+        self._release_mask = None
+        self._release_hand_id = None
+
+    @staticmethod
+    def _find_hand(hands, hand_id):
+        """The hand with `hand_id` (when known, else the first one)."""
+        if not hands:
+            return None
+        if hand_id is not None:
+            for hand in hands:
+                if getattr(hand, "hand_id", None) == hand_id:
+                    return hand
+            return None
+        return hands[0]
+
+    def _target(self, hand):
+        """Volume (0-100, unrounded) the hand currently points at."""
+        if self.mode == "pinch":
+            scale = _distance(hand, WRIST, INDEX_MCP) or 1e-6
+            low, high = self.pinch_range
+            level = (_distance(hand, THUMB_TIP, INDEX_TIP) / scale - low) / (high - low)
+        else:
+            top, bottom = self.height_range
+            level = (bottom - hand[WRIST][1]) / (bottom - top)
+        return 100.0 * min(1.0, max(0.0, level))
+
+    def _engage(self, hands, now):
+        """Start volume mode once a hand has held the engage pose long enough."""
+        hand = next((h for h in hands if finger_mask(h) == ENGAGE_MASK), None)
+        if hand is None:
+            self._pose_since = None
+            return
+        if self._pose_since is None:
+            self._pose_since = now
+        if now - self._pose_since >= self.engage_time:
+            self.engaged = True
+            self._hand_id = getattr(hand, "hand_id", None)
+            self._last_seen = now
+            self._level = None
+            self._pose_since = None
+            # The volume may have been changed elsewhere since: always write the first level
+            self.volume = None
+
+    def _disengage(self, mask):
+        self.engaged = False
+        # The pose that ended volume mode must not fire its own action while
+        # the hand that made it still holds it
+        self._release_mask = mask
+        self._release_hand_id = self._hand_id
+        self._hand_id = None
+
+    def update(self, landmarks, now=None):
+        """
+        Feed the hands of one frame.
+        Args:
+            landmarks (list): Hands of the frame (output of detect_hands_in_video).
+            now (float): Current time in seconds (defaults to time.monotonic()).
+        Returns:
+            True while the discrete gestures should be ignored: volume mode is
+            on, or the pose that just ended it is still held.
+        """
+        now = time.monotonic() if now is None else now
+        hands = landmarks or []
+
+        if not self.engaged:
+            if self._release_mask is not None:
+                hand = self._find_hand(hands, self._release_hand_id)
+                if hand is not None and finger_mask(hand) == self._release_mask:
+                    return True
+                self._release_mask = None
+            self._engage(hands, now)
+            return self.engaged
+
+        hand = self._find_hand(hands, self._hand_id)
+        if hand is None:
+            if now - self._last_seen > self.release_time:
+                self._disengage(None)
+                return False
+            return True
+        self._last_seen = now
+        mask = finger_mask(hand)
+        if mask & RELEASE_BITS:
+            self._disengage(mask)
+            return True
+
+        target = self._target(hand)
+        if self._level is None:
+            self._level = target
+        else:
+            alpha = 1.0 - math.exp(-(now - self._level_time) / self.smoothing) if self.smoothing > 0 else 1.0
+            self._level += alpha * (target - self._level)
+        self._level_time = now
+
+        volume = int(round(self._level))
+        # Small steps are dropped, except the last ones to the ends of the range
+        if self.volume is None:
+            changed = True
+        else:
+            changed = abs(volume - self.volume) >= self.min_change or (volume in (0, 100) and volume != self.volume)
+        if changed and now - self._last_write >= self.min_interval:
+            self.volume = volume
+            self._last_write = now
+            self.writes += 1
+            self.set_volume(volume)
+        return True
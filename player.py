@@ -0,0 +1,264 @@
+import atexit
+import os
+import weakref
+
+from track_info import track_duration
+
+SONG_EXTENSIONS = ('.mp3', '.wav')
+
+# Volume change of one volume_up/volume_down gesture
+VOLUME_STEP = 10
+# Seconds skipped by one seek_forward/seek_backward gesture
+SEEK_STEP = 10
+
+# Actions accepted by MediaPlayer.handle_action()
+ACTIONS = ('play', 'pause', 'stop', 'next', 'previous', 'volume_up', 'volume_down',
+           'seek_forward', 'seek_backward')
+
+# Players that may hold the mixer, closed at exit (e.g. the app's per-session players)
+_players = weakref.WeakSet()
+
+
+class MediaPlayer:
+    """
+    Music player on top of pygame.mixer, independent of any UI.
+    pygame is imported and the mixer initialised on first use, so creating a
+    player (e.g. to list songs) costs nothing at startup.
+    The playback position comes from the mixer clock, and the end of a track is
+    reported by pygame's end event; call update() regularly to auto-advance.
+    Args:
+        song_folder (str): Directory with the .mp3/.wav files.
+        volume (int): Initial volume, 0-100.
+        audio_device (str): Output device name for the mixer (None for the default one).
+    """
+
+    def __init__(self, song_folder="songs", volume=70, audio_device=None):
+        self.song_folder = song_folder
+        self.audio_device = audio_device
+        self.songs = []
+        self.index = 0
+        self.status = "stopped"
+        self.volume = volume
+        self._mixer_ready = False
+        self._end_event = None
+        # Position (s) the current playback was started or seeked from;
+        # get_pos() only counts from the last play()
+        self._start_offset = 0.0
+        _players.add(self)
+
+    @property
+    def has_songs(self):
+        return len(self.songs) > 0
+
+    @property
+    def current_song(self):
+        """File name of the current song, or "No song playing"."""
+        if not self.has_songs or self.status == "stopped":
+            return "No song playing"
+        return os.path.basename(self.songs[self.index])
+
+    @property
+    def duration(self):
+        """Length of the current song in seconds (None if unknown)."""
+        if not self.has_songs:
+            return None
+        return track_duration(self.songs[self.index])
+
+    def position(self):
+        """Playback position in the current song, in seconds."""
+        if self.status == "stopped" or not self._mixer_ready:
+            return 0.0
+        elapsed = self._ensure_mixer().get_pos()
+        position = self._start_offset + max(elapsed, 0) / 1000
+        duration = self.duration
+        return min(position, duration) if duration else position
+
+    def load_songs(self):
+        """Scan the song folder (creating it if needed) and return the song paths."""
+        if not os.path.exists(self.song_folder):
+            os.makedirs(self.song_folder)
+        self.songs = [os.path.join(self.song_folder, f) for f in os.listdir(self.song_folder)
+                      if f.endswith(SONG_EXTENSIONS)]
+        if self.index >= len(self.songs):
+            self.index = 0
+        return self.songs
+
+    def _ensure_mixer(self):
+        """Import pygame and initialise the mixer if needed; returns pygame.mixer.music."""
+        import pygame
+
+        if not self._mixer_ready:
+            pygame.init()
+            pygame.mixer.init(devicename=self.audio_device)
+            pygame.mixer.music.set_volume(self.volume / 100)
+            try:
+                pygame.event.clear()
+                self._end_event = pygame.USEREVENT + 1
+                pygame.mixer.music.set_endevent(self._end_event)
+            except pygame.error:
+                # No event queue without a video driver: update() falls back to get_busy()
+                self._end_event = None
+            self._mixer_ready = True
+        return pygame.mixer.music
+
+    def _discard_end_events(self):
+        # stop() posts the end event too; only natural track ends should advance
+        if self._end_event is not None:
+            import pygame
+
+            pygame.event.clear(self._end_event)
+
+    def play(self, index=None):
+        """Play the song at `index` (default: the current one) from the start."""
+        music = self._ensure_mixer()
+        if not self.has_songs:
+            return
+        if index is not None:
+            self.index = index % len(self.songs)
+        music.load(self.songs[self.index])
+        music.play()
+        self._start_offset = 0.0
+        self._discard_end_events()
+        self.status = "playing"
+
+    def pause(self):
+        self._ensure_mixer().pause()
+        self.status = "paused"
+
+    def unpause(self):
+        self._ensure_mixer().unpause()
+        self.status = "playing"
+
+    def resume_or_play(self):
+        """Resume a paused song, otherwise (re)start the current one."""
+        if self.status == "paused":
+            self.unpause()
+        else:
+            self.play()
+
+    def stop(self):
+        self._ensure_mixer().stop()
+        self._discard_end_events()
+        self.status = "stopped"
+
+    def seek(self, seconds):
+        """
+        Jump to a position in the current song (starting it if stopped).
+        A paused song stays paused.
+        Args:
+            seconds (float): Target position, clamped to the song.
+        """
+        if not self.has_songs:
+            return
+        music = self._ensure_mixer()
+        duration = self.duration
+        seconds = max(0.0, seconds if duration is None else min(seconds, duration - 0.5))
+        if self.status == "stopped":
+            music.load(self.songs[self.index])
+        was_paused = self.status == "paused"
+        music.play(start=seconds)
+        self._start_offset = seconds
+        self._discard_end_events()
+        self.status = "playing"
+        if was_paused:
+            self.pause()
+
+    def seek_by(self, delta):
+        """Move the playback position by `delta` seconds."""
+        if self.status == "stopped":
+            return
+        self.seek(self.position() + delta)
+
+    def update(self):
+        """
+        Handle finished tracks: advance to the next song when the current one
+        ended. Only reads pygame's event queue (or, without one, the mixer's
+        busy flag), so it is cheap to call per frame.
+        Returns:
+            True if the player advanced to another song.
+        """
+        if not self._mixer_ready:
+            return False
+        if self._end_event is not None:
+            import pygame
+
+            ended = bool(pygame.event.get(self._end_event))
+        else:
+            ended = not self._ensure_mixer().get_busy()
+        if ended and self.status == "playing":
+            self.next()
+            return True
+        return False
+
+    def next(self):
+        if not self.has_songs:
+            return
+        self.play(self.index + 1)
+
+    def previous(self):
+        if not self.has_songs:
+            return
+        self.play(self.index - 1)
+
+    def set_volume(self, volume):
+        """Set the volume (0-100)."""
+        music = self._ensure_mixer()
+        self.volume = max(0, min(100, volume))
+        music.set_volume(self.volume / 100)
+
+    def handle_action(self, action):
+        """
+        Run a gesture action.
+        Args:
+            action (str): One of ACTIONS.
+        Returns:
+            True if the action was recognised.
+        """
+        handlers = {
+            "play": self.resume_or_play,
+            "pause": self.pause,
+            "stop": self.stop,
+            "next": self.next,
+            "previous": self.previous,
+            "volume_up": lambda: self.set_volume(self.volume + VOLUME_STEP),
+            "volume_down": lambda: self.set_volume(self.volume - VOLUME_STEP),
+            "seek_forward": lambda: self.seek_by(SEEK_STEP),
+            "seek_backward": lambda: self.seek_by(-SEEK_STEP),
+        }
+        handler = handlers.get(action)
+        if handler is None:
+            return False
+        handler()
+        return True
+
+    def state(self):
+        """Snapshot of the player state."""
+        return {
+            "status": self.status,
+            "song": self.current_song,
+            "index": self.index,
+            "volume": self.volume,
+            "position": self.position(),
+            "duration": self.duration,
+        }
+
+    def close(self):
+        """Stop playback, release the song file and shut the mixer down. Safe to call twice."""
+        if self._mixer_ready:
+            import pygame
+
+            # pygame's own exit handler may have shut the mixer down already
+            if pygame.mixer.get_init():
+                pygame.mixer.music.stop()
+                pygame.mixer.music.unload()
+                pygame.mixer.quit()
+            self._mixer_ready = False
+        self.status = "stopped"
+
+
+def _close_players():
+    for player in list(_players):
+        player.close()
+
+
+atexit.register(_close_players)
@@ -0,0 +1,224 @@
+"""
+Serialized access to a MediaPlayer from many threads.
+
+pygame.mixer and the player's state are not thread safe, so web requests and
+the gesture loop don't call the player directly: they submit commands to a
+PlayerCommandQueue, whose single worker thread runs them one at a time.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+
+from player import ACTIONS
+
+# Commands that set an absolute value: a newer one replaces a queued one
+VALUE_ACTIONS = ("volume", "seek")
+
+
+class CommandQueueFull(Exception):
+    """Raised when a command could not be queued before its timeout."""
+
+
+class _Command:
+    __slots__ = ("action", "value", "done", "result", "error", "followers", "callback")
+
+    def __init__(self, action, value=None, callback=None):
+        self.action = action
+        self.value = value
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = []  # commands coalesced into this one
+        self.callback = callback
+
+    def finish(self, result, error=None):
+        for command in [self] + self.followers:
+            command.result = result
+            command.error = error
+            command.done.set()
+            if command.callback is not None:
+                try:
+                    command.callback(result, error)
+                except Exception as e:
+                    print(f"Error in the callback of player command {command.action!r}: {e}")
+
+
+class PlayerCommandQueue:
+    """
+    Single worker thread that owns a MediaPlayer and runs submitted commands in order.
+    - Idempotency keys: a command submitted again with the same key (e.g. a
+      retried web request) runs once; every submission gets the same result.
+    - Latest-wins coalescing: a "volume" or "seek" command that is still queued
+      takes the value of a newer one instead of queuing a second command.
+    - Bounded depth: when `max_depth` commands are waiting, submit() blocks
+      until there is room, up to its timeout, then raises CommandQueueFull.
+    The worker also calls player.update() every `tick` seconds so finished
+    tracks advance without anyone polling the player.
+    Args:
+        player (MediaPlayer): Player to drive; no other thread may use it.
+        max_depth (int): Maximum number of queued commands.
+        key_ttl (float): Seconds an idempotency key is remembered.
+        tick (float): Idle interval between player.update() calls.
+    """
+
+    def __init__(self, player, max_depth=64, key_ttl=60.0, tick=0.25):
+        self.player = player
+        self.max_depth = max_depth
+        self.key_ttl = key_ttl
+        self.tick = tick
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._pending_values = {}  # action -> queued value command
+        self._keys = OrderedDict()  # idempotency key -> (expiry time, command)
+        self._state = player.state()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="player-commands", daemon=True)
+        self._thread.start()
+
+    def __len__(self):
+        return len(self._queue)
+
+    def state(self):
+        """Latest player state snapshot (refreshed after every command and on every idle tick)."""
+        return self._state
+
+    def submit(self, action, value=None, key=None, wait=True, timeout=5.0, callback=None):
+        """
+        Queue a player command.
+        Args:
+            action (str): One of player.ACTIONS, or "volume"/"seek" with a value.
+            value (float): Volume (0-100) or position in seconds for value actions.
+            key (str): Idempotency key; repeated submissions with it run once.
+            wait (bool): Wait until the command ran and return the resulting state.
+            timeout (float): Seconds to wait for room in the queue and for the result.
+            callback: Called as callback(state, error) on the worker thread once the
+                command ran (or right away if it could not be queued); for wait=False.
+        Returns:
+            The player state dict after the command ran (None with wait=False).
+        Raises:
+            ValueError: Unknown action or missing value.
+            CommandQueueFull: No room in the queue within the timeout.
+            TimeoutError: The command did not run within the timeout.
+            Exception: Whatever the player raised while running the command.
+        """
+        if action in VALUE_ACTIONS:
+            if value is None:
+                raise ValueError(f"Action {action!r} needs a value")
+            value = float(value)
+        elif action not in ACTIONS:
+            raise ValueError(f"Unknown action {action!r}")
+
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Command queue is closed")
+            command = self._known_key(key)
+            if command is None:
+                command = _Command(action, value, callback)
+                if key is not None:
+                    # Registered before waiting for room, so a retry that arrives
+                    # meanwhile finds this command instead of queuing another one
+                    self._keys[key] = (time.monotonic() + self.key_ttl, command)
+                try:
+                    self._enqueue(command, deadline)
+                except (CommandQueueFull, RuntimeError) as e:
+                    if key is not None:
+                        del self._keys[key]
+                    command.finish(None, e)
+                    raise
+
+        if not wait:
+            return None
+        if not command.done.wait(max(0.0, deadline - time.monotonic())):
+            raise TimeoutError(f"Player command {action!r} did not run within {timeout}s")
+        if command.error is not None:
+            raise command.error
+        return command.result
+
+    def _known_key(self, key):
+        """Command already submitted with this idempotency key (call with the lock held)."""
+        if key is None:
+            return None
+        now = time.monotonic()
+        while self._keys:
+            oldest_key, (expiry, _) = next(iter(self._keys.items()))
+            if expiry > now:
+                break
+            del self._keys[oldest_key]
+        entry = self._keys.get(key)
+        return entry[1] if entry is not None else None
+
+    def _enqueue(self, command, deadline):
+        """
+        Queue a command, or coalesce it into a queued one that then finishes
+        both (call with the lock held).
+        """
+        while True:
+            pending = self._pending_values.get(command.action)
+            if pending is not None:
+                pending.value = command.value
+                pending.followers.append(command)
+                return
+            if len(self._queue) < self.max_depth:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self._cond.wait(remaining):
+                raise CommandQueueFull(f"{len(self._queue)} player commands pending")
+            if self._closed:
+                raise RuntimeError("Command queue is closed")
+        self._queue.append(command)
+        if command.action in VALUE_ACTIONS:
+            self._pending_values[command.action] = command
+        self._cond.notify_all()
+
+    def _run(self):
+        last_update = time.monotonic()
+        while True:
+            with self._cond:
+                if not self._queue and not self._closed:
+                    self._cond.wait(self.tick)
+                if not self._queue:
+                    if self._closed:
+                        return
+                    command = None
+                else:
+                    command = self._queue.popleft()
+                    if self._pending_values.get(command.action) is command:
+                        del self._pending_values[command.action]
+                    # Wake submitters waiting for room
+                    self._cond.notify_all()
+
+            if command is None or time.monotonic() - last_update >= self.tick:
+                last_update = time.monotonic()
+                try:
+                    self.player.update()
+                    self._state = self.player.state()
+                except Exception as e:
+                    print(f"Error updating the player: {e}")
+            if command is None:
+                continue
+
+            error = None
+            try:
+                if command.action == "volume":
+                    self.player.set_volume(command.value)
+                elif command.action == "seek":
+                    self.player.seek(command.value)
+                else:
+                    self.player.handle_action(command.action)
+            except Exception as e:
+                error = e
+            # The command always finishes, even if the snapshot fails: its
+            # submitter is waiting, and this thread must keep serving the queue
+            try:
+                self._state = self.player.state()
+            except Exception as e:
+                print(f"Error reading the player state: {e}")
+            command.finish(self._state, error)
+
+    def close(self, timeout=5.0):
+        """Run the commands already queued, then stop the worker thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
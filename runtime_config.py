@@ -0,0 +1,217 @@
+"""
+Thread-count and CPU placement settings for the capture and inference stages.
+
+When several pipelines share a host, OpenCV's thread pool, MediaPipe's graph
+threads and our own threads compete for the same cores. These settings bound
+them. They are read from the environment, so spawned workers (frame_ring's
+capture and inference processes, batch_detect/evaluate pools, supervisor
+zones) inherit them without extra plumbing:
+
+    GESTURE_PLAYER_CV_THREADS   cv2.setNumThreads() (0 or 1: no OpenCV worker threads)
+    GESTURE_PLAYER_OMP_THREADS  OpenMP/BLAS pool size (OMP_NUM_THREADS & co.); only
+                                takes effect in processes started after it is set
+    GESTURE_PLAYER_AFFINITY     CPUs per stage, e.g. "capture=0;inference=1-3"
+    GESTURE_PLAYER_NICE         niceness per stage, e.g. "capture=-5;inference=5"
+                                (negative values need privileges)
+
+Stages:
+    capture    the thread reading frames, which also converts and draws them
+    inference  MediaPipe's graph threads
+
+MediaPipe's Python API has no thread-count setting for its TFLite/XNNPACK
+calculators. Its graph threads are created when the model is built and, on
+Linux, inherit the building thread's CPU affinity and niceness, so models are
+built in a short-lived thread that has the inference stage applied.
+"""
+import os
+import sys
+import threading
+
+STAGES = ("capture", "inference")
+
+ENV_CV_THREADS = "GESTURE_PLAYER_CV_THREADS"
+ENV_OMP_THREADS = "GESTURE_PLAYER_OMP_THREADS"
+ENV_AFFINITY = "GESTURE_PLAYER_AFFINITY"
+ENV_NICE = "GESTURE_PLAYER_NICE"
+
+_OMP_VARIABLES = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+def parse_cpus(text):
+    """CPU list like "0-2,5" -> [0, 1, 2, 5]."""
+    cpus = []
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, last = part.split("-")
+            cpus.extend(range(int(first), int(last) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def format_cpus(cpus):
+    return ",".join(str(cpu) for cpu in cpus)
+
+
+def _parse_stages(text, parse_value):
+    """"stage=value;stage=value" -> {stage: value}."""
+    settings = {}
+    for part in text.split(";"):
+        if not part.strip():
+            continue
+        stage, _, value = part.partition("=")
+        stage = stage.strip()
+        if stage not in STAGES:
+            raise ValueError(f"Unknown pipeline stage {stage!r}, expected one of {STAGES}")
+        settings[stage] = parse_value(value.strip())
+    return settings
+
+
+class RuntimeConfig:
+    """
+    Thread pool sizes and per-stage CPU affinity/niceness.
+    Args:
+        cv_threads (int): cv2.setNumThreads() value (None: OpenCV's default).
+        omp_threads (int): OpenMP/BLAS pool size for processes started later (None: default).
+        affinity (dict): Stage -> list of CPUs.
+        nice (dict): Stage -> niceness.
+    """
+
+    def __init__(self, cv_threads=None, omp_threads=None, affinity=None, nice=None):
+        self.cv_threads = cv_threads
+        self.omp_threads = omp_threads
+        self.affinity = dict(affinity or {})
+        self.nice = dict(nice or {})
+        self._warned = set()
+
+    @classmethod
+    def from_env(cls, environ=None):
+        """Settings from the GESTURE_PLAYER_* environment variables."""
+        environ = os.environ if environ is None else environ
+        cv_threads = environ.get(ENV_CV_THREADS)
+        omp_threads = environ.get(ENV_OMP_THREADS)
+        return cls(
+            cv_threads=int(cv_threads) if cv_threads else None,
+            omp_threads=int(omp_threads) if omp_threads else None,
+            affinity=_parse_stages(environ.get(ENV_AFFINITY, ""), parse_cpus),
+            nice=_parse_stages(environ.get(ENV_NICE, ""), int),
+        )
+
+    def to_env(self):
+        """Environment variables that reproduce these settings in another process."""
+        env = {}
+        if self.cv_threads is not None:
+            env[ENV_CV_THREADS] = str(self.cv_threads)
+        if self.omp_threads is not None:
+            env[ENV_OMP_THREADS] = str(self.omp_threads)
+            for name in _OMP_VARIABLES:
+                env[name] = str(self.omp_threads)
+        if self.affinity:
+            env[ENV_AFFINITY] = ";".join(f"{stage}={format_cpus(cpus)}" for stage, cpus in self.affinity.items())
+        if self.nice:
+            env[ENV_NICE] = ";".join(f"{stage}={nice}" for stage, nice in self.nice.items())
+        return env
+
+    def describe(self):
+        parts = [f"cv={'default' if self.cv_threads is None else self.cv_threads}",
+                 f"omp={'default' if self.omp_threads is None else self.omp_threads}"]
+        parts += [f"{stage}@{format_cpus(cpus)}" for stage, cpus in self.affinity.items()]
+        parts += [f"{stage} nice {nice}" for stage, nice in self.nice.items()]
+        return " ".join(parts)
+
+    def apply_process(self):
+        """Apply the process-wide settings (OpenCV's pool, OpenMP variables for child processes)."""
+        if self.omp_threads is not None:
+            for name in _OMP_VARIABLES:
+                os.environ[name] = str(self.omp_threads)
+        if self.cv_threads is not None:
+            import cv2
+
+            cv2.setNumThreads(self.cv_threads)
+
+    def enter_stage(self, stage):
+        """Apply a stage's CPU affinity and niceness to the calling thread (and threads it starts later)."""
+        tid = threading.get_native_id()
+        cpus = self.affinity.get(stage)
+        if cpus and hasattr(os, "sched_setaffinity"):
+            try:
+                # A thread ID limits only this thread on Linux, not the whole process
+                os.sched_setaffinity(tid, cpus)
+            except OSError as e:
+                self._warn(stage, f"Could not pin the {stage} stage to CPUs {format_cpus(cpus)}: {e}")
+        nice = self.nice.get(stage)
+        if nice is not None and hasattr(os, "setpriority"):
+            try:
+                os.setpriority(os.PRIO_PROCESS, tid, nice)
+            except OSError as e:
+                self._warn(stage, f"Could not set the {stage} stage's niceness to {nice}: {e}")
+
+    def has_stage(self, stage):
+        return stage in self.affinity or stage in self.nice
+
+    def _warn(self, stage, message):
+        if stage not in self._warned:
+            self._warned.add(stage)
+            print(f"Warning: {message}", file=sys.stderr)
+
+
+_config = None
+_config_lock = threading.Lock()
+
+
+def get_config():
+    """Process-wide RuntimeConfig, read from the environment and applied on first use."""
+    global _config
+    if _config is None:
+        with _config_lock:
+            if _config is None:
+                config = RuntimeConfig.from_env()
+                config.apply_process()
+                _config = config
+    return _config
+
+
+def configure(config):
+    """Use `config` in this process and in processes started from now on."""
+    global _config
+    with _config_lock:
+        for name in (ENV_CV_THREADS, ENV_OMP_THREADS, ENV_AFFINITY, ENV_NICE):
+            os.environ.pop(name, None)
+        os.environ.update(config.to_env())
+        config.apply_process()
+        _config = config
+
+
+def enter_stage(stage):
+    """Apply `stage`'s settings to the calling thread."""
+    get_config().enter_stage(stage)
+
+
+def run_in_stage(stage, function, *args):
+    """
+    Call function(*args) in a short-lived thread with `stage` applied, so the
+    threads it starts (e.g. a MediaPipe graph's) inherit the stage's placement.
+    Runs it directly when the stage has no settings.
+    """
+    config = get_config()
+    if not config.has_stage(stage):
+        return function(*args)
+    result = []
+    errors = []
+
+    def target():
+        config.enter_stage(stage)
+        try:
+            result.append(function(*args))
+        except BaseException as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=target, name=f"{stage}-setup")
+    thread.start()
+    thread.join()
+    if errors:
+        raise errors[0]
+    return result[0]
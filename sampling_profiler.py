@@ -0,0 +1,231 @@
+"""
+On-demand sampling profiler for a running controller.
+
+A background thread wakes every `interval` seconds, takes the Python stack of
+every other thread (sys._current_frames()) and counts identical stacks. The
+profiled code is not instrumented, so it keeps running at full speed; the only
+cost is the sampler's own work, which is reported with the results (typically
+well under 1% of one core at the default 100 Hz).
+
+When the window ends, save() writes two files:
+    profile-<time>-<pid>.collapsed  one "thread;outer;...;inner count" line per stack,
+                                    for flamegraph.pl, speedscope or inferno
+    profile-<time>-<pid>.txt        the top functions by own and inclusive samples
+
+Start a window with start_profile() (the app's Profiler panel does), or send
+SIGUSR1 to a process that called install_signal_handler() (headless.py,
+web_app.py and the supervisor's zone workers):
+    kill -USR1 <pid>
+Only the Python threads of the process are sampled; with the multi-process
+pipeline, profile the workers separately.
+"""
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+
+DEFAULT_DIRECTORY = "profiles"
+
+_lock = threading.RLock()  # re-entrant: the signal handler may interrupt a holder
+_active = None
+_last = None
+
+
+class SamplingProfiler:
+    """
+    Counts the stacks of the process's threads at a fixed interval.
+    Args:
+        interval (float): Seconds between two samples.
+        threads (set): Thread idents to sample (None: every thread but the sampler).
+    """
+
+    def __init__(self, interval=0.01, threads=None):
+        self.interval = interval
+        self.threads = threads
+        self.stacks = Counter()
+        self.samples = 0
+        self.sampler_time = 0.0
+        self.started = None
+        self.stopped = None
+        self.paths = None
+        self._labels = {}  # code object -> frame label
+        self._names = {}  # thread ident -> thread name
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration=None, on_done=None):
+        """
+        Start sampling in the background.
+        Args:
+            duration (float): Stop by itself after this many seconds (None: run until stop()).
+            on_done: Optional callable run with the profiler, in the sampler thread, once it stops.
+        """
+        self._stop.clear()
+        self.started = time.time()
+        self._thread = threading.Thread(target=self._run, args=(duration, on_done), name="sampling-profiler",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        if self.stopped is None:
+            self.stopped = time.time()
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def _thread_name(self, ident):
+        name = self._names.get(ident)
+        if name is None:
+            self._names = {thread.ident: thread.name for thread in threading.enumerate()}
+            name = self._names.setdefault(ident, f"thread-{ident}")
+        return name
+
+    def sample(self):
+        """Record the current stack of every sampled thread once."""
+        own = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == own or (self.threads is not None and ident not in self.threads):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.append(self._thread_name(ident))
+            stack.reverse()
+            self.stacks[tuple(stack)] += 1
+        self.samples += 1
+
+    def _run(self, duration, on_done):
+        next_sample = time.perf_counter()
+        end = next_sample + duration if duration is not None else None
+        while not self._stop.is_set() and (end is None or next_sample < end):
+            start = time.perf_counter()
+            self.sample()
+            self.sampler_time += time.perf_counter() - start
+            # Keep a steady rate, but don't try to catch up after a long pause
+            next_sample = max(next_sample + self.interval, time.perf_counter())
+            self._stop.wait(next_sample - time.perf_counter())
+        self.stopped = time.time()
+        if on_done is not None:
+            on_done(self)
+
+    def collapsed(self):
+        """Stacks in the collapsed format, heaviest first."""
+        return [f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common()]
+
+    def hotspots(self, top=25):
+        """
+        The functions the sampled threads spent the most samples in.
+        Returns:
+            tuple: (by own samples, by inclusive samples), each a list of (label, samples)
+        """
+        own = Counter()
+        inclusive = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            # Count recursive functions once per stack
+            for label in set(stack[1:]):
+                inclusive[label] += count
+        return own.most_common(top), inclusive.most_common(top)
+
+    def format_summary(self, top=25):
+        total = sum(self.stacks.values())
+        elapsed = (self.stopped or time.time()) - self.started
+        threads = Counter()
+        for stack, count in self.stacks.items():
+            threads[stack[0]] += count
+        lines = [f"{self.samples} samples over {elapsed:.1f}s every {self.interval * 1000:g} ms, "
+                 f"sampler busy {self.sampler_time * 1000:.0f} ms ({self.sampler_time / max(elapsed, 1e-9):.2%})",
+                 "", "Threads:"]
+        lines += [f"  {count / max(total, 1):6.1%}  {name}" for name, count in threads.most_common()]
+        own, inclusive = self.hotspots(top)
+        for title, rows in (("Own samples (where the time is spent):", own),
+                            ("Inclusive samples (including callees):", inclusive)):
+            lines += ["", title]
+            lines += [f"  {count / max(total, 1):6.1%} {count:>7}  {label}" for label, count in rows]
+        return "\n".join(lines)
+
+    def save(self, directory=DEFAULT_DIRECTORY, top=25):
+        """
+        Write the collapsed stacks and the hotspot summary.
+        Returns:
+            tuple: (collapsed path, summary path)
+        """
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started))
+        base = os.path.join(directory, f"profile-{stamp}-{os.getpid()}")
+        with open(base + ".collapsed", "w", encoding="utf-8") as f:
+            f.write("\n".join(self.collapsed()) + "\n")
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(self.format_summary(top) + "\n")
+        self.paths = (base + ".collapsed", base + ".txt")
+        return self.paths
+
+
+def start_profile(duration=30.0, directory=DEFAULT_DIRECTORY, interval=0.01, top=25):
+    """
+    Profile the whole process for `duration` seconds in the background, then save the results.
+    Does nothing if a window is already running.
+    Returns:
+        SamplingProfiler: the running profiler (the existing one, if any).
+    """
+    global _active
+    with _lock:
+        if _active is not None and _active.running:
+            return _active
+        profiler = SamplingProfiler(interval)
+        profiler.start(duration, on_done=lambda profiler: _finish(profiler, directory, top))
+        _active = profiler
+    return profiler
+
+
+def _finish(profiler, directory, top):
+    global _last
+    try:
+        paths = profiler.save(directory, top)
+        print(f"Profile written to {paths[0]} and {paths[1]}", file=sys.stderr)
+    except OSError as e:
+        print(f"Error: could not write the profile: {e}", file=sys.stderr)
+    _last = profiler
+
+
+def active_profile():
+    """The profiler of the running window, or None."""
+    profiler = _active
+    return profiler if profiler is not None and profiler.running else None
+
+
+def last_profile():
+    """The profiler of the most recent finished window, or None."""
+    return _last
+
+
+def install_signal_handler(signum=None, **options):
+    """
+    Start a profiling window (see start_profile) whenever the process gets `signum` (default SIGUSR1).
+    Must be called from the main thread.
+    Returns:
+        True if the handler was installed (False where the signal doesn't exist, e.g. on Windows).
+    """
+    signum = signum if signum is not None else getattr(signal, "SIGUSR1", None)
+    if signum is None:
+        return False
+
+    def handler(signum, frame):
+        start_profile(**options)
+
+    signal.signal(signum, handler)
+    return True
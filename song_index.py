@@ -0,0 +1,65 @@
+import os
+from collections import OrderedDict
+
+
+class SongIndex:
+    """
+    In-memory search index over a song list, built once per list so searching
+    and paging a large library doesn't touch the file system or re-derive names.
+    Args:
+        songs (list): Song paths, in library order.
+        cache_size (int): Number of recent search results kept.
+    """
+
+    def __init__(self, songs, cache_size=32):
+        self.songs = list(songs)
+        self.names = [os.path.basename(song) for song in self.songs]
+        self._keys = [name.casefold() for name in self.names]
+        self._formats = [os.path.splitext(name)[1][1:].upper() for name in self.names]
+        self.formats = sorted(set(self._formats))
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    def __len__(self):
+        return len(self.songs)
+
+    def search(self, query="", song_format=None):
+        """
+        Find songs by name.
+        Args:
+            query (str): Space-separated terms; a song matches when its file name
+                contains all of them (case-insensitive). Empty matches everything.
+            song_format (str): Only songs with this extension (e.g. "MP3"), or None for all.
+        Returns:
+            List of song indices, in library order.
+        """
+        terms = tuple(query.casefold().split())
+        cache_key = (terms, song_format)
+        matches = self._cache.get(cache_key)
+        if matches is not None:
+            self._cache.move_to_end(cache_key)
+            return matches
+
+        matches = [i for i, key in enumerate(self._keys)
+                   if all(term in key for term in terms)
+                   and (song_format is None or self._formats[i] == song_format)]
+        self._cache[cache_key] = matches
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return matches
+
+    @staticmethod
+    def page(matches, page, page_size):
+        """
+        One page of search results.
+        Args:
+            matches (list): Output of search().
+            page (int): 1-based page number (clamped to the available pages).
+            page_size (int): Songs per page.
+        Returns:
+            tuple: (indices on the page, page number used, number of pages)
+        """
+        pages = max(1, -(-len(matches) // page_size))
+        page = min(max(1, page), pages)
+        start = (page - 1) * page_size
+        return matches[start:start + page_size], page, pages
@@ -0,0 +1,58 @@
+"""
+Deferred loading of the slow parts of the app.
+
+Importing MediaPipe and building its Hands graph takes about a second, and
+pygame a little more on top, so app.py renders the page first and then calls
+start_warm_up(), which loads them on a background thread while the user is
+still reading the page. By the time the webcam is started, the first frame
+only pays for inference.
+"""
+import threading
+import time
+
+_lock = threading.Lock()
+_thread = None
+# Seconds spent on each warm-up step, filled in by the warm-up thread
+timings = {}
+
+
+def _warm_up(max_num_hands):
+    start = time.perf_counter()
+    import media_controls
+
+    media_controls.warm_up(max_num_hands)
+    timings["hands_model"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    import pygame  # noqa: F401
+    timings["pygame"] = time.perf_counter() - start
+
+
+def start_warm_up(max_num_hands=2):
+    """
+    Start loading MediaPipe, the Hands model and pygame in the background.
+    Only the first call per process starts a thread; later calls return it.
+    Args:
+        max_num_hands (int): Which Hands model to build (see media_controls.get_hands_model).
+    Returns:
+        threading.Thread
+    """
+    global _thread
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_warm_up, args=(max_num_hands,), name="warm-up", daemon=True)
+            _thread.start()
+        return _thread
+
+
+def wait_for_warm_up(timeout=None):
+    """
+    Block until the background warm-up has finished (no-op if it was never started).
+    Returns:
+        True if the warm-up is done.
+    """
+    thread = _thread
+    if thread is None:
+        return False
+    thread.join(timeout)
+    return not thread.is_alive()
@@ -0,0 +1,93 @@
+// Capture the camera in the browser and send JPEG frames to the ingest server
+// (ingest_server.py), which answers every recognised frame with its gesture.
+
+const FRAME_WIDTH = 320;    // the hand model works on small images anyway
+const JPEG_QUALITY = 0.7;
+const MAX_FPS = 15;
+const MAX_IN_FLIGHT = 2;    // frames sent but not answered yet
+
+const video = document.getElementById('camera');
+const canvas = document.createElement('canvas');
+let socket = null;
+let sent = 0;
+let answered = 0;
+let lastSent = 0;
+let encoding = false;        // a frame is being encoded; it is not counted as sent yet
+
+function capitalize(text) {
+    return text ? text.charAt(0).toUpperCase() + text.slice(1) : 'None';
+}
+
+function setStatus(text, state) {
+    const statusIndicator = document.getElementById('status-indicator');
+    statusIndicator.className = 'status-indicator';
+    if (state) {
+        statusIndicator.classList.add(state);
+    }
+    document.getElementById('status-text').textContent = text;
+}
+
+function sendFrame(now) {
+    requestAnimationFrame(sendFrame);
+    if (!socket || socket.readyState !== WebSocket.OPEN || !video.videoWidth) {
+        return;
+    }
+    // Don't queue up frames the server would only drop
+    if (encoding || now - lastSent < 1000 / MAX_FPS || sent - answered >= MAX_IN_FLIGHT) {
+        return;
+    }
+    lastSent = now;
+    canvas.width = FRAME_WIDTH;
+    canvas.height = Math.round(FRAME_WIDTH * video.videoHeight / video.videoWidth);
+    canvas.getContext('2d').drawImage(video, 0, 0, canvas.width, canvas.height);
+    encoding = true;
+    const target = socket;
+    canvas.toBlob(blob => {
+        encoding = false;
+        // Count only frames the server gets: its answers number the frames it received
+        if (!blob || target !== socket || target.readyState !== WebSocket.OPEN) {
+            return;
+        }
+        try {
+            target.send(blob);
+            sent++;
+        } catch (error) {
+            console.error('Could not send a frame:', error);
+        }
+    }, 'image/jpeg', JPEG_QUALITY);
+}
+
+function connect() {
+    const scheme = location.protocol === 'https:' ? 'wss' : 'ws';
+    socket = new WebSocket(`${scheme}://${location.host}/ingest`);
+    socket.onopen = () => {
+        sent = answered = 0;
+        setStatus('Connected', 'playing');
+    };
+    socket.onmessage = event => {
+        const result = JSON.parse(event.data);
+        answered = Math.max(answered, result.frame + 1);
+        if (result.error) {
+            console.error('Ingest error:', result.error);
+            return;
+        }
+        document.getElementById('current-gesture').textContent = capitalize(result.gesture);
+        if (result.action) {
+            document.getElementById('last-action').textContent = capitalize(result.action);
+        }
+        document.getElementById('stream-info').textContent =
+            `${result.hands.length} hand(s), ${result.latency_ms} ms, ${result.dropped} dropped`;
+    };
+    socket.onclose = event => {
+        setStatus(event.reason || 'Disconnected', 'paused');
+        setTimeout(connect, 2000);
+    };
+}
+
+navigator.mediaDevices.getUserMedia({video: {width: 640, height: 480}, audio: false})
+    .then(stream => {
+        video.srcObject = stream;
+        connect();
+        requestAnimationFrame(sendFrame);
+    })
+    .catch(error => setStatus(`Camera unavailable: ${error.message}`, null));
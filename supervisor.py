@@ -0,0 +1,330 @@
+"""
+Multi-zone gesture controller: one worker process per camera.
+
+Each zone (a room) has its own camera, player, songs and gesture settings.
+The supervisor runs every zone's capture -> inference -> playback loop
+(headless.run) in its own process, so zones use separate cores and one
+crashing zone doesn't take the others down. It checks every worker's
+heartbeat, restarts workers that exited or stopped producing frames (with
+exponential backoff), and can publish the zones' health as JSON.
+
+Zones file (keys other than name and cpus are headless.py options):
+    {
+      "zones": [
+        {"name": "kitchen", "source": "0", "songs": "songs/kitchen", "audio_device": "...",
+         "gestures": "gestures.json", "cooldown": 2, "one_hand": true, "cpus": [0, 1]},
+        {"name": "studio", "source": "/dev/video2", "camera_mode": "640x480@30", "songs": "songs/studio"}
+      ],
+      "threads_per_worker": 1
+    }
+
+Usage:
+    python supervisor.py zones.json --status --health-file /run/gesture-zones.json
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import signal
+import sys
+import time
+
+# Zone keys that configure the worker process rather than headless.run
+ZONE_KEYS = ("name", "cpus")
+
+STATUS_HEADER = f"{'zone':<16} {'state':<10} {'pid':>7} {'fps':>6} {'frames':>9} {'restarts':>8}"
+
+
+def zone_argv(zone):
+    """headless.py command line for a zone's settings, e.g. {"one_hand": true} -> ["--one-hand"]."""
+    argv = []
+    for key, value in zone.items():
+        if key in ZONE_KEYS or value is None or value is False:
+            continue
+        flag = "--" + key.replace("_", "-")
+        if value is True:
+            argv.append(flag)
+        else:
+            argv += [flag, str(value)]
+    if "zone" not in zone:
+        argv += ["--zone", zone["name"]]
+    return argv
+
+
+def load_zones(path):
+    """
+    Read and validate a zones file.
+    Returns:
+        tuple: (list of zone dicts, threads_per_worker)
+    Raises:
+        ValueError: A zone has no name, a duplicate name or an invalid option.
+    """
+    import headless
+
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    zones = config.get("zones", [])
+    names = set()
+    parser = headless.build_parser()
+    for zone in zones:
+        name = zone.get("name")
+        if not name or name in names:
+            raise ValueError(f"Every zone needs a unique name, got {name!r}")
+        names.add(name)
+        try:
+            parser.parse_args(zone_argv(zone))
+        except SystemExit:
+            # argparse already printed what is wrong
+            raise ValueError(f"Zone {name!r} has invalid options") from None
+    return zones, config.get("threads_per_worker", 1)
+
+
+def _worker_main(zone, threads, heartbeat, frames):
+    """Entry point of a zone's worker process."""
+    from runtime_config import RuntimeConfig, configure
+
+    # Several busy processes on one box: keep each library's thread pool small
+    # so workers don't oversubscribe the cores. Set through runtime_config
+    # before numpy/OpenCV load, so the OpenMP variables still take effect and
+    # the pipeline's own get_config() sees the same settings
+    if threads:
+        config = RuntimeConfig.from_env()
+        config.cv_threads = threads
+        config.omp_threads = threads
+        configure(config)
+    if zone.get("cpus") and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, zone["cpus"])
+
+    import headless
+    from sampling_profiler import install_signal_handler
+
+    stop = []
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C is the supervisor's to handle
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.append(signum))
+    args = headless.build_parser().parse_args(zone_argv(zone))
+    install_signal_handler(duration=args.profile_seconds, directory=args.profile_dir)
+
+    def on_frame():
+        heartbeat.value = time.time()
+        frames.value += 1
+
+    sys.exit(headless.run(args, stop_requested=lambda: bool(stop), on_frame=on_frame))
+
+
+class ZoneWorker:
+    """
+    One zone's worker process, its heartbeat and its restart bookkeeping.
+    Args:
+        zone (dict): Zone settings (see the module docstring).
+        threads (int): Thread pool size per library in the worker (0: library defaults).
+        context: multiprocessing context used to start the process.
+    """
+
+    def __init__(self, zone, threads=1, context=None):
+        self.zone = zone
+        self.name = zone["name"]
+        self.threads = threads
+        self.context = context or mp.get_context("spawn")
+        # Written by the worker on every frame, without locking (single writer)
+        self.heartbeat = self.context.Value("d", 0.0, lock=False)
+        self.frames = self.context.Value("q", 0, lock=False)
+        self.process = None
+        self.state = "stopped"
+        self.started_at = 0.0
+        self.restarts = 0
+        self.last_exit = None
+        self.backoff = 0.0
+        self.next_start = 0.0
+        self.fps = 0.0
+        self._fps_frames = 0
+        self._fps_time = time.monotonic()
+
+    def start(self):
+        self.heartbeat.value = 0.0
+        self.process = self.context.Process(target=_worker_main, name=f"zone-{self.name}",
+                                            args=(self.zone, self.threads, self.heartbeat, self.frames))
+        self.process.start()
+        self.state = "starting"
+        self.started_at = time.time()
+
+    def stop(self, timeout=10.0):
+        """Ask the worker to finish (SIGTERM), killing it if it doesn't within `timeout`."""
+        if self.process is None:
+            return
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join()
+        self.last_exit = self.process.exitcode
+        self.process = None
+        self.state = "stopped"
+
+    def _update_fps(self):
+        now = time.monotonic()
+        frames = self.frames.value
+        if now - self._fps_time >= 1.0:
+            self.fps = (frames - self._fps_frames) / (now - self._fps_time)
+            self._fps_frames = frames
+            self._fps_time = now
+
+    def status(self):
+        return {
+            "zone": self.name,
+            "state": self.state,
+            "pid": self.process.pid if self.process is not None else None,
+            "fps": round(self.fps, 1),
+            "frames": self.frames.value,
+            "restarts": self.restarts,
+            "last_exit": self.last_exit,
+            "last_frame": self.heartbeat.value or None,
+        }
+
+
+class Supervisor:
+    """
+    Starts a worker per zone, checks their health and restarts them.
+    A worker is restarted when its process exited (crash, camera gone, end of
+    a video file) or when it produced no frame for `stall_timeout` seconds
+    (`startup_grace` for the first frame, which includes loading the model).
+    Restarts back off exponentially up to `max_backoff` seconds; a worker that
+    stayed healthy for `healthy_after` seconds starts from a short delay again.
+    Args:
+        zones (list): Zone dicts (see load_zones()).
+        threads_per_worker (int): Thread pool size per library in each worker.
+        stall_timeout (float): Seconds without a frame after which a worker is restarted.
+        startup_grace (float): Seconds a new worker gets to produce its first frame.
+        max_backoff (float): Longest delay before a restart.
+        healthy_after (float): Seconds of health after which the backoff is reset.
+    """
+
+    def __init__(self, zones, threads_per_worker=1, stall_timeout=10.0, startup_grace=60.0, max_backoff=30.0,
+                 healthy_after=60.0):
+        context = mp.get_context("spawn")
+        self.workers = [ZoneWorker(zone, threads_per_worker, context) for zone in zones]
+        self.stall_timeout = stall_timeout
+        self.startup_grace = startup_grace
+        self.max_backoff = max_backoff
+        self.healthy_after = healthy_after
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+
+    def _schedule_restart(self, worker, reason):
+        worker.backoff = min(self.max_backoff, max(1.0, worker.backoff * 2))
+        worker.next_start = time.time() + worker.backoff
+        worker.state = "waiting"
+        print(f"Zone {worker.name}: {reason}, restarting in {worker.backoff:.0f}s", file=sys.stderr)
+
+    def check(self):
+        """Check every worker once and restart the ones that need it."""
+        now = time.time()
+        for worker in self.workers:
+            if worker.state == "waiting":
+                if now >= worker.next_start:
+                    worker.restarts += 1
+                    worker.start()
+                continue
+            if worker.process is None:
+                continue
+
+            worker._update_fps()
+            if not worker.process.is_alive():
+                worker.last_exit = worker.process.exitcode
+                worker.process = None
+                self._schedule_restart(worker, f"worker exited with code {worker.last_exit}")
+                continue
+
+            last_frame = worker.heartbeat.value
+            if last_frame:
+                worker.state = "running"
+                if now - last_frame > self.stall_timeout:
+                    worker.stop(timeout=5.0)
+                    self._schedule_restart(worker, f"no frame for {now - last_frame:.0f}s")
+                elif now - worker.started_at > self.healthy_after:
+                    worker.backoff = 0.0
+            elif now - worker.started_at > self.startup_grace:
+                worker.stop(timeout=5.0)
+                self._schedule_restart(worker, f"no first frame after {self.startup_grace:.0f}s")
+
+    def status(self):
+        return [worker.status() for worker in self.workers]
+
+    def stop(self):
+        # Ask every worker first so they wind down in parallel
+        for worker in self.workers:
+            if worker.process is not None and worker.process.is_alive():
+                worker.process.terminate()
+        for worker in self.workers:
+            worker.stop()
+
+    def run(self, stop_requested=lambda: False, check_interval=1.0, on_check=None):
+        """
+        Start the workers and supervise them until stop_requested() returns True.
+        Args:
+            stop_requested: Callable polled every check_interval seconds.
+            check_interval (float): Seconds between two health checks.
+            on_check: Optional callable run after every check with the status list.
+        """
+        self.start()
+        try:
+            while not stop_requested():
+                time.sleep(check_interval)
+                self.check()
+                if on_check is not None:
+                    on_check(self.status())
+        finally:
+            self.stop()
+
+
+def format_status(status):
+    lines = [STATUS_HEADER]
+    for zone in status:
+        lines.append(f"{zone['zone']:<16} {zone['state']:<10} {zone['pid'] or '-':>7} {zone['fps']:>6.1f} "
+                     f"{zone['frames']:>9} {zone['restarts']:>8}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run one gesture controller process per camera zone.")
+    parser.add_argument("zones", help="Zones file (JSON, see the module docstring)")
+    parser.add_argument("--status", action="store_true", help="Print the zones' status every few seconds")
+    parser.add_argument("--status-interval", type=float, default=5.0)
+    parser.add_argument("--health-file", help="Write the zones' status as JSON to this file after every check")
+    parser.add_argument("--stall-timeout", type=float, default=10.0,
+                        help="Restart a worker after this many seconds without a frame")
+    args = parser.parse_args(argv)
+
+    try:
+        zones, threads = load_zones(args.zones)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    if not zones:
+        print(f"No zones in {args.zones}", file=sys.stderr)
+        return 1
+
+    stop = []
+    signal.signal(signal.SIGINT, lambda signum, frame: stop.append(signum))
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.append(signum))
+    last_status = [0.0]
+
+    def on_check(status):
+        if args.health_file:
+            tmp = args.health_file + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"time": time.time(), "zones": status}, f)
+            os.replace(tmp, args.health_file)
+        if args.status and time.monotonic() - last_status[0] >= args.status_interval:
+            last_status[0] = time.monotonic()
+            print(format_status(status), file=sys.stderr)
+
+    Supervisor(zones, threads_per_worker=threads, stall_timeout=args.stall_timeout).run(
+        stop_requested=lambda: bool(stop), on_check=on_check)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+import evaluate
+import media_controls
+from benchmarks.load_test import write_synthetic_video
+
+# Throughput depends on the machine and the pool, not on the recordings
+TIMING_KEYS = ("fps_per_worker", "fps_total")
+
+
+def make_hand(mask, x=0.5):
+    """Upright hand with the fingers of `mask` (bit 0: thumb) extended."""
+    hand = np.zeros((21, 3))
+    hand[:, 0] = x
+    hand[:, 1] = 0.5
+    hand[0] = (x, 0.9, 0)
+    hand[3] = (x + 0.05, 0.6, 0)
+    hand[4] = (x + 0.1 if mask & 1 else x, 0.6, 0)
+    for i, (tip, pip) in enumerate(((8, 6), (12, 10), (16, 14), (20, 18))):
+        hand[pip] = (x, 0.5, 0)
+        hand[tip] = (x, 0.3 if mask >> (i + 1) & 1 else 0.7, 0)
+    return hand
+
+
+def write_landmark_recording(path, seed):
+    rng = np.random.default_rng(seed)
+    hands_per_frame = []
+    labels = []
+    for mask in rng.integers(0, 32, size=6):
+        for _ in range(int(rng.integers(10, 40))):
+            hand = make_hand(int(mask)) + rng.normal(0, 0.005, (21, 3))
+            hands_per_frame.append([hand] if mask else [])
+            labels.append("play" if mask == 31 else None)
+    evaluate.save_recording(str(path), hands_per_frame, 30.0, labels)
+
+
+@pytest.fixture(scope="module")
+def recordings(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("recordings")
+    paths = []
+    for n in range(2):
+        video = directory / f"clip{n}.mp4"
+        write_synthetic_video(str(video), seconds=1)
+        paths.append(str(video))
+    for n in range(4):
+        recording = directory / f"landmarks{n}.npz"
+        write_landmark_recording(recording, seed=n)
+        paths.append(str(recording))
+    return sorted(paths)
+
+
+def test_report_does_not_depend_on_the_number_of_workers(recordings):
+    options = {"smoothing": True, "cooldown": 0.5, "gestures_path": None, "max_num_hands": 2}
+    reports = [evaluate.evaluate(recordings, options, workers) for workers in (1, 3)]
+    for report in reports:
+        for key in TIMING_KEYS:
+            del report[key]
+    assert reports[0]["frames"] > 0
+    assert reports[0] == reports[1]
+
+
+def test_video_recording_leaves_no_tracking_model_behind(recordings):
+    video = next(path for path in recordings if path.endswith(".mp4"))
+    result = evaluate.evaluate_recording(video)
+    assert result["frames"] > 0
+    assert media_controls._hands_models == {}
@@ -0,0 +1,144 @@
+import threading
+import time
+
+import pytest
+
+from player_commands import CommandQueueFull, PlayerCommandQueue
+
+
+class FakePlayer:
+    """MediaPlayer stand-in that records its calls and fails if two threads use it at once."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        self.overlaps = 0
+        self.fail_state = False
+        self.gate = threading.Event()
+        self.gate.set()
+        self._busy = threading.Lock()
+        self.volume = 70
+
+    def _call(self, *call):
+        if not self._busy.acquire(blocking=False):
+            self.overlaps += 1
+            return
+        try:
+            self.gate.wait(5)
+            time.sleep(self.delay)
+            self.calls.append(call)
+        finally:
+            self._busy.release()
+
+    def handle_action(self, action):
+        self._call(action)
+
+    def set_volume(self, volume):
+        self._call("volume", volume)
+        self.volume = volume
+
+    def seek(self, position):
+        self._call("seek", position)
+
+    def update(self):
+        pass
+
+    def state(self):
+        if self.fail_state:
+            raise RuntimeError("mixer not initialized")
+        return {"volume": self.volume, "calls": len(self.calls)}
+
+
+@pytest.fixture
+def player():
+    return FakePlayer()
+
+
+@pytest.fixture
+def commands(player):
+    queue = PlayerCommandQueue(player, tick=0.05)
+    yield queue
+    player.gate.set()
+    queue.close()
+
+
+def test_concurrent_submits_run_one_at_a_time(player, commands):
+    player.delay = 0.001
+    errors = []
+
+    def client(n):
+        try:
+            for _ in range(n):
+                commands.submit("next", timeout=10)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=client, args=(20,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert player.overlaps == 0
+    assert len(player.calls) == 8 * 20
+
+
+def test_idempotency_key_runs_once_across_threads(player, commands):
+    player.gate.clear()
+    results = []
+
+    def client():
+        results.append(commands.submit("play", key="request-1", timeout=10))
+
+    threads = [threading.Thread(target=client) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    player.gate.set()
+    for thread in threads:
+        thread.join()
+
+    assert player.calls == [("play",)]
+    assert len(results) == 10 and all(result == results[0] for result in results)
+
+
+def test_queued_volume_commands_coalesce_to_the_latest(player, commands):
+    player.gate.clear()
+    commands.submit("pause", wait=False)  # holds the worker at the gate
+    time.sleep(0.05)
+    for volume in (10, 20, 30):
+        commands.submit("volume", value=volume, wait=False)
+    player.gate.set()
+
+    assert commands.submit("volume", value=40)["volume"] == 40
+    assert [call for call in player.calls if call[0] == "volume"] == [("volume", 40.0)]
+
+
+def test_full_queue_rejects_after_timeout(player):
+    queue = PlayerCommandQueue(player, max_depth=2, tick=0.05)
+    try:
+        player.gate.clear()
+        queue.submit("pause", wait=False)
+        time.sleep(0.05)
+        queue.submit("next", wait=False)
+        queue.submit("previous", wait=False)
+        with pytest.raises(CommandQueueFull):
+            queue.submit("stop", wait=False, timeout=0.1)
+    finally:
+        player.gate.set()
+        queue.close()
+    assert [call[0] for call in player.calls] == ["pause", "next", "previous"]
+
+
+def test_worker_survives_a_failing_state_snapshot(player, commands):
+    player.fail_state = True
+    # The command ran; it finishes with the last good snapshot instead of hanging
+    assert commands.submit("play", timeout=2) is not None
+    player.fail_state = False
+    assert commands.submit("next", timeout=2)["calls"] == 2
+
+
+def test_unknown_action_is_rejected(commands):
+    with pytest.raises(ValueError):
+        commands.submit("paly")
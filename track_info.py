@@ -0,0 +1,135 @@
+"""
+Track durations read from file headers, without decoding the audio.
+
+MP3: the Xing/Info or VBRI header frame count when present (VBR files),
+otherwise the first frame's bitrate over the audio size (CBR). WAV: the frame
+count from the RIFF header. Results are cached per file until it changes.
+"""
+import os
+import struct
+import threading
+import wave
+
+# kbit/s by bitrate index, per (MPEG version group, layer)
+_BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+# Hz by sample rate index, per version bits (0: MPEG 2.5, 2: MPEG 2, 3: MPEG 1)
+_SAMPLE_RATES = {0: (11025, 12000, 8000), 2: (22050, 24000, 16000), 3: (44100, 48000, 32000)}
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _parse_frame_header(header):
+    """Return (version_bits, layer, bitrate kbit/s, sample rate, mono) or None if not a valid frame header."""
+    if header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version_bits = (header[1] >> 3) & 3
+    layer = 4 - ((header[1] >> 1) & 3)
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 3
+    if version_bits == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    group = 1 if version_bits == 3 else 2
+    bitrate = _BITRATES[(group, layer)][bitrate_index]
+    sample_rate = _SAMPLE_RATES[version_bits][rate_index]
+    mono = (header[3] >> 6) == 3
+    return version_bits, layer, bitrate, sample_rate, mono
+
+
+def mp3_duration(path):
+    """Duration of an MP3 file in seconds, or None if no MPEG audio frame is found."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        head = f.read(10)
+        offset = 0
+        if head[:3] == b"ID3" and len(head) == 10:
+            # ID3v2 tag size is a 28-bit "syncsafe" integer, plus an optional footer
+            offset = 10 + ((head[6] & 0x7F) << 21 | (head[7] & 0x7F) << 14 | (head[8] & 0x7F) << 7 | (head[9] & 0x7F))
+            if head[5] & 0x10:
+                offset += 10
+        f.seek(offset)
+        data = f.read(64 * 1024)
+        f.seek(max(0, size - 128))
+        has_id3v1 = f.read(3) == b"TAG"
+
+    start = 0
+    while True:
+        start = data.find(b"\xFF", start)
+        if start < 0 or start + 4 > len(data):
+            return None
+        frame = _parse_frame_header(data[start:start + 4])
+        if frame is not None:
+            break
+        start += 1
+
+    version_bits, layer, bitrate, sample_rate, mono = frame
+    if layer == 1:
+        samples_per_frame = 384
+    elif layer == 3 and version_bits != 3:
+        samples_per_frame = 576
+    else:
+        samples_per_frame = 1152
+
+    # VBR files carry the total frame count in a Xing/Info or VBRI header in the first frame
+    if version_bits == 3:
+        side_info = 17 if mono else 32
+    else:
+        side_info = 9 if mono else 17
+    xing = start + 4 + side_info
+    if data[xing:xing + 4] in (b"Xing", b"Info"):
+        flags, = struct.unpack(">I", data[xing + 4:xing + 8])
+        if flags & 1:
+            frames, = struct.unpack(">I", data[xing + 8:xing + 12])
+            return frames * samples_per_frame / sample_rate
+    vbri = start + 4 + 32
+    if data[vbri:vbri + 4] == b"VBRI":
+        frames, = struct.unpack(">I", data[vbri + 14:vbri + 18])
+        return frames * samples_per_frame / sample_rate
+
+    audio_bytes = size - offset - start - (128 if has_id3v1 else 0)
+    return audio_bytes * 8 / (bitrate * 1000)
+
+
+def wav_duration(path):
+    """Duration of a WAV file in seconds."""
+    with wave.open(path, "rb") as w:
+        return w.getnframes() / w.getframerate()
+
+
+def track_duration(path):
+    """
+    Duration of a song file in seconds, cached until the file changes.
+    Returns:
+        float, or None if the format is unsupported or the file can't be parsed.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    with _cache_lock:
+        cached = _cache.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    try:
+        if path.lower().endswith(".mp3"):
+            duration = mp3_duration(path)
+        elif path.lower().endswith(".wav"):
+            duration = wav_duration(path)
+        else:
+            duration = None
+    except (OSError, EOFError, wave.Error, struct.error) as e:
+        print(f"Error reading the duration of {path}: {e}")
+        duration = None
+
+    with _cache_lock:
+        _cache[path] = (stamp, duration)
+    return duration
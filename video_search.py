@@ -0,0 +1,292 @@
+"""
+Find where hands and gestures occur in long recordings without running
+MediaPipe on every frame.
+
+Coarse-to-fine search:
+    1. Coarse pass: analyse every `stride`-th frame. The frames in between are
+       only grabbed (demuxed and decoded as the codec requires) and never
+       converted, copied or run through MediaPipe.
+    2. Fine pass: wherever two consecutive samples disagree (a hand appeared
+       or disappeared, or the gesture changed), analyse every frame between
+       them, in one more sequential pass over the file. The tail after the
+       last sample is always analysed.
+Frames between two agreeing samples get their label. This gives the same
+timeline as analysing every frame, unless a state both starts and ends
+between two samples, i.e. lasts less than `stride` frames. Keep the stride
+below the shortest hold worth finding (gestures are held for a while anyway
+before the debouncer fires them).
+
+Samples are not consecutive, so every frame is analysed independently with
+the static-image model (mediapipe_utils.get_image_model()), in both passes and
+in the exhaustive reference.
+
+Per-frame labels are "none" (no hand), "hand" (hands, no gesture) or the
+action name of the gesture.
+
+Usage:
+    python video_search.py recordings/session.mp4 --stride 10
+    python video_search.py recordings/ --exhaustive --json timeline.json    # also check against every frame
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+
+NONE = "none"
+HAND = "hand"
+
+
+class FrameAnalyzer:
+    """
+    Label of a single BGR frame: NONE, HAND or the gesture's action.
+    Args:
+        gestures_path (str): Gesture rules file (default: the app's gestures.json).
+    """
+
+    def __init__(self, gestures_path=None):
+        from mediapipe_utils import get_image_model
+
+        if gestures_path:
+            from gesture_map import GestureMap
+
+            self.classify = GestureMap(gestures_path).classify_hands
+        else:
+            from media_controls import map_gesture_to_action
+
+            self.classify = map_gesture_to_action
+        self.model = get_image_model()
+        self.frames = 0
+        self._rgb = None
+
+    def __call__(self, frame):
+        from hand_tracking import hands_from_results
+
+        if self._rgb is None or self._rgb.shape != frame.shape:
+            self._rgb = np.empty_like(frame)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        hands = hands_from_results(self.model.process(self._rgb))
+        self.frames += 1
+        if not hands:
+            return NONE
+        return self.classify(hands) or HAND
+
+
+def _coarse_pass(capture, analyze, stride):
+    """Label every stride-th frame. Returns ({frame: label}, number of frames)."""
+    samples = {}
+    frame = None
+    index = 0
+    while capture.grab():
+        if index % stride == 0:
+            ok, frame = capture.retrieve(frame)
+            if not ok:
+                break
+            samples[index] = analyze(frame)
+        index += 1
+    return samples, index
+
+
+def refine_ranges(samples, frames):
+    """
+    Frame ranges (start, end exclusive) the fine pass must analyse: between
+    consecutive samples with different labels, and after the last sample.
+    """
+    ranges = []
+    indices = sorted(samples)
+    for a, b in zip(indices, indices[1:]):
+        if samples[a] != samples[b] and b - a > 1:
+            ranges.append((a + 1, b))
+    if indices and indices[-1] < frames - 1:
+        ranges.append((indices[-1] + 1, frames))
+    return ranges
+
+
+def _fine_pass(capture, analyze, ranges):
+    """Label every frame of the ranges, reading the file sequentially once."""
+    labels = {}
+    frame = None
+    index = 0
+    for start, end in ranges:
+        while index < start and capture.grab():
+            index += 1
+        while index < end and capture.grab():
+            ok, frame = capture.retrieve(frame)
+            if not ok:
+                return labels
+            labels[index] = analyze(frame)
+            index += 1
+    return labels
+
+
+def coarse_to_fine(open_capture, analyze, stride=10):
+    """
+    Label every frame of a video while analysing as few frames as possible.
+    Args:
+        open_capture: Callable returning a fresh cv2.VideoCapture-like object
+            (grab()/retrieve()/release()) positioned at the first frame; called once per pass.
+        analyze: Callable frame -> label.
+        stride (int): Distance between two coarse samples.
+    Returns:
+        dict with the per-frame `labels`, the number of `frames`, the frames
+        `analysed` in each pass and the refined `ranges`.
+    Raises:
+        ValueError: stride is less than 1.
+    """
+    if stride < 1:
+        raise ValueError(f"stride must be at least 1, got {stride}")
+    capture = open_capture()
+    try:
+        samples, frames = _coarse_pass(capture, analyze, stride)
+    finally:
+        capture.release()
+
+    ranges = refine_ranges(samples, frames)
+    refined = {}
+    if ranges:
+        capture = open_capture()
+        try:
+            refined = _fine_pass(capture, analyze, ranges)
+        finally:
+            capture.release()
+
+    labels = []
+    current = NONE
+    for index in range(frames):
+        if index in samples:
+            current = samples[index]
+            labels.append(current)
+        else:
+            # Between agreeing samples (or before the fine pass ran) a frame keeps the previous sample's label
+            labels.append(refined.get(index, current))
+    return {
+        "labels": labels,
+        "frames": frames,
+        "analysed": {"coarse": len(samples), "fine": len(refined)},
+        "ranges": ranges,
+    }
+
+
+def exhaustive(open_capture, analyze):
+    """Label every frame by analysing all of them (the reference for coarse_to_fine)."""
+    capture = open_capture()
+    labels = []
+    frame = None
+    try:
+        while True:
+            ok, frame = capture.read(frame)
+            if not ok:
+                break
+            labels.append(analyze(frame))
+    finally:
+        capture.release()
+    return labels
+
+
+def timeline(labels, fps):
+    """
+    Runs of the same label other than NONE.
+    Returns:
+        list of dicts with label, start/end frame (end exclusive) and start/end seconds.
+    """
+    events = []
+    start = 0
+    for i in range(1, len(labels) + 1):
+        if i == len(labels) or labels[i] != labels[start]:
+            if labels[start] != NONE:
+                events.append({"label": labels[start], "start": start, "end": i,
+                               "start_time": round(start / fps, 3), "end_time": round(i / fps, 3)})
+            start = i
+    return events
+
+
+def search_video(path, stride=10, analyze=None, check=False):
+    """
+    Coarse-to-fine search of one video file.
+    Args:
+        path (str): Video file.
+        stride (int): Distance between two coarse samples.
+        analyze: Frame labeller (default: a FrameAnalyzer with the default gestures).
+        check (bool): Also analyse every frame and compare the timelines.
+    Returns:
+        dict with the path, fps, frames, analysed frames, the event timeline and
+        the seconds spent; with check=True also `exhaustive_seconds` and `matches`.
+    """
+    analyze = analyze or FrameAnalyzer()
+    capture = cv2.VideoCapture(path)
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    capture.release()
+
+    start = time.perf_counter()
+    result = coarse_to_fine(lambda: cv2.VideoCapture(path), analyze, stride)
+    report = {
+        "path": path,
+        "fps": fps,
+        "frames": result["frames"],
+        "analysed": sum(result["analysed"].values()),
+        "timeline": timeline(result["labels"], fps),
+        "seconds": time.perf_counter() - start,
+    }
+    if check:
+        start = time.perf_counter()
+        reference = exhaustive(lambda: cv2.VideoCapture(path), analyze)
+        report["exhaustive_seconds"] = time.perf_counter() - start
+        report["matches"] = timeline(reference, fps) == report["timeline"]
+    return report
+
+
+def format_report(report):
+    frames = max(report["frames"], 1)
+    lines = [f"{report['path']}: analysed {report['analysed']} of {report['frames']} frames "
+             f"({report['analysed'] / frames:.1%}) in {report['seconds']:.1f}s"]
+    if "matches" in report:
+        lines.append(f"  exhaustive: {report['exhaustive_seconds']:.1f}s, timeline "
+                     f"{'identical' if report['matches'] else 'DIFFERENT'}")
+    for event in report["timeline"]:
+        lines.append(f"  {event['start_time']:>9.2f}s - {event['end_time']:>9.2f}s  {event['label']}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find hands and gestures in recordings, coarse to fine.")
+    parser.add_argument("videos", nargs="+", help="Video files or directories of them")
+    parser.add_argument("--stride", type=int, default=10,
+                        help="Frames between two coarse samples (shorter states can be missed)")
+    parser.add_argument("--gestures", default=None, help="Gesture rules file (default: gestures.json)")
+    parser.add_argument("--exhaustive", action="store_true",
+                        help="Also analyse every frame and report whether the timelines match")
+    parser.add_argument("--json", default=None, help="Also write the reports as JSON to this file")
+    args = parser.parse_args(argv)
+    if args.stride < 1:
+        parser.error(f"--stride must be at least 1, got {args.stride}")
+
+    videos = []
+    for path in args.videos:
+        if os.path.isdir(path):
+            videos.extend(os.path.join(path, f) for f in sorted(os.listdir(path))
+                          if f.lower().endswith(VIDEO_EXTENSIONS))
+        else:
+            videos.append(path)
+    if not videos:
+        print("No videos found", file=sys.stderr)
+        return 1
+
+    analyze = FrameAnalyzer(args.gestures)
+    reports = []
+    for video in videos:
+        report = search_video(video, args.stride, analyze, check=args.exhaustive)
+        reports.append(report)
+        print(format_report(report))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reports, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
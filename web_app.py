@@ -0,0 +1,295 @@
+"""
+Flask front-end for the gesture player (templates/index.html, static/js/script.js).
+
+Endpoints:
+    /                   the player page
+    /video_feed         annotated camera feed as MJPEG
+    /status             player state, current gesture and recognizer frame rate (JSON)
+    /control/<action>   run a player action; "volume" and "seek" take ?value=,
+                        and an Idempotency-Key header (or ?key=) makes retries safe
+
+All player access, from web requests and from the gesture loop, goes through
+one PlayerCommandQueue.
+
+SIGUSR1 profiles the server for --profile-seconds (see sampling_profiler.py).
+
+Usage:
+    python web_app.py --source 0 --port 5000
+    python web_app.py --source clip.mp4 --replay    # loop a video at its own frame rate
+"""
+import argparse
+import signal
+import sys
+import threading
+import time
+
+from flask import Flask, Response, jsonify, render_template, request
+
+from capture import open_source, parse_mode
+from event_log import EventLog, SessionRecorder
+from gesture_map import get_gesture_map
+from latency_trace import LatencyLog
+from pinch_volume import MODES as VOLUME_GESTURE_MODES
+from pinch_volume import PinchVolumeControl, guide_entry
+from player import MediaPlayer
+from player_commands import CommandQueueFull, PlayerCommandQueue
+from sampling_profiler import install_signal_handler
+
+
+class GestureStream:
+    """
+    Background recognition loop that feeds gestures to the command queue and
+    publishes the latest annotated frame as JPEG for any number of viewers.
+    Frames are only encoded while someone is watching, and once per frame no
+    matter how many viewers there are.
+    Args:
+        source: CaptureSource (or open_source() spec) to read from.
+        commands (PlayerCommandQueue): Where recognised gestures are sent.
+        cooldown (float): Seconds between two gesture actions.
+        jpeg_quality (int): JPEG quality of the published frames.
+        max_num_hands (int): Hands to look for; 1 is the faster one-hand mode.
+        volume_gesture (str): PinchVolumeControl mode ("pinch", "height"), or None for none.
+        event_log (EventLog): Where gestures and actions are logged, or None.
+        latency_log (LatencyLog): Where gesture-to-audio latencies are recorded, or None.
+            The playback stage ends when the command queue has run the action.
+    """
+
+    def __init__(self, source, commands, cooldown=2.0, jpeg_quality=80, max_num_hands=2, volume_gesture="pinch",
+                 event_log=None, latency_log=None):
+        self.source = source
+        self.commands = commands
+        self.cooldown = cooldown
+        self.jpeg_quality = jpeg_quality
+        self.max_num_hands = max_num_hands
+        self.volume_gesture = volume_gesture
+        self.recorder = SessionRecorder(event_log, "web") if event_log is not None else None
+        self.latency_log = latency_log
+        self.gesture = None
+        self.fps = 0.0
+        self.viewers = 0
+        self._jpeg = None
+        self._frame_id = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="gesture-stream", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        import cv2
+
+        from landmark_filter import HandSmoother
+        from media_controls import GestureDebouncer, detect_hands_in_video, map_gesture_to_action
+
+        smoother = HandSmoother()
+        debouncer = GestureDebouncer(cooldown=self.cooldown)
+        volume_control = None
+        if self.volume_gesture:
+            volume_control = PinchVolumeControl(self._submit_volume, volume=self.commands.state()["volume"],
+                                                mode=self.volume_gesture)
+        encode_params = [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]
+        frames = detect_hands_in_video(source=self.source, trace=True, max_num_hands=self.max_num_hands)
+        window_start = time.monotonic()
+        window_frames = 0
+        # Trace of the first frame showing the current gesture (see app.py)
+        previous_gesture = None
+        onset_trace = None
+        try:
+            for frame, landmarks, trace in frames:
+                if self._stop.is_set():
+                    break
+                landmarks = smoother(landmarks)
+                volume_mode = volume_control is not None and volume_control.update(landmarks)
+                if volume_mode:
+                    self.gesture = "volume" if volume_control.engaged else None
+                else:
+                    self.gesture = map_gesture_to_action(landmarks)
+                trace.mark("classify")
+                if self.gesture != previous_gesture:
+                    previous_gesture = self.gesture
+                    onset_trace = trace
+                action = None if volume_mode else debouncer.update(self.gesture)
+                if action is not None:
+                    onset_trace.mark("debounce")
+                    if self._submit(action, trace=onset_trace) and self.recorder is not None:
+                        self.recorder.action(action, self.gesture)
+                if self.recorder is not None:
+                    self.recorder.frame(landmarks, self.gesture)
+
+                if self.viewers:
+                    ok, jpeg = cv2.imencode(".jpg", frame, encode_params)
+                    if ok:
+                        with self._cond:
+                            self._jpeg = jpeg.tobytes()
+                            self._frame_id += 1
+                            self._cond.notify_all()
+
+                window_frames += 1
+                now = time.monotonic()
+                if now - window_start >= 1.0:
+                    self.fps = window_frames / (now - window_start)
+                    window_start = now
+                    window_frames = 0
+        finally:
+            frames.close()
+            if self.recorder is not None:
+                self.recorder.flush()
+            self.fps = 0.0
+            with self._cond:
+                self._cond.notify_all()
+
+    def _submit(self, action, value=None, trace=None):
+        """Queue a gesture's action without blocking the recognition loop; returns False if dropped."""
+        callback = None
+        if trace is not None and self.latency_log is not None:
+            def callback(state, error):
+                # Runs on the command queue's thread, the log's only writer
+                if error is None:
+                    trace.mark("playback")
+                    self.latency_log.record(action, trace)
+        try:
+            self.commands.submit(action, value=value, wait=False, timeout=0.5, callback=callback)
+        except CommandQueueFull as e:
+            print(f"Dropped gesture {action}: {e}")
+            return False
+        return True
+
+    def _submit_volume(self, volume):
+        # Queued volume commands coalesce, so a fast pinch costs one player call
+        if self._submit("volume", volume) and self.recorder is not None:
+            self.recorder.action("volume", value=volume)
+
+    def mjpeg(self):
+        """Yield multipart MJPEG chunks with every new frame, until the stream stops."""
+        with self._cond:
+            self.viewers += 1
+        try:
+            last_id = 0
+            while not self._stop.is_set() and self._thread.is_alive():
+                with self._cond:
+                    if self._frame_id == last_id:
+                        self._cond.wait(1.0)
+                    if self._frame_id == last_id:
+                        continue
+                    jpeg, last_id = self._jpeg, self._frame_id
+                yield b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + jpeg + b"\r\n"
+        finally:
+            with self._cond:
+                self.viewers -= 1
+
+
+def create_app(stream, commands):
+    """Flask app serving the player page and its endpoints."""
+    app = Flask(__name__)
+
+    def status():
+        state = dict(commands.state())
+        state.update(gesture=stream.gesture, recognizer_fps=round(stream.fps, 1), viewers=stream.viewers)
+        return state
+
+    @app.route("/")
+    def index():
+        guide = get_gesture_map().guide()
+        if stream.volume_gesture:
+            guide.append(guide_entry(stream.volume_gesture))
+        return render_template("index.html", gesture_guide=guide)
+
+    @app.route("/video_feed")
+    def video_feed():
+        return Response(stream.mjpeg(), mimetype="multipart/x-mixed-replace; boundary=frame")
+
+    @app.route("/status")
+    def status_route():
+        return jsonify(status())
+
+    @app.route("/control/<action>", methods=["GET", "POST"])
+    def control(action):
+        key = request.headers.get("Idempotency-Key") or request.args.get("key")
+        try:
+            state = commands.submit(action, value=request.args.get("value"), key=key)
+        except ValueError as e:
+            return jsonify(error=str(e)), 400
+        except CommandQueueFull as e:
+            return jsonify(error=str(e)), 503, {"Retry-After": "1"}
+        except TimeoutError as e:
+            return jsonify(error=str(e)), 504
+        except Exception as e:
+            return jsonify(error=f"Player error: {e}"), 500
+        state = dict(state)
+        state["gesture"] = stream.gesture
+        return jsonify(state)
+
+    return app
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Serve the gesture player web UI.")
+    parser.add_argument("--source", default="0",
+                        help="Camera index or /dev/video* path, video file, image directory or 'synthetic'")
+    parser.add_argument("--replay", action="store_true",
+                        help="Play a video file source at its own frame rate, in a loop (stands in for a camera)")
+    parser.add_argument("--camera-mode", default="", help="Requested camera mode, e.g. 640x480@30:MJPG")
+    parser.add_argument("--songs", default="songs", help="Song folder")
+    parser.add_argument("--volume", type=int, default=70, help="Initial volume (0-100)")
+    parser.add_argument("--cooldown", type=float, default=2.0, help="Seconds between two gesture actions")
+    parser.add_argument("--one-hand", action="store_true", help="Track a single hand (faster)")
+    parser.add_argument("--volume-gesture", choices=VOLUME_GESTURE_MODES + ("off",), default="pinch",
+                        help="Continuous volume control after holding the thumb+index 'L' pose")
+    parser.add_argument("--event-log", default="logs/events",
+                        help="Directory of the gesture event log ('' to disable; see event_log.py)")
+    parser.add_argument("--latency-log", default="logs/latency-web.npz",
+                        help="Where the gesture-to-audio latency log is saved, every minute and at exit ('' to disable)")
+    parser.add_argument("--queue-depth", type=int, default=64, help="Maximum pending player commands")
+    parser.add_argument("--profile-dir", default="profiles",
+                        help="Where SIGUSR1 profiling windows are written (see sampling_profiler.py)")
+    parser.add_argument("--profile-seconds", type=float, default=30.0, help="Length of a profiling window")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    options = {"realtime": True, "loop": True} if args.replay else parse_mode(args.camera_mode)
+    source = open_source(args.source, **options)
+    if not source.isOpened():
+        print(f"Error: Could not open video source {args.source!r}", file=sys.stderr)
+        return 1
+
+    # SDL turns SIGTERM into a quit event nobody reads here once the mixer is up; it
+    # leaves handlers it didn't install alone, so exit through the cleanup below instead
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    install_signal_handler(duration=args.profile_seconds, directory=args.profile_dir)
+    player = MediaPlayer(song_folder=args.songs, volume=args.volume)
+    player.load_songs()
+    commands = PlayerCommandQueue(player, max_depth=args.queue_depth)
+    event_log = EventLog(args.event_log) if args.event_log else None
+    latency_log = LatencyLog(path=args.latency_log) if args.latency_log else None
+    stream = GestureStream(source, commands, cooldown=args.cooldown,
+                           max_num_hands=1 if args.one_hand else 2,
+                           volume_gesture=None if args.volume_gesture == "off" else args.volume_gesture,
+                           event_log=event_log, latency_log=latency_log).start()
+    try:
+        create_app(stream, commands).run(host=args.host, port=args.port, threaded=True)
+    finally:
+        stream.stop()
+        source.release()
+        commands.close()
+        player.close()
+        if event_log is not None:
+            event_log.close()
+        if latency_log is not None:
+            # After commands.close(), so no callback is still recording
+            latency_log.save()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())